@@ -0,0 +1,146 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import ADMISSION_IN_FLIGHT, ADMISSION_LIMIT, ADMISSION_REJECTED
+
+# Admission control for the routes that load MongoDB the most. Each route class has
+#   - a token bucket per client (rate per second, burst): over it the client gets 429
+#   - a cap on requests in flight in this process: over it the request waits up to
+#     ADMISSION_WAIT_MS for a slot, then gets 503, instead of queueing on the connection pool
+# Both answers carry Retry-After. A request answered with 304 gets its token back, and pages
+# after the first of a cursor walk (?after=) spend none; both still count against the in-flight cap.
+
+# Route class of each endpoint (view function name) and its default limits
+ROUTE_CLASSES = {
+    "order_write": {
+        "endpoints": {"add_order", "add_orders_batch"},
+        "rate_per_second": 2, "burst": 10, "concurrency": 32
+    },
+    "bulk_read": {
+        "endpoints": {"get_all_users_admin", "get_all_restaurants_admin", "get_all_orders_admin", "get_all_jobs_admin",
+                      "export_orders_admin", "admin_query_plans"},
+        "rate_per_second": 0.5, "burst": 5, "concurrency": 4
+    },
+    # Public lists polled by the apps: loose enough for polling every second
+    "list_read": {
+        "endpoints": {"get_all_users", "get_all_menus"},
+        "rate_per_second": 5, "burst": 30, "concurrency": 16
+    },
+}
+
+# Clients whose buckets are kept; the least recently seen are dropped beyond this
+MAX_TRACKED_CLIENTS = 100000
+
+
+# Limits of a route class, overridable with RATE_LIMIT_<CLASS>_PER_SECOND, RATE_LIMIT_<CLASS>_BURST
+# and CONCURRENCY_LIMIT_<CLASS> (0 disables that limit)
+def limits_from_env(route_class, defaults):
+    prefix = route_class.upper()
+    return {
+        "rate_per_second": float(os.getenv(f'RATE_LIMIT_{prefix}_PER_SECOND', defaults["rate_per_second"])),
+        "burst": float(os.getenv(f'RATE_LIMIT_{prefix}_BURST', defaults["burst"])),
+        "concurrency": int(os.getenv(f'CONCURRENCY_LIMIT_{prefix}', defaults["concurrency"])),
+    }
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate_per_second, burst, max_clients=MAX_TRACKED_CLIENTS):
+        self.rate = rate_per_second
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        # client -> (tokens, time of last refill)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Take a token for client. Returns 0 when allowed, else the seconds until a token is available.
+    def acquire(self, client):
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    # Give back a token taken by acquire, e.g. when the request was answered with 304
+    def refund(self, client):
+        with self._lock:
+            if client in self._buckets:
+                tokens, last = self._buckets[client]
+                self._buckets[client] = (min(self.burst, tokens + 1), last)
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit):
+        self.limit = limit
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def acquire(self, timeout):
+        return self._slots.acquire(timeout=timeout)
+
+    def release(self):
+        self._slots.release()
+
+
+class AdmissionControl:
+    def __init__(self, wait_seconds=0.1, enabled=True):
+        self.wait_seconds = wait_seconds
+        self.enabled = enabled
+        self.route_class_of = {}
+        self.rate_limiters = {}
+        self.concurrency_limiters = {}
+        for route_class, defaults in ROUTE_CLASSES.items():
+            limits = limits_from_env(route_class, defaults)
+            for endpoint in defaults["endpoints"]:
+                self.route_class_of[endpoint] = route_class
+            if limits["rate_per_second"] > 0:
+                self.rate_limiters[route_class] = TokenBucketLimiter(limits["rate_per_second"], limits["burst"])
+            if limits["concurrency"] > 0:
+                self.concurrency_limiters[route_class] = ConcurrencyLimiter(limits["concurrency"])
+            for name, value in limits.items():
+                ADMISSION_LIMIT.labels(route_class, name).set(value if enabled else 0)
+
+    # Admit a request of endpoint from client. Returns (route_class, None) when admitted (call
+    # release(route_class) when it finishes; route_class is None for unlimited endpoints),
+    # or (None, (status code, retry after seconds)) when refused.
+    # With charge=False the request takes no token from the client's bucket.
+    def admit(self, endpoint, client, charge=True):
+        route_class = self.route_class_of.get(endpoint)
+        if not self.enabled or route_class is None:
+            return None, None
+
+        rate_limiter = self.rate_limiters.get(route_class)
+        if rate_limiter and charge:
+            wait = rate_limiter.acquire(client)
+            if wait:
+                ADMISSION_REJECTED.labels(route_class, "rate_limited").inc()
+                return None, (429, max(1, math.ceil(wait)))
+
+        concurrency_limiter = self.concurrency_limiters.get(route_class)
+        if concurrency_limiter:
+            if not concurrency_limiter.acquire(self.wait_seconds):
+                ADMISSION_REJECTED.labels(route_class, "overloaded").inc()
+                return None, (503, 1)
+        ADMISSION_IN_FLIGHT.labels(route_class).inc()
+        return route_class, None
+
+    # Give the token of an admitted request back to client
+    def refund(self, route_class, client):
+        rate_limiter = self.rate_limiters.get(route_class)
+        if rate_limiter:
+            rate_limiter.refund(client)
+
+    def release(self, route_class):
+        ADMISSION_IN_FLIGHT.labels(route_class).dec()
+        concurrency_limiter = self.concurrency_limiters.get(route_class)
+        if concurrency_limiter:
+            concurrency_limiter.release()
@@ -0,0 +1,261 @@
+import atexit
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from metrics import ORDER_STATS_FLUSH_FAILURES
+
+# Order analytics per restaurant or delivery person over a time range.
+# Live figures come from $match/$group pipelines over the order collection; dashboard figures
+# come from daily counter documents (collection order_stats) that the order write paths
+# increment, so they never rescan the orders.
+
+# Order field identifying the owner of each analytics scope
+SCOPE_FIELDS = {"restaurant": "restaurant_id", "delivery_person": "delivery_person_id"}
+
+DEFAULT_TOP_ITEMS = 10
+
+# Order fields the counters are computed from
+ORDER_COUNTER_FIELDS = {"restaurant_id": 1, "delivery_person_id": 1, "status": 1, "total_price": 1, "menu_detail": 1}
+
+
+###################### Time Range #######################
+def parse_time(value):
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+# Read ?from=&to= (ISO 8601, to is exclusive). Returns (start, end, None) or (None, None, error message).
+def parse_time_range(args):
+    try:
+        start = parse_time(args['from']) if args.get('from') else None
+        end = parse_time(args['to']) if args.get('to') else None
+    except ValueError:
+        return None, None, "Invalid time range, use ISO 8601 dates for 'from' and 'to'"
+    if start and end and start >= end:
+        return None, None, "'from' must be before 'to'"
+    return start, end, None
+
+# Orders have no creation field: their ObjectId carries the creation time
+def id_range(start, end):
+    id_filter = {}
+    if start:
+        id_filter["$gte"] = ObjectId.from_datetime(start)
+    if end:
+        id_filter["$lt"] = ObjectId.from_datetime(end)
+    return id_filter
+
+def order_day(order_id):
+    return order_id.generation_time.strftime("%Y-%m-%d")
+
+
+###################### Live Pipelines #######################
+# Revenue, order counts by status and top menu_detail items of one restaurant or delivery person
+def order_analytics(orders, scope, owner_id, start=None, end=None, top=DEFAULT_TOP_ITEMS):
+    match = {SCOPE_FIELDS[scope]: ObjectId(owner_id)}
+    if start or end:
+        match["_id"] = id_range(start, end)
+
+    pipeline = [
+        {"$match": match},
+        {"$facet": {
+            "totals": [
+                {"$group": {"_id": None, "orders": {"$sum": 1}, "revenue": {"$sum": "$total_price"}}}
+            ],
+            "by_status": [
+                {"$group": {"_id": "$status", "orders": {"$sum": 1}, "revenue": {"$sum": "$total_price"}}},
+                {"$sort": {"orders": -1}}
+            ],
+            "top_items": [
+                {"$unwind": "$menu_detail"},
+                {"$group": {
+                    "_id": "$menu_detail.product_name",
+                    "quantity": {"$sum": {"$ifNull": ["$menu_detail.quantity", 1]}},
+                    "orders": {"$sum": 1}
+                }},
+                {"$sort": {"quantity": -1, "_id": 1}},
+                {"$limit": top}
+            ]
+        }}
+    ]
+    result = next(orders.aggregate(pipeline))
+
+    totals = result["totals"][0] if result["totals"] else {"orders": 0, "revenue": 0}
+    return {
+        "orders": totals["orders"],
+        "revenue": totals["revenue"],
+        "by_status": {entry["_id"]: entry["orders"] for entry in result["by_status"]},
+        "revenue_by_status": {entry["_id"]: entry["revenue"] for entry in result["by_status"]},
+        "top_items": [{"product_name": entry["_id"], "quantity": entry["quantity"], "orders": entry["orders"]}
+                      for entry in result["top_items"]]
+    }
+
+
+###################### Incremental Counters #######################
+# Counter field names come from user data: keep them valid MongoDB field names
+def counter_key(value):
+    return str(value).replace(".", "_").lstrip("$") or "_"
+
+# Field increments an order contributes to its daily counters (sign=-1 removes them)
+def order_increments(order, sign=1):
+    increments = {"orders": sign, f"status.{counter_key(order.get('status'))}": sign}
+    if isinstance(order.get("total_price"), (int, float)):
+        increments["revenue"] = sign * order["total_price"]
+        increments[f"revenue_by_status.{counter_key(order.get('status'))}"] = sign * order["total_price"]
+    menu_detail = order.get("menu_detail")
+    for item in menu_detail if isinstance(menu_detail, list) else [menu_detail]:
+        if isinstance(item, dict) and item.get("product_name"):
+            quantity = item.get("quantity", 1)
+            quantity = quantity if isinstance(quantity, (int, float)) else 1
+            increments[f"items.{counter_key(item['product_name'])}"] = sign * quantity
+    return increments
+
+
+# Accumulates counter increments in memory and writes them with one bulk_write per flush.
+# Increments for the same restaurant or courier and day coalesce between flushes.
+class OrderStatsCounter:
+    def __init__(self, collection, flush_interval=1.0):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self._pending = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.logger = None
+
+    # Start the flush thread; also restarts it in a forked worker, which does not inherit threads
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            if self._thread is None:
+                atexit.register(self.stop)
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="order-stats-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # Increments stay pending and are retried on the next flush
+                if self.logger:
+                    self.logger.error(f"Order stats flush failed, retrying: {e}")
+
+    def _add(self, order, increments):
+        day = order_day(order["_id"])
+        with self._lock:
+            for scope, field in SCOPE_FIELDS.items():
+                # Counter documents are keyed by the owner's ObjectId
+                if order.get(field) is None or not ObjectId.is_valid(order[field]):
+                    continue
+                counters = self._pending[(scope, str(order[field]), day)]
+                for path, value in increments.items():
+                    counters[path] += value
+
+    def record_new_order(self, order):
+        self._add(order, order_increments(order))
+
+    def record_deleted_order(self, order):
+        self._add(order, order_increments(order, sign=-1))
+
+    # Move the order's counts from its previous status to the current one
+    def record_status_change(self, order, previous_status):
+        increments = {}
+        for path, value in order_increments(dict(order, status=previous_status), sign=-1).items():
+            if path.startswith(("status.", "revenue_by_status.")):
+                increments[path] = value
+        for path, value in order_increments(order).items():
+            if path.startswith(("status.", "revenue_by_status.")):
+                increments[path] = increments.get(path, 0) + value
+        self._add(order, increments)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(lambda: defaultdict(float))
+            if not pending:
+                return 0
+
+            keys = list(pending)
+            try:
+                requests = [UpdateOne(
+                    {"_id": f"{scope}:{owner_id}:{day}"},
+                    {
+                        "$inc": {path: int(value) if float(value).is_integer() else value
+                                 for path, value in pending[(scope, owner_id, day)].items()},
+                        "$setOnInsert": {"scope": scope, "owner_id": ObjectId(owner_id), "day": day}
+                    },
+                    upsert=True
+                ) for scope, owner_id, day in keys]
+                self.collection.bulk_write(requests, ordered=False)
+            except BulkWriteError as e:
+                # Unordered: every request without a write error was applied, retry only the others
+                ORDER_STATS_FLUSH_FAILURES.inc()
+                self._put_back({keys[error["index"]]: pending[keys[error["index"]]]
+                                for error in e.details.get("writeErrors", [])})
+                raise
+            except Exception:
+                ORDER_STATS_FLUSH_FAILURES.inc()
+                self._put_back(pending)
+                raise
+            return len(requests)
+
+    # Put increments back so the next flush retries them
+    def _put_back(self, pending):
+        with self._lock:
+            for key, counters in pending.items():
+                for path, value in counters.items():
+                    self._pending[key][path] += value
+
+    # Recompute every counter document from the order collection
+    def rebuild(self, orders):
+        with self._lock:
+            self._pending.clear()
+        self.collection.delete_many({})
+        for order in orders.find({}, ORDER_COUNTER_FIELDS):
+            self.record_new_order(order)
+        return self.flush()
+
+
+# Sum the daily counter documents of one restaurant or delivery person between two dates
+def stats_from_counters(collection, scope, owner_id, start=None, end=None, top=DEFAULT_TOP_ITEMS):
+    query = {"scope": scope, "owner_id": ObjectId(owner_id)}
+    day_filter = {}
+    if start:
+        day_filter["$gte"] = start.astimezone(timezone.utc).strftime("%Y-%m-%d")
+    if end:
+        # Whole days only: a partial last day is included
+        day_filter["$lte"] = (end.astimezone(timezone.utc) - timedelta(microseconds=1)).strftime("%Y-%m-%d")
+    if day_filter:
+        query["day"] = day_filter
+
+    totals = {"orders": 0, "revenue": 0}
+    sums = {"status": defaultdict(int), "revenue_by_status": defaultdict(int), "items": defaultdict(int)}
+    days = 0
+    for document in collection.find(query):
+        days += 1
+        totals["orders"] += document.get("orders", 0)
+        totals["revenue"] += document.get("revenue", 0)
+        for field, values in sums.items():
+            for key, value in document.get(field, {}).items():
+                values[key] += value
+
+    top_items = sorted(sums["items"].items(), key=lambda entry: (-entry[1], entry[0]))[:top]
+    return {
+        "orders": totals["orders"],
+        "revenue": totals["revenue"],
+        "by_status": {key: value for key, value in sums["status"].items() if value},
+        "revenue_by_status": {key: value for key, value in sums["revenue_by_status"].items() if value},
+        "top_items": [{"product_name": name, "quantity": quantity} for name, quantity in top_items if quantity],
+        "days": days
+    }
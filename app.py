@@ -1,565 +1,1372 @@
-from flask import Flask, jsonify, request
-import os
-from bson import ObjectId
-from dotenv import load_dotenv
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
-
-# Initialize Flask app
-app = Flask(__name__)
-
-# Load environment variables from .env file
-load_dotenv()
-
-# MongoDB connection
-MONGO_URI = os.getenv('MONGO_URI') 
-
-try:
-    # Connect to MongoDB
-    client = MongoClient(MONGO_URI)
-    client.admin.command('ping')  # Verify connection
-    print("Database connected successfully.")
-    db = client["FoodDeliveryApp"]
-    users = db["user"]
-    menus = db["menu"]
-    orders = db["order"]
-except ConnectionFailure:
-    print("Failed to connect to the database.")
-
-
-###################### User Section #######################
-# Root route to display a welcome message
-@app.route('/', methods=['GET'])
-def welcome():
-    return jsonify({"msg": "Welcome to the Food Delivery App"}), 200
-
-# Route to register a new user
-@app.route('/register', methods=['POST'])
-def register_user():
-    # Get form data (for form submission)
-    data = request.get_json()
-
-    print(data)
-    
-    # Check if role is valid
-    if data.get('role') not in ["customer", "restaurant_owner", "delivery_personnel", "admin"]:
-        return jsonify({"msg": "Invalid role"}), 400
-
-    # Ensure essential fields are provided
-    if not data.get('name') or not data.get('email') or not data.get('password'):
-        return jsonify({"msg": "Missing required fields"}), 400
-
-    # Check if a user with the same email already exists
-    if users.find_one({"email": data.get('email')}):
-        return jsonify({"msg": "User with this email already exists"}), 400
-
-    try:
-        # Insert the user data into MongoDB
-        user_id = users.insert_one(data).inserted_id
-
-        # Fetch the saved user from the database by ID (to get the auto-generated _id)
-        saved_user = users.find_one({"_id": ObjectId(user_id)})
-
-        # Convert ObjectId to string
-        saved_user['_id'] = str(saved_user['_id'])
-
-        return jsonify({"msg": "User registered successfully", "user_data": saved_user}), 201
-    except Exception as e:
-        return jsonify({"msg": "Error registering user", "error": str(e)}), 500
-
-# Update user profile
-@app.route('/users/<user_id>', methods=['PUT'])
-def update_user(user_id):
-    # Get the data to update from the request body
-    data = request.get_json()
-    try:
-        # Update only the fields that are provided in the request
-        result = users.update_one(
-            {"_id": ObjectId(user_id)}, 
-            {"$set": data}  # Use $set to update fields
-        )
-
-        if result.modified_count > 0:
-            # Fetch the updated user data to return
-            updated_user = users.find_one({"_id": ObjectId(user_id)})
-            # Convert ObjectId to string
-            updated_user['_id'] = str(updated_user['_id'])
-            return jsonify({"msg": "User updated successfully", "user_data": updated_user}), 200
-        else:
-            return jsonify({"msg": "No changes made to the user"}), 400
-
-    except Exception as e:
-        return jsonify({"msg": "Error updating user", "error": str(e)}), 500
-
-# Get order Track or history
-@app.route('/restaurant/orders/<restaurant_id>', methods=['GET'])
-def get_restaurant_orders(restaurant_id):
-    try:
-        # Find all orders associated with the restaurant
-        restaurant_orders = list(orders.find({"restaurant_id": ObjectId(restaurant_id)}))
-
-        if not restaurant_orders:
-            return jsonify({"msg": "No orders found for this restaurant"}), 404
-
-        # Convert ObjectId fields to strings for each order
-        formatted_orders = []
-        for order in restaurant_orders:
-            order["_id"] = str(order["_id"])
-            order["user_id"] = str(order["user_id"])
-            order["restaurant_id"] = str(order["restaurant_id"])
-            order["delivery_person_id"] = str(order["delivery_person_id"])
-            formatted_orders.append(order)
-
-        return jsonify({"msg": "Orders retrieved successfully", "orders": formatted_orders}), 200
-
-    except Exception as e:
-        return jsonify({"msg": "Error retrieving orders", "error": str(e)}), 500
-
-
-
-# Route to retrieve all users
-@app.route('/users', methods=['GET'])
-def get_all_users():
-    try:
-        # Fetch all users from MongoDB
-        all_users = list(users.find({}))  # Exclude passwords from response for security
-
-        # Convert MongoDB documents to JSON serializable format
-        user_list = []
-        for user in all_users:
-            user['_id'] = str(user['_id'])  # Convert ObjectId to string
-            user_list.append(user)
-        
-        return jsonify({"msg": "Users retrieved successfully", "users": user_list}), 200
-    except Exception as e:
-        return jsonify({"msg": "Error fetching users", "error": str(e)}), 500
-    
-# Route to delete a user by ID
-@app.route('/users/<user_id>', methods=['DELETE'])
-def delete_user(user_id):
-    try:
-        # Attempt to delete the user with the specified ID
-        result = users.delete_one({"_id": ObjectId(user_id)})
-
-        # Check if a document was deleted
-        if result.deleted_count > 0:
-            return jsonify({"msg": "User deleted successfully", "user_id": user_id}), 200
-        else:
-            return jsonify({"msg": "User not found", "user_id": user_id}), 404
-    except Exception as e:
-        return jsonify({"msg": "Error deleting user", "error": str(e)}), 500
-
-# Route to login (basic authentication simulation)
-@app.route('/login', methods=['POST'])
-def login():
-    data = request.get_json()
-    user = users.find_one({"email": data.get("email"), "password": data.get("password")})
-    if user:
-        return jsonify({"msg": "Login successful", "user_id": str(user["_id"]), "role": user["role"]})
-    return jsonify({"msg": "Invalid credentials"}), 401
-
-# Get restaurant order
-@app.route('/restaurant_specific/orders/<restaurant_id>', methods=['GET'])
-def get_specific_restaurant_orders(restaurant_id):
-    try:
-        # Find all orders associated with the restaurant
-        restaurant_orders = list(orders.find({"restaurant_id": ObjectId(restaurant_id)}))
-
-        if not restaurant_orders:
-            return jsonify({"msg": "No orders found for this restaurant"}), 404
-
-        # Convert ObjectId fields to strings for each order
-        formatted_orders = []
-        for order in restaurant_orders:
-            order["_id"] = str(order["_id"])
-            order["user_id"] = str(order["user_id"])
-            order["restaurant_id"] = str(order["restaurant_id"])
-            order["delivery_person_id"] = str(order["delivery_person_id"])
-            formatted_orders.append(order)
-
-        return jsonify({"msg": "Orders retrieved successfully", "orders": formatted_orders}), 200
-
-    except Exception as e:
-        return jsonify({"msg": "Error retrieving orders", "error": str(e)}), 500
-
-
-# Get Delivery Person Order
-@app.route('/delivery_person/orders/<delivery_person_id>', methods=['GET'])
-def get_delivery_person_orders(delivery_person_id):
-    try:
-        # Query the database for orders associated with the given delivery_person_id
-        order_cursor = orders.find({"delivery_person_id": ObjectId(delivery_person_id)})
-        
-        # Convert the cursor to a list of orders
-        orders_list = list(order_cursor)
-
-        # If no orders are found, return a message
-        if not orders_list:
-            return jsonify({'message': 'No orders found for this delivery person.'}), 404
-        
-        # Format the orders list by converting ObjectId to string for each field
-        formatted_orders = []
-        for order in orders_list:
-            order["_id"] = str(order["_id"])
-            order["user_id"] = str(order["user_id"])
-            order["restaurant_id"] = str(order["restaurant_id"])
-            order["delivery_person_id"] = str(order["delivery_person_id"])
-            
-            # Include menu details
-            order["menu_detail"] = order.get("menu_detail", [])
-
-            formatted_orders.append(order)
-
-        # Return the formatted orders list in the response
-        return jsonify({'orders': formatted_orders}), 200
-
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-####### Menu API Section #################################
-
-# Route to add menu items for a restaurant
-@app.route('/menu/<restaurant_id>', methods=['POST'])
-def add_menu(restaurant_id):
-    # Get menu data from request
-    data = request.get_json()
-
-    # Validate the incoming data
-    if not data.get('product_name') or not data.get('price') or not data.get('detail'):
-        return jsonify({"msg": "Missing required fields (product_name, price, detail)"}), 400
-    
-    # Prepare the new product to be added
-    new_menu_item = {
-        "product_name": data.get('product_name'),
-        "price": data.get('price'),
-        "detail": data.get('detail')
-    }
-
-    try:
-        # Check if the restaurant already has a menu
-        existing_menu = menus.find_one({"restaurant_id": ObjectId(restaurant_id)})
-
-        if existing_menu:
-            # If menu exists, update by appending the new menu item to the existing list
-            menus.update_one(
-                {"restaurant_id": ObjectId(restaurant_id)}, 
-                {"$push": {"menu_items": new_menu_item}}  # $push adds the item to the array
-            )
-
-            return jsonify({"msg": "Menu item added successfully to existing menu"}), 200
-        else:
-            # If no menu exists, create a new menu document with the restaurant_id
-            new_menu = {
-                "restaurant_id": ObjectId(restaurant_id),
-                "menu_items": [new_menu_item]  # Create a new list with the first item
-            }
-
-            # Insert the new menu for the restaurant
-            menus.insert_one(new_menu)
-
-            return jsonify({"msg": "New menu created and item added successfully"}), 201
-
-    except Exception as e:
-        return jsonify({"msg": "Error adding menu item", "error": str(e)}), 500
-
-# Route to get all menu items for a specific restaurant
-@app.route('/menu/<restaurant_id>', methods=['GET'])
-def get_menu(restaurant_id):
-    try:
-        # Query the menu collection to find the menu of the restaurant by restaurant_id
-        restaurant_menu = menus.find_one({"restaurant_id": ObjectId(restaurant_id)})
-
-        if restaurant_menu:
-            # Convert ObjectId to string for the response
-            restaurant_menu['_id'] = str(restaurant_menu['_id'])
-            # Return the menu items
-            return jsonify({"msg": "Menu retrieved successfully", "menu": restaurant_menu['menu_items']}), 200
-        else:
-            return jsonify({"msg": "No menu found for the given restaurant_id"}), 404
-
-    except Exception as e:
-        return jsonify({"msg": "Error retrieving menu", "error": str(e)}), 500
-
-# Update menu items
-@app.route('/menu/<restaurant_id>', methods=['PUT'])
-def update_menu(restaurant_id):
-    data = request.get_json()
-
-    try:
-        # Find the restaurant menu using restaurant_id
-        restaurant_menu = menus.find_one({"restaurant_id": ObjectId(restaurant_id)})
-
-        if not restaurant_menu:
-            return jsonify({"msg": "Restaurant menu not found"}), 404
-
-        # Check if product_name is provided in the data
-        if not data.get('product_name'):
-            return jsonify({"msg": "Product name is required"}), 400
-
-        # Find the product inside the menu_items array by product_name
-        existing_product = next((item for item in restaurant_menu['menu_items'] if item['product_name'] == data['product_name']), None)
-
-        if existing_product:
-            # Prepare the update object to only include fields that are provided in the data
-            update_data = {}
-
-            # Only update the fields that are present in the request data
-            if 'price' in data:
-                update_data["menu_items.$.price"] = data['price']
-            if 'detail' in data:
-                update_data["menu_items.$.detail"] = data['detail']
-
-            # Update the menu with the provided fields
-            result = menus.update_one(
-                {"restaurant_id": ObjectId(restaurant_id), "menu_items.product_name": data['product_name']},
-                {"$set": update_data}  # Dynamically set the fields to update
-            )
-
-            if result.modified_count > 0:
-                return jsonify({"msg": "Menu item updated successfully"}), 200
-            else:
-                return jsonify({"msg": "No changes made to the product"}), 400
-        else:
-            return jsonify({"msg": "Product not found in the menu"}), 404
-
-    except Exception as e:
-        return jsonify({"msg": "Error updating menu", "error": str(e)}), 500
-
-# Deleting a item from the menu
-@app.route('/menu/<restaurant_id>/<product_name>', methods=['DELETE'])
-def delete_menu_item(restaurant_id, product_name):
-    try:
-        # Find the restaurant menu using restaurant_id
-        restaurant_menu = menus.find_one({"restaurant_id": ObjectId(restaurant_id)})
-
-        if not restaurant_menu:
-            return jsonify({"msg": "Restaurant menu not found"}), 404
-
-        # Find the menu item by product_name
-        menu_items = restaurant_menu['menu_items']
-        item_to_remove = next((item for item in menu_items if item['product_name'] == product_name), None)
-
-        if not item_to_remove:
-            return jsonify({"msg": "Product not found in the menu"}), 404
-
-        # Remove the item from the menu_items list
-        result = menus.update_one(
-            {"restaurant_id": ObjectId(restaurant_id)},
-            {"$pull": {"menu_items": {"product_name": product_name}}}  # Use $pull to remove item by product_name
-        )
-
-        if result.modified_count > 0:
-            return jsonify({"msg": "Menu item deleted successfully"}), 200
-        else:
-            return jsonify({"msg": "No changes made to the menu"}), 400
-
-    except Exception as e:
-        return jsonify({"msg": "Error deleting menu item", "error": str(e)}), 500
-
-# Get  All Menu
-@app.route('/menu', methods=['GET'])
-def get_all_menus():
-    try:
-        # Retrieve all menus from the collection
-        all_menus = list(menus.find({}))
-
-        if not all_menus:
-            return jsonify({"msg": "No menus found"}), 404
-
-        # Format the response: convert ObjectId to string and include menu items
-        formatted_menus = []
-        for menu in all_menus:
-            formatted_menus.append({
-                "_id": str(menu["_id"]),
-                "restaurant_id": str(menu["restaurant_id"]),
-                "menu_items": menu["menu_items"]
-            })
-
-        return jsonify({"msg": "Menus retrieved successfully", "menus": formatted_menus}), 200
-
-    except Exception as e:
-        return jsonify({"msg": "Error fetching menus", "error": str(e)}), 500
-
-
-############### Order Section #################################
-
-# Add a new order
-@app.route('/order/<user_id>/<restaurant_id>', methods=['POST'])
-def add_order(user_id, restaurant_id):
-    try:
-        # Get data from request body
-        data = request.get_json()
-
-        # Validate required fields
-        required_fields = ["status", "menu_detail", "total_price", "delivery_person_id"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"msg": f"Missing required field: {field}"}), 400
-
-        # Prepare the order document
-        order_data = {
-            "user_id": ObjectId(user_id),
-            "restaurant_id": ObjectId(restaurant_id),
-            "status": data["status"],
-            "menu_detail": data["menu_detail"],  # Assume this is a list or detailed object
-            "total_price": data["total_price"],
-            "delivery_person_id": ObjectId(data["delivery_person_id"])
-        }
-
-        # Insert the order into the database
-        order_id = orders.insert_one(order_data).inserted_id
-
-        # Fetch the inserted order to include all fields
-        inserted_order = orders.find_one({"_id": order_id})
-
-        # Convert ObjectId fields to strings for the response
-        inserted_order["_id"] = str(inserted_order["_id"])
-        inserted_order["user_id"] = str(inserted_order["user_id"])
-        inserted_order["restaurant_id"] = str(inserted_order["restaurant_id"])
-        inserted_order["delivery_person_id"] = str(inserted_order["delivery_person_id"])
-
-        return jsonify({"msg": "Order added successfully", "order_data": inserted_order}), 201
-
-    except Exception as e:
-        return jsonify({"msg": "Error adding order", "error": str(e)}), 500
-
-# Change status of order
-@app.route('/order/<order_id>/status', methods=['PUT'])
-def update_order_status(order_id):
-    try:
-        # Get the delivery_person_id and new status from the request body
-        data = request.get_json()
-
-        # Validate the required fields
-        if "delivery_person_id" not in data or "status" not in data:
-            return jsonify({"msg": "Missing required fields: 'delivery_person_id' and 'status'"}), 400
-
-        # Fetch the order by order_id
-        order = orders.find_one({"_id": ObjectId(order_id)})
-
-        if not order:
-            return jsonify({"msg": "Order not found"}), 404
-
-        # Check if the delivery person is valid for this order
-        if str(order["delivery_person_id"]) != data["delivery_person_id"]:
-            return jsonify({"msg": "Unauthorized: You are not assigned to this order"}), 403
-
-        # Update the order status
-        result = orders.update_one(
-            {"_id": ObjectId(order_id)},
-            {"$set": {"status": data["status"]}}
-        )
-
-        if result.modified_count > 0:
-            # Fetch the updated order to return
-            updated_order = orders.find_one({"_id": ObjectId(order_id)})
-            updated_order["_id"] = str(updated_order["_id"])
-            updated_order["user_id"] = str(updated_order["user_id"])
-            updated_order["restaurant_id"] = str(updated_order["restaurant_id"])
-            updated_order["delivery_person_id"] = str(updated_order["delivery_person_id"])
-
-            return jsonify({"msg": "Order status updated successfully", "order": updated_order}), 200
-        else:
-            return jsonify({"msg": "No changes made to the order"}), 400
-
-    except Exception as e:
-        return jsonify({"msg": "Error updating order status", "error": str(e)}), 500
-
-
-################## Admin Section #################
-# Admin Get all user details
-@app.route('/admin/all_users', methods=['GET'])
-def get_all_users_admin():
-    try:
-        all_users = list(users.find({}))
-        for user in all_users:
-            user['_id'] = str(user['_id'])  # Convert ObjectId to string
-        return jsonify({"msg": "All users retrieved successfully", "users": all_users}), 200
-    except Exception as e:
-        return jsonify({"msg": "Error retrieving users", "error": str(e)}), 500
-
-# admin get all restaurant
-@app.route('/admin/all_restaurants', methods=['GET'])
-def get_all_restaurants_admin():
-    try:
-        all_restaurants = list(menus.find({}))
-        for restaurant in all_restaurants:
-            restaurant['_id'] = str(restaurant['_id'])
-            restaurant['restaurant_id'] = str(restaurant['restaurant_id'])
-        return jsonify({"msg": "All restaurants retrieved successfully", "restaurants": all_restaurants}), 200
-    except Exception as e:
-        return jsonify({"msg": "Error retrieving restaurants", "error": str(e)}), 500
-
-# admin get all orders
-@app.route('/admin/all_orders', methods=['GET'])
-def get_all_orders_admin():
-    try:
-        all_orders = list(orders.find({}))
-        for order in all_orders:
-            order['_id'] = str(order['_id'])
-            order['user_id'] = str(order['user_id'])
-            order['restaurant_id'] = str(order['restaurant_id'])
-            order['delivery_person_id'] = str(order['delivery_person_id'])
-        return jsonify({"msg": "All orders retrieved successfully", "orders": all_orders}), 200
-    except Exception as e:
-        return jsonify({"msg": "Error retrieving orders", "error": str(e)}), 500
-
-# Admin delete user
-@app.route('/admin/user/<user_id>', methods=['DELETE'])
-def admin_delete_user(user_id):
-    try:
-        result = users.delete_one({"_id": ObjectId(user_id)})
-        if result.deleted_count > 0:
-            return jsonify({"msg": "User deleted successfully", "user_id": user_id}), 200
-        else:
-            return jsonify({"msg": "User not found"}), 404
-    except Exception as e:
-        return jsonify({"msg": "Error deleting user", "error": str(e)}), 500
-
-#Admin delete restaurant
-@app.route('/admin/restaurant/<restaurant_id>', methods=['DELETE'])
-def admin_delete_restaurant(restaurant_id):
-    try:
-        # Validate ObjectId
-        if not ObjectId.is_valid(restaurant_id):
-            return jsonify({"msg": "Invalid restaurant ID"}), 400
-        
-        # Convert string to ObjectId
-        restaurant_object_id = ObjectId(restaurant_id)
-        
-        # Delete from users collection (assuming _id matches restaurant_id)
-        user_result = users.delete_one({"_id": restaurant_object_id, "role": "restaurant_owner"})
-        
-        # Delete from menus collection (using restaurant_id reference)
-        menu_result = menus.delete_many({"restaurant_id": restaurant_object_id})
-        
-        # Check if anything was deleted
-        if user_result.deleted_count > 0 or menu_result.deleted_count > 0:
-            return jsonify({
-                "msg": "Restaurant deleted successfully",
-                "user_deleted": user_result.deleted_count,
-                "menu_entries_deleted": menu_result.deleted_count,
-                "restaurant_id": restaurant_id
-            }), 200
-        else:
-            return jsonify({"msg": "Restaurant not found"}), 404
-    except Exception as e:
-        app.logger.error(f"Error deleting restaurant: {e}")
-        return jsonify({"msg": "Error deleting restaurant", "error": str(e)}), 500
-
-# Admin delete order
-@app.route('/admin/order/<order_id>', methods=['DELETE'])
-def admin_delete_order(order_id):
-    try:
-        result = orders.delete_one({"_id": ObjectId(order_id)})
-        if result.deleted_count > 0:
-            return jsonify({"msg": "Order deleted successfully", "order_id": order_id}), 200
-        else:
-            return jsonify({"msg": "Order not found"}), 404
-    except Exception as e:
-        return jsonify({"msg": "Error deleting order", "error": str(e)}), 500
-
-
-# Start the Flask app
-if __name__ == "__main__":
-    print("Starting the server...")
-    app.run(debug=True)
+from flask import Blueprint, Flask, Response, current_app, g, jsonify, request, stream_with_context
+import click
+import hashlib
+import os
+import queue
+import threading
+import time
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from werkzeug.middleware.proxy_fix import ProxyFix
+from admission import AdmissionControl
+from analytics import OrderStatsCounter, SCOPE_FIELDS, order_analytics, parse_time_range, stats_from_counters
+from cascade import CascadeDeletes
+from database import LazyDatabase, MongoConnection, client_options_from_env
+from memory_store import MemoryConnection
+from db_monitoring import request_commands, request_round_trips, start_request_count
+from indexes import audit_query_plans, ensure_indexes
+from dispatch import RELEASE_STATUSES, CourierLocationBuffer, Dispatcher, parse_location
+from export import (EXPORT_FORMATS, chunked, export_cursor, export_lines, export_query, parse_batch_size,
+                    resume_point)
+from jobs import JobRunner
+from json_provider import BSONJSONProvider
+from validation import (build_menu_item, build_order, build_order_batch, menu_item_filter, menu_item_update,
+                        menu_item_upsert, menu_register, order_batch_response, order_after_status_update, order_status_filter, order_status_update, page_query,
+                        parse_page_args, split_page,
+                        user_update_filter, validate_registration, validate_status_update)
+from menu_cache import MenuCache
+from menu_store import (MENU_ITEM_PROJECTION, MENU_ITEM_SORT, MENU_ITEM_VERSION_PROJECTION, attach_menu_items, menu_items_filter,
+                        migrate_menu_items, parse_search_args, search_pipeline, split_search_page)
+from order_events import ChangeStreamSource, OrderEventBroker
+from order_query import order_list_query
+from status_writes import OrderStatusWriteBehind
+from metrics import (REQUEST_COUNT, REQUEST_DB_ROUND_TRIPS, REQUEST_LATENCY, REQUESTS_IN_FLIGHT,
+                     render_metrics)
+
+# Routes, hooks and CLI commands; registered on the app built by create_app()
+api = Blueprint('api', __name__, cli_group=None)
+
+# Load environment variables from .env file
+load_dotenv()
+
+# MongoDB connection. The client is created lazily, once per process, with the pool size,
+# timeouts and read preference from the MONGO_* settings (see database.py)
+MONGO_URI = os.getenv('MONGO_URI') 
+MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'FoodDeliveryApp')
+
+# Storage backend: 'mongo', or 'memory' to keep the collections in this process with hash
+# indexes (single worker, no persistence; see memory_store.py). Routes needing a server feature
+# the backend lacks answer 501 (see ROUTE_STORAGE_FEATURES); the others are served.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo').lower()
+if STORAGE_BACKEND not in ('mongo', 'memory'):
+    raise ValueError("STORAGE_BACKEND must be 'mongo' or 'memory'")
+
+if STORAGE_BACKEND == 'memory':
+    mongo = MemoryConnection(MONGO_URI, MONGO_DB_NAME)
+else:
+    mongo = MongoConnection(MONGO_URI, MONGO_DB_NAME, **client_options_from_env())
+db = LazyDatabase(mongo)
+users = db["user"]
+menus = db["menu"]
+menu_items = db["menu_item"]
+orders = db["order"]
+
+# Seconds between writes of the incremental order analytics counters
+ORDER_STATS_FLUSH_SECONDS = float(os.getenv('ORDER_STATS_FLUSH_SECONDS', 1))
+
+# Order event streams: events kept per channel for resuming clients, seconds between
+# keepalive comments, and whether events come from a MongoDB change stream (multi-worker)
+ORDER_EVENTS_BUFFER = int(os.getenv('ORDER_EVENTS_BUFFER', 100))
+# Channels (restaurants and couriers) whose recent events are kept for resuming clients
+ORDER_EVENTS_MAX_CHANNELS = int(os.getenv('ORDER_EVENTS_MAX_CHANNELS', 10000))
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+# Open event streams per process. Each one holds a worker thread for as long as it is open, so
+# serve streams from threaded workers (gunicorn -k gthread --threads N) with this well below N
+SSE_MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', 32))
+ORDER_EVENTS_CHANGE_STREAM = os.getenv('ORDER_EVENTS_CHANGE_STREAM', 'false').lower() in ('1', 'true', 'yes')
+
+order_events = OrderEventBroker(ORDER_EVENTS_BUFFER, max_subscribers=SSE_MAX_SUBSCRIBERS,
+                                max_channels=ORDER_EVENTS_MAX_CHANNELS)
+
+# Daily order counters for the analytics dashboards, written in the background
+order_stats = OrderStatsCounter(db["order_stats"], ORDER_STATS_FLUSH_SECONDS)
+
+# Background jobs: worker threads per process, documents deleted per bulk_write, and the
+# pause between two bulk writes so a long cascade leaves room for customer traffic
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', 500))
+JOB_PAUSE_SECONDS = float(os.getenv('JOB_PAUSE_SECONDS', 0.05))
+# Seconds without a heartbeat after which a running job counts as abandoned and is taken over
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', 300))
+
+jobs = db["job"]
+job_runner = JobRunner(jobs, JOB_WORKERS, lease_seconds=JOB_LEASE_SECONDS)
+
+# Courier dispatch: meters from the restaurant a courier may be assigned from, nearest couriers
+# tried per order, seconds between writes of the buffered location pings and seconds without
+# a ping after which a courier counts as offline
+DISPATCH_MAX_DISTANCE_M = float(os.getenv('DISPATCH_MAX_DISTANCE_M', 5000))
+DISPATCH_CANDIDATES = int(os.getenv('DISPATCH_CANDIDATES', 5))
+COURIER_LOCATION_FLUSH_SECONDS = float(os.getenv('COURIER_LOCATION_FLUSH_SECONDS', 1))
+COURIER_LOCATION_TTL_SECONDS = float(os.getenv('COURIER_LOCATION_TTL_SECONDS', 300))
+
+couriers = db["courier"]
+dispatcher = Dispatcher(couriers, users, DISPATCH_MAX_DISTANCE_M, DISPATCH_CANDIDATES,
+                        courier_ttl=COURIER_LOCATION_TTL_SECONDS)
+courier_locations = CourierLocationBuffer(couriers, users, COURIER_LOCATION_FLUSH_SECONDS)
+
+# Write-behind of order status updates (see status_writes.py): on/off, milliseconds between
+# flushes, pending orders that trigger an early flush, and orders kept in the in-memory cache
+ORDER_STATUS_WRITE_BEHIND = os.getenv('ORDER_STATUS_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+ORDER_STATUS_FLUSH_MS = float(os.getenv('ORDER_STATUS_FLUSH_MS', 20))
+ORDER_STATUS_FLUSH_MAX = int(os.getenv('ORDER_STATUS_FLUSH_MAX', 500))
+ORDER_STATUS_CACHE_SIZE = int(os.getenv('ORDER_STATUS_CACHE_SIZE', 100000))
+
+status_writes = OrderStatusWriteBehind(orders, ORDER_STATUS_FLUSH_MS / 1000, ORDER_STATUS_FLUSH_MAX,
+                                       ORDER_STATUS_CACHE_SIZE) if ORDER_STATUS_WRITE_BEHIND else None
+
+# Menu cache settings: entries, seconds to live, and whether a hit re-checks the
+# menu's ETag in MongoDB so writes made by other workers are seen immediately
+MENU_CACHE_SIZE = int(os.getenv('MENU_CACHE_SIZE', 1024))
+MENU_CACHE_TTL = float(os.getenv('MENU_CACHE_TTL', 60))
+MENU_CACHE_VERIFY_VERSION = os.getenv('MENU_CACHE_VERIFY_VERSION', 'false').lower() in ('1', 'true', 'yes')
+
+menu_cache = MenuCache(MENU_CACHE_SIZE, MENU_CACHE_TTL)
+
+# Mutating requests that issue more MongoDB commands than this are logged
+WRITE_ROUND_TRIP_BUDGET = int(os.getenv('WRITE_ROUND_TRIP_BUDGET', 1))
+
+# Admission control of the DB-heavy route classes (limits per class in admission.py): on/off,
+# and how long a request may wait for an in-flight slot before it is refused with 503
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'true').lower() in ('1', 'true', 'yes')
+ADMISSION_WAIT_MS = float(os.getenv('ADMISSION_WAIT_MS', 100))
+# Reverse proxies in front of the app that append to X-Forwarded-For. Clients are told apart by
+# address: with 0 the peer address, else the address this many proxies back (werkzeug ProxyFix)
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
+
+admission = AdmissionControl(ADMISSION_WAIT_MS / 1000, ADMISSION_CONTROL)
+
+# Requests slower than this many milliseconds are logged with the MongoDB commands they issued
+# (unset or 0 disables the slow-request log)
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 0))
+
+
+###################### Process Startup #######################
+# Work each process does once before it is ready: check the connection, create the
+# registered indexes, start the background threads and let the pool open MONGO_MIN_POOL_SIZE
+# connections. It runs in a thread started by the first request (usually the readiness
+# probe), so importing the app and forking workers stay fast.
+class WarmUp:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._pid = None
+        self.unique_indexes = False
+        self.done = False
+        self.error = None
+
+    # Build the unique indexes once; raises while they cannot be built
+    def ensure_unique_indexes(self, logger):
+        if self.unique_indexes:
+            return
+        with self._index_lock:
+            if not self.unique_indexes:
+                ensure_indexes(db, logger, unique=True)
+                self.unique_indexes = True
+
+    def start(self, logger):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.done = False
+                self.error = None
+                threading.Thread(target=self._run, args=(logger,), name="warm-up", daemon=True).start()
+
+    def _run(self, logger):
+        while True:
+            try:
+                mongo.client().admin.command('ping')
+                self.ensure_unique_indexes(logger)
+                ensure_indexes(db, logger, unique=False)
+                order_stats.logger = logger
+                order_stats.start()
+                courier_locations.logger = logger
+                courier_locations.start()
+                if status_writes:
+                    status_writes.logger = logger
+                    status_writes.start()
+                job_runner.logger = logger
+                job_runner.start()
+                if ORDER_EVENTS_CHANGE_STREAM and not missing_storage_features("ORDER_EVENTS_CHANGE_STREAM"):
+                    ChangeStreamSource(order_events, orders, logger).start()
+                elif ORDER_EVENTS_CHANGE_STREAM:
+                    logger.warning(f"STORAGE_BACKEND={STORAGE_BACKEND} has no change streams, "
+                                   "order events are published in-process")
+                self.error = None
+                self.done = True
+                return
+            except Exception as e:
+                # Not ready yet: the readiness check reports the error until a retry succeeds
+                self.error = str(e)
+                logger.error(f"Warm-up failed, retrying: {e}")
+                time.sleep(1)
+
+    # Connections the pool still has to open before this process is ready
+    def missing_connections(self):
+        if not mongo.connected():
+            return mongo.client_options.get("minPoolSize", 0)
+        return max(0, mongo.client_options.get("minPoolSize", 0) - mongo.pool_metrics.open_connections)
+
+warm_up = WarmUp()
+
+
+###################### Request Instrumentation #######################
+# Count and time every request, and the MongoDB commands it issues (X-DB-Round-Trips)
+@api.before_app_request
+def start_request_metrics():
+    warm_up.start(current_app.logger)
+    start_request_count()
+    g.request_started = time.perf_counter()
+    g.route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUESTS_IN_FLIGHT.labels(g.route).inc()
+
+# Endpoints that answer before the unique indexes exist
+INDEX_EXEMPT_ENDPOINTS = {"api.health_live", "api.health_ready", "api.metrics"}
+
+# Writes rely on the unique indexes to reject duplicates (e.g. registration on email_unique), so
+# no other request is served before they exist: the first one builds them if the warm-up has not
+@api.before_app_request
+def require_unique_indexes():
+    if request.endpoint in INDEX_EXEMPT_ENDPOINTS:
+        return None
+    try:
+        warm_up.ensure_unique_indexes(current_app.logger)
+    except Exception as e:
+        response = jsonify({"msg": "Server starting, retry later", "error": str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+# Rate limit per client and cap the in-flight requests of each route class, refusing the excess
+# with 429/503 and Retry-After before it reaches MongoDB. Clients are identified by their address
+# (behind TRUSTED_PROXY_HOPS proxies, the one they report), never by path parameters.
+# The pages after the first of a cursor walk (?after=) take no token, and a 304 gives its token back.
+@api.before_app_request
+def admit_request():
+    endpoint = (request.endpoint or "").rsplit(".", 1)[-1]
+    charge = 'after' not in request.args
+    route_class, rejection = admission.admit(endpoint, request.remote_addr, charge)
+    if rejection:
+        status_code, retry_after = rejection
+        response = jsonify({"msg": "Too many requests" if status_code == 429 else "Server busy, retry later"})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, status_code
+    g.admission_class = route_class
+    g.admission_charged = charge
+
+@api.after_app_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_started
+    round_trips = request_round_trips()
+    response.headers['X-DB-Round-Trips'] = str(round_trips)
+
+    REQUEST_COUNT.labels(request.method, g.route, response.status_code).inc()
+    REQUEST_LATENCY.labels(request.method, g.route).observe(elapsed)
+    REQUEST_DB_ROUND_TRIPS.labels(request.method, g.route).observe(round_trips)
+    if response.status_code == 304 and g.get('admission_class') and g.get('admission_charged'):
+        # The client's cached copy was still current
+        admission.refund(g.admission_class, request.remote_addr)
+
+    if request.method in ('POST', 'PUT', 'DELETE') and round_trips > WRITE_ROUND_TRIP_BUDGET:
+        current_app.logger.warning(f"{request.method} {request.path} used {round_trips} database round trips")
+    if SLOW_REQUEST_MS and elapsed * 1000 > SLOW_REQUEST_MS:
+        commands = ", ".join(f"{name} {collection} {duration}ms" for name, collection, duration in request_commands())
+        current_app.logger.warning(f"Slow request {request.method} {request.path}: {elapsed * 1000:.1f}ms, "
+                           f"{round_trips} database commands [{commands}]")
+    return response
+
+# Runs even when the view raised, so the in-flight gauge never drifts
+@api.teardown_app_request
+def finish_request_metrics(exc):
+    if 'route' in g:
+        REQUESTS_IN_FLIGHT.labels(g.route).dec()
+    if g.get('admission_class'):
+        admission.release(g.admission_class)
+
+# Liveness: the process is up and serving, without touching the database
+@api.route('/health/live', methods=['GET'])
+def health_live():
+    return jsonify({"msg": "alive"}), 200
+
+# Readiness: startup work is done and the pool holds its minimum connections.
+# Load balancers and orchestrators should only route traffic to workers answering 200.
+@api.route('/health/ready', methods=['GET'])
+def health_ready():
+    missing = warm_up.missing_connections()
+    if not warm_up.done or missing:
+        body = {"msg": "not ready", "missing_connections": missing}
+        if warm_up.error:
+            body["error"] = warm_up.error
+        response = jsonify(body)
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    return jsonify({"msg": "ready", "open_connections": mongo.pool_metrics.open_connections}), 200
+
+# Prometheus scrape endpoint
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, status=200, content_type=content_type)
+
+
+###################### Conditional GET Helpers #######################
+# Strong ETag for a list response, built from each document's _id and version
+# plus any request parameters that shape the body
+def documents_etag(documents, *parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(f'{part};'.encode())
+    for document in documents:
+        digest.update(f'{document["_id"]}:{document.get("version", 0)};'.encode())
+    return digest.hexdigest()
+
+# Empty 304 response carrying the current ETag
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+###################### Pagination Helpers #######################
+# Number of documents pymongo fetches per round trip while streaming
+STREAM_BATCH_SIZE = 500
+
+# Fields returned by GET /menu for each menu
+MENU_LIST_PROJECTION = {"restaurant_id": 1}
+
+# Stream a list response chunk by chunk straight from the pymongo cursor
+def stream_documents(cursor, msg, key, limit):
+    yield '{"msg": %s, "%s": [' % (current_app.json.dumps(msg), key)
+    count = 0
+    last_id = None
+    next_cursor = None
+    for document in cursor:
+        if limit is not None and count == limit:
+            # One extra document was fetched, so there is another page
+            next_cursor = str(last_id)
+            break
+        last_id = document["_id"]
+        yield (", " if count else "") + current_app.json.dumps(document)
+        count += 1
+    if limit is None:
+        yield ']}'
+    else:
+        yield '], "next_cursor": %s}' % current_app.json.dumps(next_cursor)
+
+# Documents of a cursor, passed through expand one batch of STREAM_BATCH_SIZE at a time
+def expand_batches(cursor, expand):
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) == STREAM_BATCH_SIZE:
+            yield from expand(batch)
+            batch = []
+    if batch:
+        yield from expand(batch)
+
+# Shared handler for the bulk list endpoints.
+# Without query parameters the whole collection is returned as before.
+# ?after=<id>&limit=N returns one page sorted by _id plus a next_cursor,
+# and ?stream=true sends the response in chunks so memory stays flat.
+# With etag=True a conditional request is answered from an _id/version projection;
+# etag_extra, when given, returns more _id/version documents a page's ETag depends on.
+# expand, when given, adds fields to each page of documents before it is sent.
+# direction=-1 lists (and pages) newest first.
+def list_documents(collection, msg, key, query=None, projection=None, empty_msg=None, etag=False, expand=None,
+                   direction=1, etag_extra=None):
+    query = query or {}
+    after, limit, stream, error = parse_page_args(request.args)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    def page_cursor(projection=None):
+        cursor = collection.find(page_query(query, after, direction), projection).sort("_id", direction)
+        if limit is not None:
+            # Fetch one extra document to know whether a next page exists
+            cursor = cursor.limit(limit + 1)
+        return cursor
+
+    if etag and not stream and request.if_none_match:
+        # Compare against the client's copy using only the _id and version fields
+        if etag_extra:
+            page = list(page_cursor(dict(projection or {}, version=1)))
+            current_etag = documents_etag(page + list(etag_extra(page)), after, limit)
+        else:
+            current_etag = documents_etag(page_cursor({"version": 1}), after, limit)
+        if request.if_none_match.contains(current_etag):
+            return not_modified(current_etag)
+
+    cursor = page_cursor(projection)
+
+    if stream:
+        cursor = cursor.batch_size(STREAM_BATCH_SIZE)
+        if expand:
+            cursor = expand_batches(cursor, expand)
+        return Response(stream_with_context(stream_documents(cursor, msg, key, limit)), mimetype='application/json')
+
+    documents = list(cursor)
+    if not documents and empty_msg and after is None:
+        return jsonify({"msg": empty_msg}), 404
+
+    response_etag = None
+    if etag:
+        response_etag = documents_etag(documents + list(etag_extra(documents) if etag_extra else []), after, limit)
+
+    response = {"msg": msg}
+    documents, next_cursor = split_page(documents, limit)
+    if expand:
+        documents = expand(documents)
+    if limit is not None:
+        response["next_cursor"] = next_cursor
+    response[key] = documents
+    response = jsonify(response)
+    if response_etag:
+        response.set_etag(response_etag)
+    return response, 200
+
+
+###################### User Section #######################
+# Root route to display a welcome message
+@api.route('/', methods=['GET'])
+def welcome():
+    return jsonify({"msg": "Welcome to the Food Delivery App"}), 200
+
+# Route to register a new user
+@api.route('/register', methods=['POST'])
+def register_user():
+    # Get form data (for form submission)
+    data = request.get_json()
+
+    # Check the role and the essential fields
+    error = validate_registration(data)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    try:
+        # Insert the user data into MongoDB; the unique email index rejects duplicates.
+        # insert_one adds the generated _id to data, so no read back is needed
+        users.insert_one(data)
+
+        return jsonify({"msg": "User registered successfully", "user_data": data}), 201
+    except DuplicateKeyError:
+        return jsonify({"msg": "User with this email already exists"}), 400
+    except Exception as e:
+        return jsonify({"msg": "Error registering user", "error": str(e)}), 500
+
+# Update user profile
+@api.route('/users/<user_id>', methods=['PUT'])
+def update_user(user_id):
+    # Get the data to update from the request body
+    data = request.get_json()
+    try:
+        if not data:
+            return jsonify({"msg": "No changes made to the user"}), 400
+
+        # Update only the fields that are provided in the request, matching the user
+        # only when at least one of them changes, and get the updated user back
+        updated_user = users.find_one_and_update(
+            user_update_filter(user_id, data),
+            {"$set": data},  # Use $set to update fields
+            return_document=ReturnDocument.AFTER
+        )
+
+        if updated_user:
+            return jsonify({"msg": "User updated successfully", "user_data": updated_user}), 200
+        else:
+            return jsonify({"msg": "No changes made to the user"}), 400
+
+    except Exception as e:
+        return jsonify({"msg": "Error updating user", "error": str(e)}), 500
+
+# Get order Track or history of a restaurant (both paths serve the same list).
+# Filters: ?status=a,b or ?active=true, ?from=&to=, ?sort=oldest|newest; ?after=&limit= pages
+# and ?stream=true streams, as for the bulk lists (see order_query.py)
+@api.route('/restaurant/orders/<restaurant_id>', methods=['GET'])
+@api.route('/restaurant_specific/orders/<restaurant_id>', methods=['GET'])
+def get_restaurant_orders(restaurant_id, active=False):
+    try:
+        order_query, direction, error = order_list_query(request.args, "restaurant_id", restaurant_id, active)
+        if error:
+            return jsonify({"msg": error}), 400
+
+        # ObjectId fields are encoded by the app's JSON provider
+        return list_documents(orders, "Orders retrieved successfully", "orders", query=order_query,
+                              empty_msg="No orders found for this restaurant", direction=direction)
+
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving orders", "error": str(e)}), 500
+
+# Active orders of a restaurant (dashboard fast path): only orders not delivered or cancelled yet
+@api.route('/restaurant/orders/<restaurant_id>/active', methods=['GET'])
+def get_active_restaurant_orders(restaurant_id):
+    return get_restaurant_orders(restaurant_id, active=True)
+
+
+
+# Route to retrieve all users
+@api.route('/users', methods=['GET'])
+def get_all_users():
+    try:
+        # Fetch users from MongoDB, one page or stream at a time when requested
+        return list_documents(users, "Users retrieved successfully", "users")
+    except Exception as e:
+        return jsonify({"msg": "Error fetching users", "error": str(e)}), 500
+    
+# Route to delete a user by ID
+@api.route('/users/<user_id>', methods=['DELETE'])
+def delete_user(user_id):
+    try:
+        # Attempt to delete the user with the specified ID
+        result = users.delete_one({"_id": ObjectId(user_id)})
+
+        # Check if a document was deleted; their orders and menu are deleted in the background
+        if result.deleted_count > 0:
+            job_id = job_runner.submit("delete_user_data", {"user_id": ObjectId(user_id)})
+            return jsonify({"msg": "User deleted successfully", "user_id": user_id, "job_id": job_id}), 200
+        else:
+            return jsonify({"msg": "User not found", "user_id": user_id}), 404
+    except Exception as e:
+        return jsonify({"msg": "Error deleting user", "error": str(e)}), 500
+
+# Route to login (basic authentication simulation)
+@api.route('/login', methods=['POST'])
+def login():
+    data = request.get_json()
+    user = users.find_one({"email": data.get("email"), "password": data.get("password")})
+    if user:
+        return jsonify({"msg": "Login successful", "user_id": user["_id"], "role": user["role"]})
+    return jsonify({"msg": "Invalid credentials"}), 401
+
+
+# Get Delivery Person Order, with the same filters as the restaurant orders
+# (?status=a,b or ?active=true, ?from=&to=, ?sort=oldest|newest)
+@api.route('/delivery_person/orders/<delivery_person_id>', methods=['GET'])
+def get_delivery_person_orders(delivery_person_id):
+    try:
+        order_query, direction, error = order_list_query(request.args, "delivery_person_id", delivery_person_id)
+        if error:
+            return jsonify({'error': error}), 400
+
+        if request.if_none_match:
+            # The client already has a copy: compare using only the _id and version fields
+            current_etag = documents_etag(orders.find(order_query, {"version": 1}).sort("_id", direction))
+            if request.if_none_match.contains(current_etag):
+                return not_modified(current_etag)
+
+        # Query the database for orders associated with the given delivery_person_id
+        order_cursor = orders.find(order_query).sort("_id", direction)
+        
+        # Convert the cursor to a list of orders
+        orders_list = list(order_cursor)
+
+        # If no orders are found, return a message
+        if not orders_list:
+            return jsonify({'message': 'No orders found for this delivery person.'}), 404
+
+        orders_etag = documents_etag(orders_list)
+
+        # Include menu details; ObjectId fields are encoded by the app's JSON provider
+        for order in orders_list:
+            order.setdefault("menu_detail", [])
+
+        # Return the orders list in the response
+        response = jsonify({'orders': orders_list})
+        response.set_etag(orders_etag)
+        return response, 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+####### Menu API Section #################################
+
+# Route to add menu items for a restaurant
+@api.route('/menu/<restaurant_id>', methods=['POST'])
+def add_menu(restaurant_id):
+    # Get menu data from request
+    data = request.get_json()
+
+    # Validate the incoming data and prepare the new product to be added
+    new_menu_item, error = build_menu_item(data)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    try:
+        # Store the item under its (restaurant_id, product_name) key and bump its version in the
+        # same upsert; adding a product that already exists replaces its price and detail
+        item_filter, item_update = menu_item_upsert(restaurant_id, new_menu_item)
+        result = menu_items.update_one(item_filter, item_update, upsert=True)
+        menu_cache.invalidate(str(ObjectId(restaurant_id)))
+
+        if result.upserted_id is None:
+            # The product was already on the menu
+            return jsonify({"msg": "Menu item added successfully to existing menu"}), 200
+
+        # A new product: make sure the restaurant is listed by GET /menu. The menu document
+        # carries no version, so nothing goes stale if this second write fails.
+        menu_filter, menu_update = menu_register(restaurant_id)
+        if menus.update_one(menu_filter, menu_update, upsert=True).upserted_id is None:
+            return jsonify({"msg": "Menu item added successfully to existing menu"}), 200
+        else:
+            return jsonify({"msg": "New menu created and item added successfully"}), 201
+
+    except Exception as e:
+        return jsonify({"msg": "Error adding menu item", "error": str(e)}), 500
+
+# Route to get all menu items for a specific restaurant
+@api.route('/menu/<restaurant_id>', methods=['GET'])
+def get_menu(restaurant_id):
+    try:
+        cache_key = str(ObjectId(restaurant_id))
+        cached = menu_cache.get(cache_key)
+        current = None
+
+        if (cached and MENU_CACHE_VERIFY_VERSION) or (not cached and request.if_none_match):
+            # Fetch only the items' _id and version, to validate the cache entry or the client's copy
+            current = documents_etag(menu_items.find({"restaurant_id": ObjectId(restaurant_id)},
+                                                     MENU_ITEM_VERSION_PROJECTION).sort(MENU_ITEM_SORT))
+
+        if cached and MENU_CACHE_VERIFY_VERSION:
+            # Another worker may have changed the menu
+            if current != cached[1]:
+                menu_cache.invalidate(cache_key)
+                cached = None
+
+        if cached:
+            if request.if_none_match.contains(cached[1]):
+                return not_modified(cached[1])
+            # Serve the pre-serialized response without touching the database
+            response = Response(cached[0], status=200, mimetype='application/json')
+            response.set_etag(cached[1])
+            return response
+
+        if current and request.if_none_match.contains(current):
+            return not_modified(current)
+
+        fill_token = menu_cache.fill_token()
+
+        # Read the items with their _id and version, so the body and its ETag come from the same read
+        items = list(menu_items.find({"restaurant_id": ObjectId(restaurant_id)},
+                                     {"restaurant_id": 0}).sort(MENU_ITEM_SORT))
+
+        # A restaurant without items still has a menu if its menu document exists
+        if not items and not menus.find_one({"restaurant_id": ObjectId(restaurant_id)}, {"_id": 1}):
+            return jsonify({"msg": "No menu found for the given restaurant_id"}), 404
+
+        etag = documents_etag(items)
+        # Drop the fields that are not part of the response
+        items = [{key: value for key, value in item.items() if key not in MENU_ITEM_PROJECTION} for item in items]
+        # Serialize the menu items once and keep the bytes for later hits
+        body = current_app.json.dumps({"msg": "Menu retrieved successfully", "menu": items}).encode()
+        menu_cache.put(cache_key, body, etag, fill_token)
+        response = Response(body, status=200, mimetype='application/json')
+        response.set_etag(etag)
+        return response
+
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving menu", "error": str(e)}), 500
+
+# Update menu items
+@api.route('/menu/<restaurant_id>', methods=['PUT'])
+def update_menu(restaurant_id):
+    data = request.get_json()
+
+    try:
+        # Check if product_name is provided in the data
+        if not data.get('product_name'):
+            return jsonify({"msg": "Product name is required"}), 400
+
+        # Only update the fields that are present in the request data
+        menu_filter, menu_update = menu_item_update(restaurant_id, data)
+
+        if menu_update:
+            # Match the product only if one of the provided fields actually changes,
+            # and update that item document and its version alone
+            result = menu_items.update_one(menu_filter, menu_update)
+
+            if result.modified_count > 0:
+                menu_cache.invalidate(str(ObjectId(restaurant_id)))
+                return jsonify({"msg": "Menu item updated successfully"}), 200
+
+        # Nothing was updated: find out why (only on this error path)
+        if menu_items.find_one(menu_item_filter(restaurant_id, data['product_name']), {"_id": 1}):
+            return jsonify({"msg": "No changes made to the product"}), 400
+        elif not menus.find_one({"restaurant_id": ObjectId(restaurant_id)}, {"_id": 1}):
+            return jsonify({"msg": "Restaurant menu not found"}), 404
+        else:
+            return jsonify({"msg": "Product not found in the menu"}), 404
+
+    except Exception as e:
+        return jsonify({"msg": "Error updating menu", "error": str(e)}), 500
+
+# Deleting a item from the menu
+@api.route('/menu/<restaurant_id>/<product_name>', methods=['DELETE'])
+def delete_menu_item(restaurant_id, product_name):
+    try:
+        # Remove the item document by its key; the deleted count tells whether it existed.
+        # The menu's ETag changes with the set of its items, so nothing else is written.
+        result = menu_items.delete_one(menu_item_filter(restaurant_id, product_name))
+
+        if result.deleted_count > 0:
+            menu_cache.invalidate(str(ObjectId(restaurant_id)))
+            return jsonify({"msg": "Menu item deleted successfully"}), 200
+
+        # Nothing was removed: find out whether the menu itself exists (only on this error path)
+        if not menus.find_one({"restaurant_id": ObjectId(restaurant_id)}, {"_id": 1}):
+            return jsonify({"msg": "Restaurant menu not found"}), 404
+        else:
+            return jsonify({"msg": "Product not found in the menu"}), 404
+
+    except Exception as e:
+        return jsonify({"msg": "Error deleting menu item", "error": str(e)}), 500
+
+# Search menu items of every restaurant by name and description, most relevant first.
+# ?q=<text>&min_price=&max_price=&restaurant_id=&limit=N, and ?after=<next_cursor> for the next page.
+@api.route('/menu/search', methods=['GET'])
+def search_menu():
+    try:
+        params, error = parse_search_args(request.args)
+        if error:
+            return jsonify({"msg": error}), 400
+
+        # Served by the text index on menu_item, which every item write keeps up to date
+        items, next_cursor = split_search_page(list(menu_items.aggregate(search_pipeline(params))), params["limit"])
+        return jsonify({"msg": "Menu items found" if items else "No menu items found",
+                        "items": items, "next_cursor": next_cursor}), 200
+    except Exception as e:
+        return jsonify({"msg": "Error searching menus", "error": str(e)}), 500
+
+# Attach the items of a page of menus, read with one query for the whole page
+def with_menu_items(menu_list):
+    if not menu_list:
+        return menu_list
+    items = menu_items.find(menu_items_filter(menu["restaurant_id"] for menu in menu_list),
+                            {"_id": 0, "version": 0}).sort(MENU_ITEM_SORT)
+    return attach_menu_items(menu_list, items)
+
+# _id and version of the items of a page of menus, which the page's ETag depends on
+def menu_item_versions(menu_list):
+    if not menu_list:
+        return []
+    return menu_items.find(menu_items_filter(menu["restaurant_id"] for menu in menu_list),
+                           MENU_ITEM_VERSION_PROJECTION).sort(MENU_ITEM_SORT)
+
+# Get  All Menu
+@api.route('/menu', methods=['GET'])
+def get_all_menus():
+    try:
+        # Retrieve menus from the collection, paginated or streamed when requested
+        return list_documents(menus, "Menus retrieved successfully", "menus", projection=MENU_LIST_PROJECTION, empty_msg="No menus found", etag=True,
+                              expand=with_menu_items, etag_extra=menu_item_versions)
+
+    except Exception as e:
+        return jsonify({"msg": "Error fetching menus", "error": str(e)}), 500
+
+
+############### Order Section #################################
+# Add a new order
+@api.route('/order/<user_id>/<restaurant_id>', methods=['POST'])
+def add_order(user_id, restaurant_id):
+    try:
+        # Get data from request body
+        data = request.get_json()
+
+        # Validate required fields and prepare the order document
+        order_data, error = build_order(data, user_id, restaurant_id, require_courier=False)
+        if error:
+            return jsonify({"msg": error}), 400
+
+        dispatched = "delivery_person_id" not in order_data
+        if dispatched:
+            unsupported = storage_unsupported("dispatch", "Dispatch is not supported by this storage backend, "
+                                                          "provide delivery_person_id")
+            if unsupported:
+                return unsupported
+            # No courier given: assign the nearest available one to the restaurant
+            location = dispatcher.restaurant_location(order_data["restaurant_id"])
+            if not location:
+                return jsonify({"msg": "Restaurant location not set, provide delivery_person_id"}), 400
+            order_data["_id"] = ObjectId()
+            courier_id = dispatcher.assign(location, order_data["_id"])
+            if not courier_id:
+                response = jsonify({"msg": "No delivery person available nearby"})
+                response.headers['Retry-After'] = '30'
+                return response, 503
+            order_data["delivery_person_id"] = courier_id
+
+        # Insert the order into the database; insert_one adds the generated _id to
+        # order_data, so the document can be returned without reading it back
+        try:
+            orders.insert_one(order_data)
+        except Exception:
+            if dispatched:
+                dispatcher.release(order_data["delivery_person_id"], order_data["_id"])
+            raise
+        order_stats.record_new_order(order_data)
+        publish_order_event("order_created", order_data)
+        if status_writes:
+            status_writes.remember(order_data)
+
+        return jsonify({"msg": "Order added successfully", "order_data": order_data}), 201
+
+    except Exception as e:
+        return jsonify({"msg": "Error adding order", "error": str(e)}), 500
+
+# Add many orders in one request (partner integrations)
+@api.route('/orders/batch', methods=['POST'])
+def add_orders_batch():
+    try:
+        # Validate every order first
+        results, valid_orders, error = build_order_batch(request.get_json())
+        if error:
+            return jsonify({"msg": error}), 400
+
+        # Write all valid orders with a single unordered insert_many
+        failed = {}
+        if valid_orders:
+            try:
+                orders.insert_many([order_data for _, order_data in valid_orders], ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    failed[write_error["index"]] = write_error.get("errmsg", "Write failed")
+
+        for position, (_, order_data) in enumerate(valid_orders):
+            if position not in failed:
+                order_stats.record_new_order(order_data)
+                publish_order_event("order_created", order_data)
+                if status_writes:
+                    status_writes.remember(order_data)
+
+        body, status_code = order_batch_response(results, valid_orders, failed)
+        return jsonify(body), status_code
+
+    except Exception as e:
+        return jsonify({"msg": "Error adding orders", "error": str(e)}), 500
+
+# Change status of order
+@api.route('/order/<order_id>/status', methods=['PUT'])
+def update_order_status(order_id):
+    try:
+        # Get the delivery_person_id and new status from the request body
+        data = request.get_json()
+
+        # Validate the required fields
+        error = validate_status_update(data)
+        if error:
+            return jsonify({"msg": error}), 400
+
+        if status_writes:
+            return update_order_status_write_behind(order_id, data)
+
+        status_filter = order_status_filter(order_id, data)
+        if status_filter:
+            # Update the order status and bump its version (used for ETags) in one call.
+            # The filter only matches when the delivery person is assigned to the order
+            # and the status actually changes. The previous document is returned so the
+            # analytics counters can move the order out of its old status.
+            previous_order = orders.find_one_and_update(
+                status_filter,
+                order_status_update(data),
+                return_document=ReturnDocument.BEFORE
+            )
+
+            if previous_order:
+                updated_order = order_after_status_update(previous_order, data)
+                order_stats.record_status_change(updated_order, previous_order.get("status"))
+                publish_order_event("order_updated", updated_order)
+                if data["status"] in RELEASE_STATUSES:
+                    # The courier can take a new order (only if the dispatcher assigned this one)
+                    dispatcher.release(updated_order["delivery_person_id"], updated_order["_id"])
+                return jsonify({"msg": "Order status updated successfully", "order": updated_order}), 200
+
+        # Nothing was updated: find out why (only on this error path)
+        order = orders.find_one({"_id": ObjectId(order_id)}, {"delivery_person_id": 1})
+
+        if not order:
+            return jsonify({"msg": "Order not found"}), 404
+
+        # Check if the delivery person is valid for this order
+        if str(order["delivery_person_id"]) != data["delivery_person_id"]:
+            return jsonify({"msg": "Unauthorized: You are not assigned to this order"}), 403
+
+        return jsonify({"msg": "No changes made to the order"}), 400
+
+    except Exception as e:
+        return jsonify({"msg": "Error updating order status", "error": str(e)}), 500
+
+# Status update in write-behind mode: checked against and applied to the cached order, then
+# acknowledged with 202 before it is written (status_writes flushes it within ORDER_STATUS_FLUSH_MS).
+# Only a cache miss reads the order from MongoDB.
+def update_order_status_write_behind(order_id, data):
+    if not ObjectId.is_valid(order_id):
+        return jsonify({"msg": "Order not found"}), 404
+    order_id = ObjectId(order_id)
+
+    previous_order, updated_order = status_writes.update_status(order_id, data)
+    if previous_order is None:
+        order = orders.find_one({"_id": order_id})
+        if not order:
+            return jsonify({"msg": "Order not found"}), 404
+        status_writes.remember(order)
+        previous_order, updated_order = status_writes.update_status(order_id, data)
+        if previous_order is None:
+            # Deleted meanwhile
+            return jsonify({"msg": "Order not found"}), 404
+
+    if not updated_order:
+        if str(previous_order.get("delivery_person_id")) != data["delivery_person_id"]:
+            return jsonify({"msg": "Unauthorized: You are not assigned to this order"}), 403
+        return jsonify({"msg": "No changes made to the order"}), 400
+
+    order_stats.record_status_change(updated_order, previous_order.get("status"))
+    publish_order_event("order_updated", updated_order)
+    if data["status"] in RELEASE_STATUSES:
+        dispatcher.release(updated_order["delivery_person_id"], updated_order["_id"])
+    return jsonify({"msg": "Order status update accepted", "order": updated_order}), 202
+
+
+################## Dispatch Section #################
+# Location ping of a delivery person: {"lng": .., "lat": ..}. Pings are buffered and written
+# in bulk, so this route does not touch the database; pings of unknown ids are dropped on flush.
+@api.route('/delivery_person/<delivery_person_id>/location', methods=['PUT'])
+def update_courier_location(delivery_person_id):
+    if not ObjectId.is_valid(delivery_person_id):
+        return jsonify({"msg": "Invalid delivery person ID"}), 400
+    location, error = parse_location(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({"msg": error}), 400
+    courier_locations.record(ObjectId(delivery_person_id), location)
+    return jsonify({"msg": "Location received"}), 202
+
+# Availability of a delivery person: {"available": true|false}, applied at once.
+# The courier must have sent a location first.
+@api.route('/delivery_person/<delivery_person_id>/availability', methods=['PUT'])
+def update_courier_availability(delivery_person_id):
+    try:
+        data = request.get_json(silent=True) or {}
+        if not ObjectId.is_valid(delivery_person_id):
+            return jsonify({"msg": "Invalid delivery person ID"}), 400
+        if not isinstance(data.get("available"), bool):
+            return jsonify({"msg": "Missing or invalid 'available'"}), 400
+        if not dispatcher.set_available(ObjectId(delivery_person_id), data["available"]):
+            return jsonify({"msg": "Delivery person not found"}), 404
+        return jsonify({"msg": "Availability updated", "available": data["available"]}), 200
+    except Exception as e:
+        return jsonify({"msg": "Error updating availability", "error": str(e)}), 500
+
+# Location of a restaurant, used to dispatch its orders: {"lng": .., "lat": ..}
+@api.route('/restaurant/<restaurant_id>/location', methods=['PUT'])
+def update_restaurant_location(restaurant_id):
+    try:
+        if not ObjectId.is_valid(restaurant_id):
+            return jsonify({"msg": "Invalid restaurant ID"}), 400
+        location, error = parse_location(request.get_json(silent=True) or {})
+        if error:
+            return jsonify({"msg": error}), 400
+        if dispatcher.set_restaurant_location(ObjectId(restaurant_id), location):
+            return jsonify({"msg": "Restaurant location updated", "location": location}), 200
+        else:
+            return jsonify({"msg": "Restaurant not found"}), 404
+    except Exception as e:
+        return jsonify({"msg": "Error updating restaurant location", "error": str(e)}), 500
+
+
+################## Order Events Section #################
+# Push order changes to the restaurant and delivery person streams. With the change stream
+# source enabled the events come from MongoDB instead, so they are not published twice.
+def publish_order_event(event_type, order):
+    if order_events.local_publish:
+        order_events.publish(event_type, order)
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {current_app.json.dumps(event['order'])}\n\n"
+
+# Server-Sent Events stream of one channel. A client reconnecting with Last-Event-ID (or
+# ?last_event_id=) first receives the events it missed; if those are no longer buffered it
+# gets a "reset" event and should refetch its order list.
+def order_event_stream(scope, owner_id):
+    if not ObjectId.is_valid(owner_id):
+        return jsonify({"msg": "Invalid id"}), 400
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    subscription, backlog, complete = order_events.subscribe((scope, str(ObjectId(owner_id))), last_event_id)
+    if subscription is None:
+        # All the threads this process may give to streams are taken
+        response = jsonify({"msg": "Too many open event streams, retry later"})
+        response.headers['Retry-After'] = str(int(SSE_HEARTBEAT_SECONDS))
+        return response, 503
+
+    def generate():
+        try:
+            if not complete:
+                yield "event: reset\ndata: {}\n\n"
+            for event in backlog:
+                yield format_sse(event)
+            while True:
+                try:
+                    event = subscription.queue.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                if subscription.overflowed:
+                    # The client is too slow and events were dropped: make it refetch and reconnect
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                yield format_sse(event)
+        finally:
+            order_events.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Order events of a delivery person (created and status changes)
+@api.route('/delivery_person/orders/<delivery_person_id>/events', methods=['GET'])
+def delivery_person_order_events(delivery_person_id):
+    return order_event_stream("delivery_person", delivery_person_id)
+
+# Order events of a restaurant (created and status changes)
+@api.route('/restaurant/orders/<restaurant_id>/events', methods=['GET'])
+def restaurant_order_events(restaurant_id):
+    return order_event_stream("restaurant", restaurant_id)
+
+
+################## Analytics Section #################
+# Revenue, order counts by status and top items of a restaurant or delivery person.
+# ?from=&to= limit the time range (ISO 8601); ?source=counters reads the incrementally
+# maintained daily counters (whole days) instead of running the aggregation pipeline.
+def analytics_response(scope, owner_id):
+    if not ObjectId.is_valid(owner_id):
+        return jsonify({"msg": "Invalid id"}), 400
+
+    start, end, error = parse_time_range(request.args)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    top = request.args.get('top', '10')
+    if not top.isdigit() or not 0 < int(top) <= 100:
+        return jsonify({"msg": "Invalid top, use a number between 1 and 100"}), 400
+
+    source = request.args.get('source', 'live')
+    if source == 'counters':
+        stats = stats_from_counters(db["order_stats"], scope, owner_id, start, end, int(top))
+    elif source == 'live':
+        unsupported = storage_unsupported("live analytics", "Live analytics are not supported by this storage "
+                                                            "backend, use source=counters")
+        if unsupported:
+            return unsupported
+        stats = order_analytics(orders, scope, owner_id, start, end, int(top))
+    else:
+        return jsonify({"msg": "Invalid source, use 'live' or 'counters'"}), 400
+
+    return jsonify({
+        "msg": "Analytics retrieved successfully",
+        SCOPE_FIELDS[scope]: owner_id,
+        "from": start,
+        "to": end,
+        "source": source,
+        "analytics": stats
+    }), 200
+
+@api.route('/analytics/restaurant/<restaurant_id>', methods=['GET'])
+def restaurant_analytics(restaurant_id):
+    try:
+        return analytics_response("restaurant", restaurant_id)
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving analytics", "error": str(e)}), 500
+
+@api.route('/analytics/delivery_person/<delivery_person_id>', methods=['GET'])
+def delivery_person_analytics(delivery_person_id):
+    try:
+        return analytics_response("delivery_person", delivery_person_id)
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving analytics", "error": str(e)}), 500
+
+
+################## Admin Section #################
+# Admin Get all user details
+@api.route('/admin/all_users', methods=['GET'])
+def get_all_users_admin():
+    try:
+        return list_documents(users, "All users retrieved successfully", "users")
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving users", "error": str(e)}), 500
+
+# admin get all restaurant
+@api.route('/admin/all_restaurants', methods=['GET'])
+def get_all_restaurants_admin():
+    try:
+        return list_documents(menus, "All restaurants retrieved successfully", "restaurants", expand=with_menu_items)
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving restaurants", "error": str(e)}), 500
+
+# admin get all orders
+@api.route('/admin/all_orders', methods=['GET'])
+def get_all_orders_admin():
+    try:
+        return list_documents(orders, "All orders retrieved successfully", "orders")
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving orders", "error": str(e)}), 500
+
+# Admin delete user
+@api.route('/admin/user/<user_id>', methods=['DELETE'])
+def admin_delete_user(user_id):
+    try:
+        result = users.delete_one({"_id": ObjectId(user_id)})
+        if result.deleted_count > 0:
+            # Cascade to the user's orders and menu in a background job
+            job_id = job_runner.submit("delete_user_data", {"user_id": ObjectId(user_id)})
+            return jsonify({"msg": "User deleted successfully", "user_id": user_id, "job_id": job_id}), 200
+        else:
+            return jsonify({"msg": "User not found"}), 404
+    except Exception as e:
+        return jsonify({"msg": "Error deleting user", "error": str(e)}), 500
+
+#Admin delete restaurant
+@api.route('/admin/restaurant/<restaurant_id>', methods=['DELETE'])
+def admin_delete_restaurant(restaurant_id):
+    try:
+        # Validate ObjectId
+        if not ObjectId.is_valid(restaurant_id):
+            return jsonify({"msg": "Invalid restaurant ID"}), 400
+        
+        # Convert string to ObjectId
+        restaurant_object_id = ObjectId(restaurant_id)
+        
+        # Delete from users collection (assuming _id matches restaurant_id)
+        user_result = users.delete_one({"_id": restaurant_object_id, "role": "restaurant_owner"})
+        
+        # Delete from menus collection (using restaurant_id reference)
+        menu_result = menus.delete_many({"restaurant_id": restaurant_object_id})
+        menu_cache.invalidate(str(restaurant_object_id))
+        
+        # Check if anything was deleted; the menu items and orders go in a background job
+        if user_result.deleted_count > 0 or menu_result.deleted_count > 0:
+            job_id = job_runner.submit("delete_restaurant_data", {"restaurant_id": restaurant_object_id})
+            return jsonify({
+                "msg": "Restaurant deleted successfully",
+                "user_deleted": user_result.deleted_count,
+                "menu_entries_deleted": menu_result.deleted_count,
+                "restaurant_id": restaurant_id,
+                "job_id": job_id
+            }), 200
+        else:
+            return jsonify({"msg": "Restaurant not found"}), 404
+    except Exception as e:
+        current_app.logger.error(f"Error deleting restaurant: {e}")
+        return jsonify({"msg": "Error deleting restaurant", "error": str(e)}), 500
+
+# Admin delete order
+@api.route('/admin/order/<order_id>', methods=['DELETE'])
+def admin_delete_order(order_id):
+    try:
+        # Get the deleted order back in the same call to take it out of the analytics counters
+        deleted_order = orders.find_one_and_delete({"_id": ObjectId(order_id)})
+        if status_writes:
+            status_writes.forget(ObjectId(order_id))
+        if deleted_order:
+            order_stats.record_deleted_order(deleted_order)
+            if deleted_order.get("delivery_person_id"):
+                dispatcher.release(deleted_order["delivery_person_id"], deleted_order["_id"])
+            return jsonify({"msg": "Order deleted successfully", "order_id": order_id}), 200
+        else:
+            return jsonify({"msg": "Order not found"}), 404
+    except Exception as e:
+        return jsonify({"msg": "Error deleting order", "error": str(e)}), 500
+
+# Admin streaming export of orders as NDJSON (default) or CSV, in _id order.
+# Filters: ?restaurant_id=&delivery_person_id=&status=a,b&from=&to=; ?after=<last exported _id>
+# resumes an interrupted export and ?batch_size= sets the orders fetched per round trip.
+@api.route('/admin/export/orders', methods=['GET'])
+def export_orders_admin():
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"msg": f"Invalid format, use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        query, error = export_query(request.args)
+        if not error:
+            batch_size, error = parse_batch_size(request.args.get('batch_size'))
+        if error:
+            return jsonify({"msg": error}), 400
+
+        cursor = export_cursor(orders, query, batch_size)
+        # A resumed CSV export is appended to the first part, so it gets no header
+        lines = export_lines(cursor, export_format, header='after' not in request.args)
+        return Response(stream_with_context(chunked(lines)), mimetype=EXPORT_FORMATS[export_format],
+                        headers={'Content-Disposition': f'attachment; filename=orders.{export_format}'})
+    except Exception as e:
+        return jsonify({"msg": "Error exporting orders", "error": str(e)}), 500
+
+# Admin job status and progress
+@api.route('/admin/jobs/<job_id>', methods=['GET'])
+def admin_job_status(job_id):
+    try:
+        if not ObjectId.is_valid(job_id):
+            return jsonify({"msg": "Invalid job ID"}), 400
+        job = job_runner.get(job_id)
+        if job:
+            return jsonify({"msg": "Job retrieved successfully", "job": job}), 200
+        else:
+            return jsonify({"msg": "Job not found"}), 404
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving job", "error": str(e)}), 500
+
+# Admin get all jobs
+@api.route('/admin/jobs', methods=['GET'])
+def get_all_jobs_admin():
+    try:
+        return list_documents(jobs, "All jobs retrieved successfully", "jobs")
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving jobs", "error": str(e)}), 500
+
+# Admin query plan audit: explain() every query shape the routes issue
+@api.route('/admin/query_plans', methods=['GET'])
+def admin_query_plans():
+    try:
+        report = audit_query_plans(db)
+        collscans = [entry["query"] for entry in report if entry["collscan"]]
+        return jsonify({"msg": "Query plan audit completed", "plans": report, "collscans": collscans}), 200
+    except Exception as e:
+        return jsonify({"msg": "Error auditing query plans", "error": str(e)}), 500
+
+# Admin menu cache counters
+@api.route('/admin/menu_cache', methods=['GET'])
+def admin_menu_cache_stats():
+    return jsonify({"msg": "Menu cache statistics", "stats": menu_cache.stats()}), 200
+
+# Admin write-behind status update counters: pending updates, flush lag, coalesced updates
+@api.route('/admin/status_writes', methods=['GET'])
+def admin_status_writes_stats():
+    if not status_writes:
+        return jsonify({"msg": "Order status write-behind is disabled"}), 404
+    return jsonify({"msg": "Order status write-behind statistics", "stats": status_writes.stats()}), 200
+
+
+################## Background Jobs #################
+# Cascaded deletes of users and restaurants (see cascade.py)
+cascade = CascadeDeletes(db, order_stats, JOB_BATCH_SIZE, JOB_PAUSE_SECONDS, menu_cache, status_writes)
+cascade.register(job_runner)
+
+
+################## Storage Features #################
+# Server features needed beyond CRUD, indexes and bulk_write: by endpoint for whole routes, by
+# name for the parts of routes (and settings) that check them themselves
+ROUTE_STORAGE_FEATURES = {
+    "api.search_menu": {"aggregate", "text_search"},
+    "api.admin_query_plans": {"explain"},
+    "live analytics": {"aggregate"},
+    "dispatch": {"geo_queries"},
+    "ORDER_EVENTS_CHANGE_STREAM": {"change_streams"},
+}
+
+# Features of a route or part the storage backend lacks
+def missing_storage_features(part):
+    return sorted(ROUTE_STORAGE_FEATURES.get(part, set()) - mongo.features)
+
+# 501 response for a route or part the storage backend cannot serve, or None
+def storage_unsupported(part, msg):
+    missing = missing_storage_features(part)
+    if missing:
+        return jsonify({"msg": msg, "storage_backend": STORAGE_BACKEND, "missing_features": missing}), 501
+    return None
+
+@api.before_app_request
+def require_storage_features():
+    return storage_unsupported(request.endpoint, "This route is not supported by this storage backend")
+
+
+################## CLI Commands #################
+# flask ensure-indexes: create the registered indexes
+@api.cli.command("ensure-indexes")
+def ensure_indexes_command():
+    for collection_name, index_name in ensure_indexes(db, current_app.logger):
+        print(f"{collection_name}: {index_name}")
+
+# flask rebuild-order-stats: recompute the analytics counters from the order collection
+@api.cli.command("rebuild-order-stats")
+def rebuild_order_stats_command():
+    written = order_stats.rebuild(orders)
+    print(f"Rebuilt {written} daily counter documents")
+
+# flask migrate-menu-items: move the menu_items arrays of existing menus into the menu_item collection
+@api.cli.command("migrate-menu-items")
+@click.option("--batch-size", default=1000, help="Items written per bulk_write")
+def migrate_menu_items_command(batch_size):
+    report = migrate_menu_items(menus, menu_items, batch_size)
+    print(f"Migrated {report['items']} items from {report['menus']} menus "
+          f"({report['duplicates']} duplicate product names and {report['skipped']} invalid items skipped)")
+
+# flask export-orders: write orders as NDJSON or CSV to a file (or stdout).
+# With --resume an existing output file is continued after its last complete line.
+@api.cli.command("export-orders")
+@click.option("--format", "export_format", type=click.Choice(list(EXPORT_FORMATS)), default="ndjson")
+@click.option("--output", type=click.Path(dir_okay=False), help="Output file (default: stdout)")
+@click.option("--restaurant-id")
+@click.option("--delivery-person-id")
+@click.option("--status", help="Comma separated statuses")
+@click.option("--from", "start", help="ISO 8601 creation time, inclusive")
+@click.option("--to", "end", help="ISO 8601 creation time, exclusive")
+@click.option("--after", help="Export orders after this _id")
+@click.option("--resume", is_flag=True, help="Continue the output file after its last exported order")
+@click.option("--batch-size", default=None, help="Orders fetched per round trip")
+def export_orders_command(export_format, output, restaurant_id, delivery_person_id, status, start, end, after,
+                          resume, batch_size):
+    if resume:
+        if not output:
+            raise click.UsageError("--resume needs --output")
+        after = resume_point(output, export_format) or after
+
+    query, error = export_query({"restaurant_id": restaurant_id, "delivery_person_id": delivery_person_id,
+                                 "status": status, "from": start, "to": end, "after": after})
+    if not error:
+        batch_size, error = parse_batch_size(batch_size)
+    if error:
+        raise click.UsageError(error)
+
+    appending = bool(resume and output and os.path.exists(output) and os.path.getsize(output))
+    lines = export_lines(export_cursor(orders, query, batch_size), export_format, header=not appending)
+    with click.open_file(output or "-", "a" if appending else "w") as destination:
+        for chunk in chunked(lines):
+            destination.write(chunk)
+
+# flask audit-indexes: report the plan of every query shape, exit 1 if any is a COLLSCAN
+@api.cli.command("audit-indexes")
+def audit_indexes_command():
+    report = audit_query_plans(db)
+    for entry in report:
+        flag = "COLLSCAN" if entry["collscan"] else "ok"
+        print(f"[{flag}] {entry['collection']}: {entry['query']} ({' -> '.join(entry['stages'])})")
+    if any(entry["collscan"] for entry in report):
+        raise SystemExit(1)
+
+
+################## App Factory #################
+# Build the Flask app. config may override MONGO_URI, MONGO_DB_NAME and MONGO_CLIENT_OPTIONS
+# (MongoClient keyword arguments); the client itself is only created on first use.
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.update(MONGO_URI=MONGO_URI, MONGO_DB_NAME=MONGO_DB_NAME, MONGO_CLIENT_OPTIONS=mongo.client_options)
+    app.config.update(config or {})
+    if config:
+        mongo.configure(app.config["MONGO_URI"], app.config["MONGO_DB_NAME"], **app.config["MONGO_CLIENT_OPTIONS"])
+
+    unsupported = {part: missing_storage_features(part) for part in ROUTE_STORAGE_FEATURES}
+    unsupported = {part: missing for part, missing in unsupported.items() if missing}
+    if unsupported:
+        app.logger.warning(f"STORAGE_BACKEND={STORAGE_BACKEND} lacks features, these routes answer 501: " +
+                           "; ".join(f"{part} ({', '.join(missing)})" for part, missing in unsupported.items()))
+
+    # Encode ObjectId, datetime and Decimal128 values in responses
+    app.json = BSONJSONProvider(app)
+    app.register_blueprint(api)
+    if TRUSTED_PROXY_HOPS:
+        # remote_addr becomes the client address reported by the trusted proxies
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+    return app
+
+
+# Start the Flask app; `flask --app app` and `gunicorn "app:create_app()"` call the factory themselves
+if __name__ == "__main__":
+    print("Starting the server...")
+    create_app().run(debug=True)
@@ -0,0 +1,590 @@
+# Async serving mode: the users, menu, order and admin routes of app.py served from an
+# ASGI app on the Motor driver, so one process can keep many slow MongoDB calls in flight.
+# Run with: uvicorn asgi:app --workers 1
+# Validation and serialization are shared with the sync app (validation.py, json_provider.py).
+#
+# Deleting a user or a restaurant starts the same background jobs as app.py (cascade.py), run
+# on a small sync client by this process's job runner, and indexes are created by indexes.py.
+#
+# Differences from app.py:
+# - GET /menu/<id> has no ETag or in-process menu cache, so it always reads MongoDB.
+# - Not served here: order event streams, dispatch and courier locations, analytics, export,
+#   the job list and /health routes, admission control and write-behind status updates.
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from analytics import OrderStatsCounter
+from cascade import CascadeDeletes
+from indexes import ensure_indexes
+from jobs import JobRunner
+from json_provider import dumps
+from order_query import order_list_query
+from menu_store import (MENU_ITEM_PROJECTION, MENU_ITEM_SORT, attach_menu_items, menu_items_filter, parse_search_args,
+                        search_pipeline, split_search_page)
+from validation import (build_menu_item, build_order, build_order_batch, menu_item_filter, menu_item_update,
+                        menu_item_upsert, menu_register, order_batch_response, order_after_status_update, order_status_filter, order_status_update, page_query,
+                        parse_page_args, split_page,
+                        user_update_filter, validate_registration, validate_status_update)
+
+# Load environment variables from .env file
+load_dotenv()
+
+# MongoDB connection
+MONGO_URI = os.getenv('MONGO_URI')
+MONGO_DB_NAME = os.getenv('MONGO_DB_NAME', 'FoodDeliveryApp')
+
+# Connections the async client may open; each in-flight query holds one
+ASYNC_MONGO_MAX_POOL_SIZE = int(os.getenv('ASYNC_MONGO_MAX_POOL_SIZE', 500))
+
+# Number of documents Motor fetches per round trip while streaming
+STREAM_BATCH_SIZE = 500
+
+# Fields returned by GET /menu for each menu
+MENU_LIST_PROJECTION = {"restaurant_id": 1}
+
+# The Motor client connects lazily on first use, inside the server's event loop
+client = AsyncIOMotorClient(MONGO_URI, maxPoolSize=ASYNC_MONGO_MAX_POOL_SIZE)
+db = client[MONGO_DB_NAME]
+users = db["user"]
+menus = db["menu"]
+menu_items = db["menu_item"]
+orders = db["order"]
+
+logger = logging.getLogger(__name__)
+
+# Background jobs, same settings as in app.py: worker threads, documents deleted per round trip,
+# pause between two of them and seconds without a heartbeat before a job is taken over
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', 500))
+JOB_PAUSE_SECONDS = float(os.getenv('JOB_PAUSE_SECONDS', 0.05))
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', 300))
+
+# The analytics counters, the jobs and the index builds run in threads, so they use a small sync client
+sync_db = MongoClient(MONGO_URI, maxPoolSize=JOB_WORKERS + 2, connect=False)[MONGO_DB_NAME]
+
+ORDER_STATS_FLUSH_SECONDS = float(os.getenv('ORDER_STATS_FLUSH_SECONDS', 1))
+order_stats = OrderStatsCounter(sync_db["order_stats"], ORDER_STATS_FLUSH_SECONDS)
+order_stats.logger = logger
+
+job_runner = JobRunner(sync_db["job"], JOB_WORKERS, logger, JOB_LEASE_SECONDS)
+CascadeDeletes(sync_db, order_stats, JOB_BATCH_SIZE, JOB_PAUSE_SECONDS).register(job_runner)
+
+
+###################### Helpers #######################
+def jsonify(payload, status=200):
+    return Response(dumps(payload), status_code=status, media_type='application/json')
+
+# Request body as JSON, or None when it is missing or malformed
+async def get_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+def invalid_body():
+    return jsonify({"msg": "Request body must be valid JSON"}, 400)
+
+# Stream a list response chunk by chunk from the Motor cursor
+async def stream_documents(cursor, msg, key, limit):
+    yield '{"msg": %s, "%s": [' % (dumps(msg), key)
+    count = 0
+    last_id = None
+    next_cursor = None
+    async for document in cursor:
+        if limit is not None and count == limit:
+            # One extra document was fetched, so there is another page
+            next_cursor = str(last_id)
+            break
+        last_id = document["_id"]
+        yield (", " if count else "") + dumps(document)
+        count += 1
+    if limit is None:
+        yield ']}'
+    else:
+        yield '], "next_cursor": %s}' % dumps(next_cursor)
+
+# Documents of a cursor, passed through expand one batch of STREAM_BATCH_SIZE at a time
+async def expand_batches(cursor, expand):
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) == STREAM_BATCH_SIZE:
+            for expanded in await expand(batch):
+                yield expanded
+            batch = []
+    if batch:
+        for expanded in await expand(batch):
+            yield expanded
+
+# Shared handler for the bulk list endpoints, same parameters as in app.py
+async def list_documents(request, collection, msg, key, query=None, projection=None, empty_msg=None, expand=None,
+                         direction=1):
+    after, limit, stream, error = parse_page_args(request.query_params)
+    if error:
+        return jsonify({"msg": error}, 400)
+
+    cursor = collection.find(page_query(query or {}, after, direction), projection).sort("_id", direction)
+    if limit is not None:
+        # Fetch one extra document to know whether a next page exists
+        cursor = cursor.limit(limit + 1)
+
+    if stream:
+        cursor = cursor.batch_size(STREAM_BATCH_SIZE)
+        if expand:
+            cursor = expand_batches(cursor, expand)
+        return StreamingResponse(stream_documents(cursor, msg, key, limit), media_type='application/json')
+
+    documents = await cursor.to_list(length=None)
+    if not documents and empty_msg and after is None:
+        return jsonify({"msg": empty_msg}, 404)
+
+    response = {"msg": msg}
+    documents, next_cursor = split_page(documents, limit)
+    if expand:
+        documents = await expand(documents)
+    if limit is not None:
+        response["next_cursor"] = next_cursor
+    response[key] = documents
+    return jsonify(response)
+
+
+###################### User Section #######################
+async def welcome(request):
+    return jsonify({"msg": "Welcome to the Food Delivery App"})
+
+async def register_user(request):
+    data = await get_json(request)
+    if not isinstance(data, dict):
+        return invalid_body()
+
+    error = validate_registration(data)
+    if error:
+        return jsonify({"msg": error}, 400)
+
+    try:
+        # The unique email index rejects duplicates; insert_one adds the generated _id to data
+        await users.insert_one(data)
+        return jsonify({"msg": "User registered successfully", "user_data": data}, 201)
+    except DuplicateKeyError:
+        return jsonify({"msg": "User with this email already exists"}, 400)
+    except Exception as e:
+        return jsonify({"msg": "Error registering user", "error": str(e)}, 500)
+
+async def update_user(request):
+    data = await get_json(request)
+    try:
+        if not data:
+            return jsonify({"msg": "No changes made to the user"}, 400)
+
+        updated_user = await users.find_one_and_update(
+            user_update_filter(request.path_params['user_id'], data),
+            {"$set": data},
+            return_document=ReturnDocument.AFTER
+        )
+
+        if updated_user:
+            return jsonify({"msg": "User updated successfully", "user_data": updated_user})
+        else:
+            return jsonify({"msg": "No changes made to the user"}, 400)
+
+    except Exception as e:
+        return jsonify({"msg": "Error updating user", "error": str(e)}, 500)
+
+async def get_all_users(request):
+    try:
+        return await list_documents(request, users, "Users retrieved successfully", "users")
+    except Exception as e:
+        return jsonify({"msg": "Error fetching users", "error": str(e)}, 500)
+
+async def delete_user(request):
+    user_id = request.path_params['user_id']
+    try:
+        result = await users.delete_one({"_id": ObjectId(user_id)})
+        # Their orders and menu are deleted in the background
+        if result.deleted_count > 0:
+            job_id = await run_in_threadpool(job_runner.submit, "delete_user_data", {"user_id": ObjectId(user_id)})
+            return jsonify({"msg": "User deleted successfully", "user_id": user_id, "job_id": job_id})
+        else:
+            return jsonify({"msg": "User not found", "user_id": user_id}, 404)
+    except Exception as e:
+        return jsonify({"msg": "Error deleting user", "error": str(e)}, 500)
+
+async def login(request):
+    data = await get_json(request) or {}
+    user = await users.find_one({"email": data.get("email"), "password": data.get("password")})
+    if user:
+        return jsonify({"msg": "Login successful", "user_id": user["_id"], "role": user["role"]})
+    return jsonify({"msg": "Invalid credentials"}, 401)
+
+# Serves both /restaurant/orders/<id> and /restaurant_specific/orders/<id>, same filters as in app.py
+async def get_restaurant_orders(request, active=False):
+    try:
+        order_query, direction, error = order_list_query(request.query_params, "restaurant_id",
+                                                         request.path_params['restaurant_id'], active)
+        if error:
+            return jsonify({"msg": error}, 400)
+
+        return await list_documents(request, orders, "Orders retrieved successfully", "orders", query=order_query,
+                                    empty_msg="No orders found for this restaurant", direction=direction)
+
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving orders", "error": str(e)}, 500)
+
+async def get_active_restaurant_orders(request):
+    return await get_restaurant_orders(request, active=True)
+
+async def get_delivery_person_orders(request):
+    try:
+        order_query, direction, error = order_list_query(request.query_params, "delivery_person_id",
+                                                         request.path_params['delivery_person_id'])
+        if error:
+            return jsonify({'error': error}, 400)
+
+        orders_list = await orders.find(order_query).sort("_id", direction).to_list(length=None)
+
+        if not orders_list:
+            return jsonify({'message': 'No orders found for this delivery person.'}, 404)
+
+        for order in orders_list:
+            order.setdefault("menu_detail", [])
+
+        return jsonify({'orders': orders_list})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+
+####### Menu API Section #################################
+async def add_menu(request):
+    restaurant_id = request.path_params['restaurant_id']
+    data = await get_json(request)
+    if not isinstance(data, dict):
+        return invalid_body()
+
+    new_menu_item, error = build_menu_item(data)
+    if error:
+        return jsonify({"msg": error}, 400)
+
+    try:
+        item_filter, item_update = menu_item_upsert(restaurant_id, new_menu_item)
+        result = await menu_items.update_one(item_filter, item_update, upsert=True)
+        if result.upserted_id is None:
+            return jsonify({"msg": "Menu item added successfully to existing menu"})
+
+        menu_filter, menu_update = menu_register(restaurant_id)
+        result = await menus.update_one(menu_filter, menu_update, upsert=True)
+        if result.upserted_id is None:
+            return jsonify({"msg": "Menu item added successfully to existing menu"})
+        else:
+            return jsonify({"msg": "New menu created and item added successfully"}, 201)
+
+    except Exception as e:
+        return jsonify({"msg": "Error adding menu item", "error": str(e)}, 500)
+
+async def get_menu(request):
+    try:
+        restaurant_id = ObjectId(request.path_params['restaurant_id'])
+        items = await menu_items.find({"restaurant_id": restaurant_id}, MENU_ITEM_PROJECTION).sort(MENU_ITEM_SORT).to_list(length=None)
+
+        if items or await menus.find_one({"restaurant_id": restaurant_id}, {"_id": 1}):
+            return jsonify({"msg": "Menu retrieved successfully", "menu": items})
+        else:
+            return jsonify({"msg": "No menu found for the given restaurant_id"}, 404)
+
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving menu", "error": str(e)}, 500)
+
+async def update_menu(request):
+    restaurant_id = request.path_params['restaurant_id']
+    data = await get_json(request)
+    if not isinstance(data, dict):
+        return invalid_body()
+
+    try:
+        if not data.get('product_name'):
+            return jsonify({"msg": "Product name is required"}, 400)
+
+        menu_filter, menu_update = menu_item_update(restaurant_id, data)
+
+        if menu_update:
+            result = await menu_items.update_one(menu_filter, menu_update)
+            if result.modified_count > 0:
+                return jsonify({"msg": "Menu item updated successfully"})
+
+        # Nothing was updated: find out why (only on this error path)
+        if await menu_items.find_one(menu_item_filter(restaurant_id, data['product_name']), {"_id": 1}):
+            return jsonify({"msg": "No changes made to the product"}, 400)
+        elif not await menus.find_one({"restaurant_id": ObjectId(restaurant_id)}, {"_id": 1}):
+            return jsonify({"msg": "Restaurant menu not found"}, 404)
+        else:
+            return jsonify({"msg": "Product not found in the menu"}, 404)
+
+    except Exception as e:
+        return jsonify({"msg": "Error updating menu", "error": str(e)}, 500)
+
+async def delete_menu_item(request):
+    restaurant_id = request.path_params['restaurant_id']
+    product_name = request.path_params['product_name']
+    try:
+        result = await menu_items.delete_one(menu_item_filter(restaurant_id, product_name))
+
+        if result.deleted_count > 0:
+            return jsonify({"msg": "Menu item deleted successfully"})
+
+        if not await menus.find_one({"restaurant_id": ObjectId(restaurant_id)}, {"_id": 1}):
+            return jsonify({"msg": "Restaurant menu not found"}, 404)
+        else:
+            return jsonify({"msg": "Product not found in the menu"}, 404)
+
+    except Exception as e:
+        return jsonify({"msg": "Error deleting menu item", "error": str(e)}, 500)
+
+async def search_menu(request):
+    try:
+        params, error = parse_search_args(request.query_params)
+        if error:
+            return jsonify({"msg": error}, 400)
+
+        items = await menu_items.aggregate(search_pipeline(params)).to_list(length=None)
+        items, next_cursor = split_search_page(items, params["limit"])
+        return jsonify({"msg": "Menu items found" if items else "No menu items found",
+                        "items": items, "next_cursor": next_cursor})
+    except Exception as e:
+        return jsonify({"msg": "Error searching menus", "error": str(e)}, 500)
+
+# Attach the items of a page of menus, read with one query for the whole page
+async def with_menu_items(menu_list):
+    if not menu_list:
+        return menu_list
+    items = await menu_items.find(menu_items_filter(menu["restaurant_id"] for menu in menu_list),
+                                  {"_id": 0, "version": 0}).sort(MENU_ITEM_SORT).to_list(length=None)
+    return attach_menu_items(menu_list, items)
+
+async def get_all_menus(request):
+    try:
+        return await list_documents(request, menus, "Menus retrieved successfully", "menus",
+                                    projection=MENU_LIST_PROJECTION, empty_msg="No menus found", expand=with_menu_items)
+    except Exception as e:
+        return jsonify({"msg": "Error fetching menus", "error": str(e)}, 500)
+
+
+############### Order Section #################################
+async def add_order(request):
+    try:
+        data = await get_json(request)
+        if not isinstance(data, dict):
+            return invalid_body()
+
+        order_data, error = build_order(data, request.path_params['user_id'], request.path_params['restaurant_id'])
+        if error:
+            return jsonify({"msg": error}, 400)
+
+        await orders.insert_one(order_data)
+        order_stats.record_new_order(order_data)
+        return jsonify({"msg": "Order added successfully", "order_data": order_data}, 201)
+
+    except Exception as e:
+        return jsonify({"msg": "Error adding order", "error": str(e)}, 500)
+
+async def add_orders_batch(request):
+    try:
+        results, valid_orders, error = build_order_batch(await get_json(request))
+        if error:
+            return jsonify({"msg": error}, 400)
+
+        failed = {}
+        if valid_orders:
+            try:
+                await orders.insert_many([order_data for _, order_data in valid_orders], ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    failed[write_error["index"]] = write_error.get("errmsg", "Write failed")
+
+        for position, (_, order_data) in enumerate(valid_orders):
+            if position not in failed:
+                order_stats.record_new_order(order_data)
+
+        body, status_code = order_batch_response(results, valid_orders, failed)
+        return jsonify(body, status_code)
+
+    except Exception as e:
+        return jsonify({"msg": "Error adding orders", "error": str(e)}, 500)
+
+async def update_order_status(request):
+    order_id = request.path_params['order_id']
+    try:
+        data = await get_json(request)
+        if not isinstance(data, dict):
+            return invalid_body()
+
+        error = validate_status_update(data)
+        if error:
+            return jsonify({"msg": error}, 400)
+
+        status_filter = order_status_filter(order_id, data)
+        if status_filter:
+            previous_order = await orders.find_one_and_update(
+                status_filter,
+                order_status_update(data),
+                return_document=ReturnDocument.BEFORE
+            )
+            if previous_order:
+                updated_order = order_after_status_update(previous_order, data)
+                order_stats.record_status_change(updated_order, previous_order.get("status"))
+                return jsonify({"msg": "Order status updated successfully", "order": updated_order})
+
+        # Nothing was updated: find out why (only on this error path)
+        order = await orders.find_one({"_id": ObjectId(order_id)}, {"delivery_person_id": 1})
+
+        if not order:
+            return jsonify({"msg": "Order not found"}, 404)
+
+        if str(order["delivery_person_id"]) != data["delivery_person_id"]:
+            return jsonify({"msg": "Unauthorized: You are not assigned to this order"}, 403)
+
+        return jsonify({"msg": "No changes made to the order"}, 400)
+
+    except Exception as e:
+        return jsonify({"msg": "Error updating order status", "error": str(e)}, 500)
+
+
+################## Admin Section #################
+async def get_all_users_admin(request):
+    try:
+        return await list_documents(request, users, "All users retrieved successfully", "users")
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving users", "error": str(e)}, 500)
+
+async def get_all_restaurants_admin(request):
+    try:
+        return await list_documents(request, menus, "All restaurants retrieved successfully", "restaurants",
+                                    expand=with_menu_items)
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving restaurants", "error": str(e)}, 500)
+
+async def get_all_orders_admin(request):
+    try:
+        return await list_documents(request, orders, "All orders retrieved successfully", "orders")
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving orders", "error": str(e)}, 500)
+
+async def admin_delete_user(request):
+    user_id = request.path_params['user_id']
+    try:
+        result = await users.delete_one({"_id": ObjectId(user_id)})
+        if result.deleted_count > 0:
+            # Cascade to the user's orders and menu in a background job
+            job_id = await run_in_threadpool(job_runner.submit, "delete_user_data", {"user_id": ObjectId(user_id)})
+            return jsonify({"msg": "User deleted successfully", "user_id": user_id, "job_id": job_id})
+        else:
+            return jsonify({"msg": "User not found"}, 404)
+    except Exception as e:
+        return jsonify({"msg": "Error deleting user", "error": str(e)}, 500)
+
+async def admin_delete_restaurant(request):
+    restaurant_id = request.path_params['restaurant_id']
+    try:
+        if not ObjectId.is_valid(restaurant_id):
+            return jsonify({"msg": "Invalid restaurant ID"}, 400)
+
+        restaurant_object_id = ObjectId(restaurant_id)
+        user_result = await users.delete_one({"_id": restaurant_object_id, "role": "restaurant_owner"})
+        menu_result = await menus.delete_many({"restaurant_id": restaurant_object_id})
+
+        # The menu items and orders go in a background job
+        if user_result.deleted_count > 0 or menu_result.deleted_count > 0:
+            job_id = await run_in_threadpool(job_runner.submit, "delete_restaurant_data",
+                                             {"restaurant_id": restaurant_object_id})
+            return jsonify({
+                "msg": "Restaurant deleted successfully",
+                "user_deleted": user_result.deleted_count,
+                "menu_entries_deleted": menu_result.deleted_count,
+                "restaurant_id": restaurant_id,
+                "job_id": job_id
+            })
+        else:
+            return jsonify({"msg": "Restaurant not found"}, 404)
+    except Exception as e:
+        logger.error(f"Error deleting restaurant: {e}")
+        return jsonify({"msg": "Error deleting restaurant", "error": str(e)}, 500)
+
+async def admin_delete_order(request):
+    order_id = request.path_params['order_id']
+    try:
+        deleted_order = await orders.find_one_and_delete({"_id": ObjectId(order_id)})
+        if deleted_order:
+            order_stats.record_deleted_order(deleted_order)
+            return jsonify({"msg": "Order deleted successfully", "order_id": order_id})
+        else:
+            return jsonify({"msg": "Order not found"}, 404)
+    except Exception as e:
+        return jsonify({"msg": "Error deleting order", "error": str(e)}, 500)
+
+async def admin_job_status(request):
+    job_id = request.path_params['job_id']
+    try:
+        if not ObjectId.is_valid(job_id):
+            return jsonify({"msg": "Invalid job ID"}, 400)
+        job = await db["job"].find_one({"_id": ObjectId(job_id)})
+        if job:
+            return jsonify({"msg": "Job retrieved successfully", "job": job})
+        else:
+            return jsonify({"msg": "Job not found"}, 404)
+    except Exception as e:
+        return jsonify({"msg": "Error retrieving job", "error": str(e)}, 500)
+
+
+################## Startup #################
+routes = [
+    Route('/', welcome, methods=['GET']),
+    Route('/register', register_user, methods=['POST']),
+    Route('/users/{user_id}', update_user, methods=['PUT']),
+    Route('/restaurant/orders/{restaurant_id}', get_restaurant_orders, methods=['GET']),
+    Route('/restaurant/orders/{restaurant_id}/active', get_active_restaurant_orders, methods=['GET']),
+    Route('/users', get_all_users, methods=['GET']),
+    Route('/users/{user_id}', delete_user, methods=['DELETE']),
+    Route('/login', login, methods=['POST']),
+    Route('/restaurant_specific/orders/{restaurant_id}', get_restaurant_orders, methods=['GET']),
+    Route('/delivery_person/orders/{delivery_person_id}', get_delivery_person_orders, methods=['GET']),
+    # Before /menu/{restaurant_id}, which would also match it
+    Route('/menu/search', search_menu, methods=['GET']),
+    Route('/menu/{restaurant_id}', add_menu, methods=['POST']),
+    Route('/menu/{restaurant_id}', get_menu, methods=['GET']),
+    Route('/menu/{restaurant_id}', update_menu, methods=['PUT']),
+    Route('/menu/{restaurant_id}/{product_name}', delete_menu_item, methods=['DELETE']),
+    Route('/menu', get_all_menus, methods=['GET']),
+    Route('/order/{user_id}/{restaurant_id}', add_order, methods=['POST']),
+    Route('/orders/batch', add_orders_batch, methods=['POST']),
+    Route('/order/{order_id}/status', update_order_status, methods=['PUT']),
+    Route('/admin/all_users', get_all_users_admin, methods=['GET']),
+    Route('/admin/all_restaurants', get_all_restaurants_admin, methods=['GET']),
+    Route('/admin/all_orders', get_all_orders_admin, methods=['GET']),
+    Route('/admin/user/{user_id}', admin_delete_user, methods=['DELETE']),
+    Route('/admin/restaurant/{restaurant_id}', admin_delete_restaurant, methods=['DELETE']),
+    Route('/admin/order/{order_id}', admin_delete_order, methods=['DELETE']),
+    Route('/admin/jobs/{job_id}', admin_job_status, methods=['GET']),
+]
+
+# Startup and shutdown of the server process
+@asynccontextmanager
+async def lifespan(app):
+    # Create the registered indexes (idempotent); a missing unique index stops the startup
+    await run_in_threadpool(ensure_indexes, sync_db, logger)
+    order_stats.start()
+    # Also resumes the jobs of processes that stopped before finishing them
+    job_runner.start()
+    yield
+    order_stats.stop()
+
+app = Starlette(routes=routes, lifespan=lifespan)
@@ -0,0 +1,163 @@
+# Benchmark of nearest-courier dispatch (dispatch.py) at 10k+ couriers.
+#
+# Needs a real mongod: the 2dsphere index and $nearSphere are not available in mongomock.
+# Seeds couriers spread over a city, then measures:
+#   - assignment latency (nearest available courier claimed for an order), sequential and
+#     with concurrent dispatchers, checking that no courier is ever given two orders
+#   - location ping ingestion: buffering rate and the bulk flush of one ping per courier
+#
+#   python benchmarks/bench_dispatch.py --couriers 20000 --output dispatch.json
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routes import summarize
+from dispatch import CourierLocationBuffer, Dispatcher, point
+from indexes import INDEXES
+
+# Center of the seeded city and its half width in degrees (about 20 km across)
+CITY_CENTER = (-73.98, 40.75)
+CITY_SPAN = 0.1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="FoodDeliveryApp_bench")
+    parser.add_argument("--couriers", type=int, default=20000)
+    parser.add_argument("--available", type=float, default=0.5, help="share of couriers available")
+    parser.add_argument("--restaurants", type=int, default=500)
+    parser.add_argument("--assignments", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-distance", type=float, default=5000, help="meters")
+    parser.add_argument("--pings", type=int, default=100000, help="location pings buffered")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def random_point(rng):
+    return point(CITY_CENTER[0] + rng.uniform(-CITY_SPAN, CITY_SPAN), CITY_CENTER[1] + rng.uniform(-CITY_SPAN, CITY_SPAN))
+
+def seed_couriers(db, count, available, rng):
+    db["courier"].delete_many({})
+    for collection_name, keys, options in INDEXES:
+        if collection_name == "courier":
+            db["courier"].create_index(keys, **options)
+    courier_ids = [ObjectId() for _ in range(count)]
+    now = datetime.now(timezone.utc)
+    documents = [{"_id": courier_id, "location": random_point(rng), "available": rng.random() < available,
+                  "location_updated_at": now} for courier_id in courier_ids]
+    for start in range(0, len(documents), 5000):
+        db["courier"].insert_many(documents[start:start + 5000])
+    # Location pings are only written for users with the delivery_personnel role
+    db["user"].delete_many({"role": "delivery_personnel"})
+    users = [{"_id": courier_id, "role": "delivery_personnel"} for courier_id in courier_ids]
+    for start in range(0, len(users), 5000):
+        db["user"].insert_many(users[start:start + 5000])
+    return courier_ids
+
+
+# Assign one order per restaurant location; every claimed courier is released right away
+# (outside the timing) so the available share stays constant
+def run_assignments(dispatcher, locations, count, concurrency):
+    def one(i):
+        order_id = ObjectId()
+        begin = time.perf_counter()
+        courier_id = dispatcher.assign(locations[i % len(locations)], order_id)
+        latency = time.perf_counter() - begin
+        return latency, courier_id, order_id
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(count)))
+    elapsed = time.perf_counter() - started
+
+    # A courier claimed twice while still holding an order would be a double assignment
+    claimed = Counter(courier_id for _, courier_id, _ in results if courier_id)
+    double_assigned = sum(1 for count in claimed.values() if count > 1)
+    for _, courier_id, order_id in results:
+        if courier_id:
+            dispatcher.release(courier_id, order_id)
+
+    latencies = [latency for latency, _, _ in results]
+    statuses = [200 if courier_id else 503 for _, courier_id, _ in results]
+    result = summarize(latencies, statuses, elapsed)
+    result["double_assigned"] = double_assigned
+    return result
+
+
+def run_pings(db, courier_ids, count, rng):
+    buffer = CourierLocationBuffer(db["courier"], db["user"])
+    started = time.perf_counter()
+    for i in range(count):
+        buffer.record(courier_ids[i % len(courier_ids)], random_point(rng))
+    record_elapsed = time.perf_counter() - started
+    pending = buffer.pending()
+
+    started = time.perf_counter()
+    written = buffer.flush()
+    flush_elapsed = time.perf_counter() - started
+    return {
+        "pings": count,
+        "record_rate_per_s": round(count / record_elapsed, 1),
+        "coalesced_to": pending,
+        "flush_written": written,
+        "flush_ms": round(flush_elapsed * 1000, 3),
+        "flush_rate_per_s": round(written / flush_elapsed, 1) if flush_elapsed else None,
+    }
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    db = MongoClient(args.mongo_uri)[args.db_name]
+
+    seed_started = time.perf_counter()
+    courier_ids = seed_couriers(db, args.couriers, args.available, rng)
+    print(f"Seeded {args.couriers} couriers in {time.perf_counter() - seed_started:.1f}s")
+
+    dispatcher = Dispatcher(db["courier"], db["user"], args.max_distance)
+    locations = [random_point(rng) for _ in range(args.restaurants)]
+
+    results = {}
+    for name, concurrency in (("assign sequential", 1), ("assign concurrent", args.concurrency)):
+        results[name] = run_assignments(dispatcher, locations, args.assignments, concurrency)
+        result = results[name]
+        print(f"{name:20} {result['throughput_rps']:9.1f} /s  p50 {result['p50_ms']:8.2f}  "
+              f"p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} ms  "
+              f"unassigned {result['statuses'].get('503', 0)}  double assigned {result['double_assigned']}")
+
+    results["location pings"] = run_pings(db, courier_ids, args.pings, rng)
+    pings = results["location pings"]
+    print(f"{'location pings':20} {pings['record_rate_per_s']:9.1f} /s buffered, "
+          f"{pings['flush_written']} couriers flushed in {pings['flush_ms']:.1f} ms")
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
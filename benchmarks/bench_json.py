@@ -0,0 +1,96 @@
+# Micro-benchmark: per-route ObjectId stringification loops vs the BSON-aware JSON provider.
+# Bodies are encoded through provider.response(), which is what jsonify() calls in the routes.
+# Usage: python benchmarks/bench_json.py [--orders 10000] [--repeat 5]
+import argparse
+import copy
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from json_provider import BSONJSONProvider, orjson
+
+
+# Orders shaped like the documents add_order stores
+def make_orders(count):
+    restaurant_ids = [ObjectId() for _ in range(50)]
+    delivery_person_ids = [ObjectId() for _ in range(200)]
+    return [{
+        "_id": ObjectId(),
+        "user_id": ObjectId(),
+        "restaurant_id": restaurant_ids[i % len(restaurant_ids)],
+        "delivery_person_id": delivery_person_ids[i % len(delivery_person_ids)],
+        "status": "pending",
+        "menu_detail": [{"product_name": f"Dish {i % 40}", "quantity": 1 + i % 3}],
+        "total_price": 10 + i % 25,
+        "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "version": 1
+    } for i in range(count)]
+
+
+# What the routes did before: convert every ObjectId field by hand, then dump
+def legacy_encode(provider, documents):
+    for order in documents:
+        order["_id"] = str(order["_id"])
+        order["user_id"] = str(order["user_id"])
+        order["restaurant_id"] = str(order["restaurant_id"])
+        order["delivery_person_id"] = str(order["delivery_person_id"])
+        order["created_at"] = order["created_at"].isoformat()
+    return provider.response({"msg": "All orders retrieved successfully", "orders": documents}).get_data()
+
+
+def provider_encode(provider, documents):
+    return provider.response({"msg": "All orders retrieved successfully", "orders": documents}).get_data()
+
+
+# Best time of several runs; each run gets a fresh copy because the legacy loop mutates
+def best_time(encode, provider, orders, repeat):
+    best = None
+    for _ in range(repeat):
+        documents = copy.deepcopy(orders)
+        start = time.perf_counter()
+        encode(provider, documents)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask("bench_json")
+    orders = make_orders(args.orders)
+
+    stdlib_provider = BSONJSONProvider(app)
+    stdlib_provider.use_orjson = False
+
+    cases = [
+        ("legacy str() loops + json", legacy_encode, DefaultJSONProvider(app)),
+        ("BSON provider, json backend", provider_encode, stdlib_provider),
+    ]
+    if orjson is not None:
+        orjson_provider = BSONJSONProvider(app)
+        orjson_provider.use_orjson = True
+        cases.append(("BSON provider, orjson backend", provider_encode, orjson_provider))
+    else:
+        print("orjson is not installed, skipping the fast-path backend")
+
+    baseline = None
+    print(f"{args.orders} orders, best of {args.repeat} runs")
+    for name, encode, provider in cases:
+        elapsed = best_time(encode, provider, orders, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{name:32} {elapsed * 1000:9.2f} ms  {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
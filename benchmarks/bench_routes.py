@@ -0,0 +1,305 @@
+# Load test / benchmark for every route of app.py.
+#
+# Seeds a stand-in database (mongomock, a local mongod with --backend mongod, or the in-process
+# store of memory_store.py with --backend memory), then drives each route through the Flask test
+# client and/or over HTTP and reports throughput and p50/p95/p99 latency per endpoint. Results
+# are written as JSON so runs can be compared, also across backends:
+#
+#   python benchmarks/bench_routes.py --output baseline.json
+#   python benchmarks/bench_routes.py --baseline baseline.json --max-regression 20
+#   python benchmarks/bench_routes.py --backend mongod --output mongod.json
+#   python benchmarks/bench_routes.py --backend memory --baseline mongod.json
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import ORDER_STATUSES, seed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["mongomock", "mongod", "memory"], default="mongomock")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="FoodDeliveryApp_bench")
+    parser.add_argument("--mode", choices=["client", "http", "both"], default="client")
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--restaurants", type=int, default=50)
+    parser.add_argument("--delivery-people", type=int, default=100)
+    parser.add_argument("--items-per-menu", type=int, default=20)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="warmup requests per read endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel clients in http mode")
+    parser.add_argument("--only", action="append", help="run only endpoints whose name contains this text")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a saved results file")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="p95 increase in percent that counts as a regression")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+# Import app.py against the chosen stand-in database
+def load_api(args):
+    os.environ["MONGO_DB_NAME"] = args.db_name
+    # Measure the routes themselves, not the rate limits
+    os.environ.setdefault("ADMISSION_CONTROL", "false")
+    if args.backend == "mongomock":
+        import mongomock
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+    elif args.backend == "memory":
+        os.environ["STORAGE_BACKEND"] = "memory"
+    else:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    import app as api
+    return api
+
+
+# Insert throwaway documents for the destructive scenarios, so they never touch seeded data
+def make_users(db, count, role="customer"):
+    user_ids = [ObjectId() for _ in range(count)]
+    db["user"].insert_many([{"_id": user_id, "name": "victim", "email": f"{user_id}@victim.local",
+                             "password": "bench", "role": role} for user_id in user_ids])
+    return user_ids
+
+def make_orders(db, count, ids):
+    order_ids = [ObjectId() for _ in range(count)]
+    db["order"].insert_many([{"_id": order_id, "user_id": ids["customer_ids"][0],
+                              "restaurant_id": ids["restaurant_ids"][0],
+                              "delivery_person_id": ids["delivery_person_ids"][0], "status": "pending",
+                              "menu_detail": [], "total_price": 10, "version": 1} for order_id in order_ids])
+    return order_ids
+
+def make_restaurants(db, count):
+    restaurant_ids = make_users(db, count, role="restaurant_owner")
+    db["menu"].insert_many([{"restaurant_id": restaurant_id, "version": 1} for restaurant_id in restaurant_ids])
+    return restaurant_ids
+
+
+# Every route with a request generator: (name, method, path(i, state), body(i, state), setup(n))
+def build_scenarios(db, ids):
+    customers = [str(i) for i in ids["customer_ids"]]
+    restaurants = [str(i) for i in ids["restaurant_ids"]]
+    couriers = [str(i) for i in ids["delivery_person_ids"]]
+    order_ids = ids["order_ids"]
+    order_courier = ids["order_delivery_person"]
+    run = ObjectId()
+
+    def pick(values, i):
+        return values[i % len(values)]
+
+    def new_order(i):
+        return {"status": "pending", "menu_detail": [{"product_name": "Dish 1", "quantity": 1}],
+                "total_price": 20, "delivery_person_id": pick(couriers, i)}
+
+    return [
+        ("GET /", "GET", lambda i, s: "/", None, None),
+        ("POST /register", "POST", lambda i, s: "/register",
+         lambda i, s: {"name": "bench", "email": f"{run}-{i}@register.local", "password": "x", "role": "customer"}, None),
+        ("POST /login", "POST", lambda i, s: "/login",
+         lambda i, s: {"email": f"{pick(customers, i)}@bench.local", "password": "bench"}, None),
+        ("PUT /users/<user_id>", "PUT", lambda i, s: f"/users/{pick(customers, i)}",
+         lambda i, s: {"name": f"customer {i}"}, None),
+        ("GET /users", "GET", lambda i, s: "/users?limit=100", None, None),
+        ("GET /restaurant/orders/<restaurant_id>", "GET",
+         lambda i, s: f"/restaurant/orders/{pick(restaurants, i)}", None, None),
+        ("GET /restaurant/orders/<restaurant_id>/active", "GET",
+         lambda i, s: f"/restaurant/orders/{pick(restaurants, i)}/active", None, None),
+        ("GET /restaurant/orders/<restaurant_id>?status=&sort=newest", "GET",
+         lambda i, s: f"/restaurant/orders/{pick(restaurants, i)}?status=pending&sort=newest&limit=50", None, None),
+        ("GET /restaurant_specific/orders/<restaurant_id>", "GET",
+         lambda i, s: f"/restaurant_specific/orders/{pick(restaurants, i)}", None, None),
+        ("GET /delivery_person/orders/<delivery_person_id>", "GET",
+         lambda i, s: f"/delivery_person/orders/{pick(couriers, i)}", None, None),
+        ("GET /menu/<restaurant_id>", "GET", lambda i, s: f"/menu/{pick(restaurants, i)}", None, None),
+        ("POST /menu/<restaurant_id>", "POST", lambda i, s: f"/menu/{pick(restaurants, i)}",
+         lambda i, s: {"product_name": f"Bench {run} {i}", "price": 12, "detail": "benchmark item"}, None),
+        ("PUT /menu/<restaurant_id>", "PUT", lambda i, s: f"/menu/{pick(restaurants, i)}",
+         lambda i, s: {"product_name": f"Dish {i % 5}", "price": 10 + i % 7}, None),
+        # Removes the items added by the POST /menu scenario above
+        ("DELETE /menu/<restaurant_id>/<product_name>", "DELETE",
+         lambda i, s: f"/menu/{pick(restaurants, i)}/Bench {run} {i}".replace(" ", "%20"), None, None),
+        ("GET /menu", "GET", lambda i, s: "/menu?limit=50", None, None),
+        # Needs the text index: only meaningful with --backend mongod (answers 501 with --backend memory)
+        ("GET /menu/search", "GET", lambda i, s: f"/menu/search?q=dish%20{i % 20}&max_price=30", None, None),
+        ("POST /order/<user_id>/<restaurant_id>", "POST",
+         lambda i, s: f"/order/{pick(customers, i)}/{pick(restaurants, i)}", lambda i, s: new_order(i), None),
+        ("POST /orders/batch", "POST", lambda i, s: "/orders/batch",
+         lambda i, s: {"orders": [dict(new_order(i + n), user_id=pick(customers, i + n),
+                                       restaurant_id=pick(restaurants, i + n)) for n in range(20)]}, None),
+        ("PUT /order/<order_id>/status", "PUT", lambda i, s: f"/order/{pick(order_ids, i)}/status",
+         lambda i, s: {"delivery_person_id": str(order_courier[pick(order_ids, i)]),
+                       "status": ORDER_STATUSES[i % len(ORDER_STATUSES)]}, None),
+        ("GET /admin/all_users", "GET", lambda i, s: "/admin/all_users", None, None),
+        ("GET /admin/all_restaurants", "GET", lambda i, s: "/admin/all_restaurants", None, None),
+        ("GET /admin/all_orders", "GET", lambda i, s: "/admin/all_orders", None, None),
+        ("GET /admin/all_orders?stream", "GET", lambda i, s: "/admin/all_orders?stream=true", None, None),
+        ("DELETE /users/<user_id>", "DELETE", lambda i, s: f"/users/{s[i]}", None,
+         lambda n: make_users(db, n)),
+        ("DELETE /admin/user/<user_id>", "DELETE", lambda i, s: f"/admin/user/{s[i]}", None,
+         lambda n: make_users(db, n)),
+        ("DELETE /admin/restaurant/<restaurant_id>", "DELETE", lambda i, s: f"/admin/restaurant/{s[i]}", None,
+         lambda n: make_restaurants(db, n)),
+        ("DELETE /admin/order/<order_id>", "DELETE", lambda i, s: f"/admin/order/{s[i]}", None,
+         lambda n: make_orders(db, n, ids)),
+    ]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": sum(1 for status in statuses if status >= 500),
+        "statuses": {str(status): statuses.count(status) for status in sorted(set(statuses))},
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else None,
+    }
+
+
+# Flask test client: in-process, no sockets, measures the app itself
+def run_client(flask_app, method, path, body, state, count):
+    client = flask_app.test_client()
+    latencies, statuses = [], []
+    started = time.perf_counter()
+    for i in range(count):
+        begin = time.perf_counter()
+        response = client.open(path(i, state), method=method, json=body(i, state) if body else None)
+        response.get_data()
+        latencies.append(time.perf_counter() - begin)
+        statuses.append(response.status_code)
+    return latencies, statuses, time.perf_counter() - started
+
+# Real HTTP against a threaded werkzeug server, several clients in parallel
+def run_http(base_url, method, path, body, state, count, concurrency):
+    def one(i):
+        data = json.dumps(body(i, state)).encode() if body else None
+        request = urllib.request.Request(base_url + path(i, state), data=data, method=method,
+                                         headers={"Content-Type": "application/json"} if data else {})
+        begin = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        return time.perf_counter() - begin, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(count)))
+    elapsed = time.perf_counter() - started
+    return [latency for latency, _ in results], [status for _, status in results], elapsed
+
+def start_http_server(flask_app):
+    from werkzeug.serving import make_server
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# Print the change of every endpoint against the baseline; returns the regressed endpoints
+def compare(results, baseline, max_regression):
+    regressions = []
+    print(f"\nComparison with baseline ({baseline.get('started_at')})")
+    for key, current in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if not previous or not previous.get("p95_ms") or not current.get("p95_ms"):
+            continue
+        p95_change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+        rps_change = (current["throughput_rps"] - previous["throughput_rps"]) / previous["throughput_rps"] * 100
+        flag = "REGRESSION" if p95_change > max_regression else ""
+        if flag:
+            regressions.append(key)
+        print(f"{key:60} p95 {p95_change:+7.1f}%  rps {rps_change:+7.1f}%  {flag}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    api = load_api(args)
+    flask_app = api.create_app()
+    db = api.db
+    if args.backend == "memory":
+        # Hash indexes before seeding, as the warm-up would build them on mongod
+        api.ensure_indexes(db)
+
+    seed_started = time.perf_counter()
+    ids = seed(db, customers=args.customers, restaurants=args.restaurants, delivery_people=args.delivery_people,
+               items_per_menu=args.items_per_menu, orders=args.orders, seed=args.seed)
+    print(f"Seeded {args.orders} orders in {time.perf_counter() - seed_started:.1f}s ({args.backend})")
+
+    scenarios = build_scenarios(db, ids)
+    if args.only:
+        scenarios = [scenario for scenario in scenarios if any(text in scenario[0] for text in args.only)]
+
+    modes = ["client", "http"] if args.mode == "both" else [args.mode]
+    server, base_url = start_http_server(flask_app) if "http" in modes else (None, None)
+
+    results = {}
+    for mode in modes:
+        for name, method, path, body, setup in scenarios:
+            count = args.requests
+            if method == "GET" and args.warmup:
+                run_client(flask_app, method, path, body, None, args.warmup)
+            state = setup(count) if setup else None
+            if mode == "client":
+                latencies, statuses, elapsed = run_client(flask_app, method, path, body, state, count)
+            else:
+                latencies, statuses, elapsed = run_http(base_url, method, path, body, state, count, args.concurrency)
+            key = f"{mode} {name}"
+            results[key] = summarize(latencies, statuses, elapsed)
+            result = results[key]
+            print(f"{key:60} {result['throughput_rps']:9.1f} rps  p50 {result['p50_ms']:8.2f}  "
+                  f"p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} ms  errors {result['errors']}")
+
+    if server:
+        server.shutdown()
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Seed a benchmark database with users, menus and orders shaped like the ones the API stores.
+import random
+
+from bson import ObjectId
+
+ORDER_STATUSES = ["pending", "preparing", "picked_up", "en_route", "delivered"]
+
+# Insert in chunks so large volumes don't build one huge insert_many
+INSERT_CHUNK = 5000
+
+
+def insert_chunked(collection, documents):
+    for start in range(0, len(documents), INSERT_CHUNK):
+        collection.insert_many(documents[start:start + INSERT_CHUNK])
+
+
+# Drop and refill the user, menu, menu_item and order collections of db.
+# Returns the generated ids so benchmark scenarios can address real documents.
+def seed(db, customers=1000, restaurants=50, delivery_people=100, items_per_menu=20, orders=10000, seed=42):
+    rng = random.Random(seed)
+
+    for name in ("user", "menu", "menu_item", "order"):
+        db[name].delete_many({})
+
+    ids = {
+        "customer_ids": [ObjectId() for _ in range(customers)],
+        "restaurant_ids": [ObjectId() for _ in range(restaurants)],
+        "delivery_person_ids": [ObjectId() for _ in range(delivery_people)],
+    }
+
+    # Restaurant owners use the restaurant id as their user _id, as admin_delete_restaurant expects
+    user_documents = []
+    for role, key in (("customer", "customer_ids"), ("restaurant_owner", "restaurant_ids"),
+                      ("delivery_personnel", "delivery_person_ids")):
+        for user_id in ids[key]:
+            user_documents.append({
+                "_id": user_id,
+                "name": f"{role} {user_id}",
+                "email": f"{user_id}@bench.local",
+                "password": "bench",
+                "role": role
+            })
+    insert_chunked(db["user"], user_documents)
+
+    menu_documents = [{"restaurant_id": restaurant_id, "version": 1} for restaurant_id in ids["restaurant_ids"]]
+    insert_chunked(db["menu"], menu_documents)
+    item_documents = [{
+        "restaurant_id": restaurant_id,
+        "product_name": f"Dish {item}",
+        "price": rng.randint(5, 40),
+        "detail": f"House dish number {item}"
+    } for restaurant_id in ids["restaurant_ids"] for item in range(items_per_menu)]
+    insert_chunked(db["menu_item"], item_documents)
+
+    order_documents = []
+    for _ in range(orders):
+        order_documents.append({
+            "_id": ObjectId(),
+            "user_id": rng.choice(ids["customer_ids"]),
+            "restaurant_id": rng.choice(ids["restaurant_ids"]),
+            "delivery_person_id": rng.choice(ids["delivery_person_ids"]),
+            "status": rng.choice(ORDER_STATUSES),
+            "menu_detail": [{"product_name": f"Dish {rng.randrange(items_per_menu)}", "quantity": rng.randint(1, 3)}],
+            "total_price": rng.randint(10, 120),
+            "version": 1
+        })
+    insert_chunked(db["order"], order_documents)
+    ids["order_ids"] = [order["_id"] for order in order_documents]
+    ids["order_delivery_person"] = {order["_id"]: order["delivery_person_id"] for order in order_documents}
+
+    return ids
@@ -0,0 +1,77 @@
+from analytics import ORDER_COUNTER_FIELDS
+from jobs import delete_in_batches
+
+# Cascaded deletes of the data a deleted user or restaurant leaves behind, run as background jobs
+# (see jobs.py) by both the Flask app (app.py) and the ASGI app (asgi.py), on a sync database.
+# Handlers only delete what is still there, so a job taken over after its lease expired can
+# run again.
+
+
+class CascadeDeletes:
+    def __init__(self, db, order_stats, batch_size=500, pause=0.0, menu_cache=None, status_writes=None):
+        self.orders = db["order"]
+        self.menus = db["menu"]
+        self.menu_items = db["menu_item"]
+        self.couriers = db["courier"]
+        self.order_stats = order_stats
+        # Documents deleted per round trip, and seconds to wait between two of them
+        self.batch_size = batch_size
+        self.pause = pause
+        # In-process state of the serving app that must forget deleted documents, if any
+        self.menu_cache = menu_cache
+        self.status_writes = status_writes
+
+    # Run the cascades as jobs of job_runner
+    def register(self, job_runner):
+        job_runner.register("delete_restaurant_data", self.delete_restaurant_data)
+        job_runner.register("delete_user_data", self.delete_user_data)
+
+    # Delete orders in batches, taking each one out of the analytics counters
+    def delete_orders(self, progress, query):
+        deleted = 0
+        for batch, count in delete_in_batches(self.orders, query, self.batch_size, self.pause, ORDER_COUNTER_FIELDS):
+            for order in batch:
+                self.order_stats.record_deleted_order(order)
+                if self.status_writes:
+                    self.status_writes.forget(order["_id"])
+            progress.add(orders=count)
+            deleted += count
+        return deleted
+
+    # Delete the menu items of a restaurant in batches
+    def delete_menu_items(self, progress, restaurant_id):
+        deleted = 0
+        for batch, count in delete_in_batches(self.menu_items, {"restaurant_id": restaurant_id}, self.batch_size,
+                                              self.pause):
+            progress.add(menu_items=count)
+            deleted += count
+        if self.menu_cache:
+            self.menu_cache.invalidate(str(restaurant_id))
+        return deleted
+
+    # Cascade of a deleted restaurant: its menu items and its orders
+    def delete_restaurant_data(self, progress, restaurant_id):
+        return {
+            "menu_items_deleted": self.delete_menu_items(progress, restaurant_id),
+            "orders_deleted": self.delete_orders(progress, {"restaurant_id": restaurant_id})
+        }
+
+    # Cascade of a deleted user: the orders they placed as customer or received as restaurant,
+    # the menu of a restaurant owner (whose user _id is the restaurant_id) and the courier
+    # document of a delivery person. Orders they delivered belong to other users and are kept,
+    # only unassigned from the deleted courier, whose own counters are dropped.
+    def delete_user_data(self, progress, user_id):
+        menus_deleted = self.menus.delete_many({"restaurant_id": user_id}).deleted_count
+        couriers_deleted = self.couriers.delete_one({"_id": user_id}).deleted_count
+        result = {
+            "menus_deleted": menus_deleted,
+            "couriers_deleted": couriers_deleted,
+            "menu_items_deleted": self.delete_menu_items(progress, user_id),
+            "orders_deleted": self.delete_orders(progress, {"$or": [{"user_id": user_id}, {"restaurant_id": user_id}]})
+        }
+        result["orders_unassigned"] = self.orders.update_many(
+            {"delivery_person_id": user_id}, {"$unset": {"delivery_person_id": ""}}
+        ).modified_count
+        self.order_stats.flush()
+        self.order_stats.collection.delete_many({"scope": "delivery_person", "owner_id": user_id})
+        return result
@@ -0,0 +1,89 @@
+import os
+import threading
+
+from pymongo import MongoClient
+
+from db_monitoring import CommandMetrics, PoolMetrics
+
+# One MongoClient per process, created on first use instead of at import time.
+# A client must not be used across fork(), so a prefork worker that inherited one from the
+# master creates its own; nothing connects until a worker actually needs the database.
+
+READ_PREFERENCES = ("primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest")
+
+
+# MongoClient options read from the environment: pool size, timeouts and read preference
+def client_options_from_env():
+    options = {
+        "maxPoolSize": int(os.getenv('MONGO_MAX_POOL_SIZE', 100)),
+        "minPoolSize": int(os.getenv('MONGO_MIN_POOL_SIZE', 0)),
+        "maxIdleTimeMS": int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 0)) or None,
+        "waitQueueTimeoutMS": int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 0)) or None,
+        "connectTimeoutMS": int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+        "serverSelectionTimeoutMS": int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        "socketTimeoutMS": int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 0)) or None,
+        "readPreference": os.getenv('MONGO_READ_PREFERENCE', 'primary'),
+    }
+    if options["readPreference"] not in READ_PREFERENCES:
+        raise ValueError(f"MONGO_READ_PREFERENCE must be one of {', '.join(READ_PREFERENCES)}")
+    # Unset options keep the driver defaults
+    return {name: value for name, value in options.items() if value is not None}
+
+
+class MongoConnection:
+    # Server features beyond CRUD and indexes, checked against ROUTE_STORAGE_FEATURES in app.py
+    features = frozenset({"aggregate", "text_search", "geo_queries", "explain", "bulk_write", "change_streams"})
+
+    def __init__(self, uri=None, db_name="FoodDeliveryApp", **client_options):
+        self._lock = threading.Lock()
+        self.configure(uri, db_name, **client_options)
+
+    # Change the settings; the next use creates a new client with them
+    def configure(self, uri, db_name, **client_options):
+        with self._lock:
+            self.uri = uri
+            self.db_name = db_name
+            self.client_options = client_options
+            self._client = None
+            self._pid = None
+            self.pool_metrics = None
+
+    def client(self):
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    self.pool_metrics = PoolMetrics()
+                    self._client = MongoClient(self.uri, event_listeners=[CommandMetrics(), self.pool_metrics],
+                                               **self.client_options)
+                    self._pid = pid
+        return self._client
+
+    def database(self):
+        return self.client()[self.db_name]
+
+    # True once this process created its client
+    def connected(self):
+        return self._client is not None and self._pid == os.getpid()
+
+
+# Stand-ins for the database and its collections, resolved against the process's client on
+# every use, so modules can hold them from import time
+class LazyDatabase:
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getitem__(self, name):
+        return LazyCollection(self._connection, name)
+
+    def __getattr__(self, name):
+        return getattr(self._connection.database(), name)
+
+
+class LazyCollection:
+    def __init__(self, connection, name):
+        self._connection = connection
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._connection.database()[self.name], attr)
@@ -0,0 +1,124 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from pymongo import monitoring
+
+from metrics import (MONGO_COMMAND_DURATION, MONGO_COMMAND_FAILURES, MONGO_POOL_CHECKOUT_FAILURES,
+                     MONGO_POOL_CHECKOUT_WAIT)
+
+# Commands whose first value is not a collection name
+NON_COLLECTION_COMMANDS = {"getMore", "killCursors", "ping", "hello", "isMaster", "endSessions", "listDatabases"}
+
+# MongoDB commands issued by the current request (None outside a request)
+_request_commands = ContextVar("request_commands", default=None)
+
+
+# Commands issued on behalf of one request: a round trip count and, for the slow-request log,
+# the (command, collection, duration in ms) of each of them
+class RequestCommands:
+    def __init__(self):
+        self.count = 0
+        self.commands = []
+
+
+def command_collection(event):
+    if event.command_name == "getMore":
+        return event.command.get("collection", "")
+    if event.command_name in NON_COLLECTION_COMMANDS:
+        return ""
+    value = event.command.get(event.command_name)
+    return value if isinstance(value, str) else ""
+
+
+# Command listener counting and timing every command sent to MongoDB.
+# Durations are exported per command and collection, and recorded for the current request.
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        # request_id -> (collection, request state) of commands that have started
+        self._pending = {}
+
+    def started(self, event):
+        stats = _request_commands.get()
+        if stats is not None:
+            stats.count += 1
+        self._pending[event.request_id] = (command_collection(event), stats)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed):
+        collection, stats = self._pending.pop(event.request_id, ("", None))
+        duration = event.duration_micros / 1e6
+        MONGO_COMMAND_DURATION.labels(event.command_name, collection).observe(duration)
+        if failed:
+            MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+        if stats is not None:
+            stats.commands.append((event.command_name, collection, round(duration * 1000, 3)))
+
+
+# Pool listener measuring how long each operation waits to check out a connection.
+# The checkout happens on the thread running the operation, so a thread-local start time suffices.
+# It also counts the open connections, which tells the readiness check when the pool is warm.
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.open_connections = 0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            MONGO_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+            self._local.started = None
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        MONGO_POOL_CHECKOUT_FAILURES.labels(event.reason).inc()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_checked_in(self, event):
+        pass
+
+
+# Start recording for a new request
+def start_request_count():
+    _request_commands.set(RequestCommands())
+
+# Commands issued so far by the current request
+def request_round_trips():
+    stats = _request_commands.get()
+    return stats.count if stats is not None else 0
+
+# (command, collection, duration in ms) of every command the current request has completed
+def request_commands():
+    stats = _request_commands.get()
+    return list(stats.commands) if stats is not None else []
@@ -0,0 +1,178 @@
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+
+from metrics import COURIER_LOCATION_FLUSH_FAILURES
+
+# Nearest-courier dispatch. Couriers are stored in the courier collection (_id is the delivery
+# person's user _id) with a GeoJSON location and an available flag, under a compound
+# (available, location 2dsphere, location_updated_at) index. A new order claims the nearest
+# available courier around its restaurant whose last location ping is recent enough; the
+# courier becomes available again once the order is finished. Courier documents are only
+# created for users with the delivery_personnel role.
+
+COURIER_ROLE = "delivery_personnel"
+
+# Order statuses after which the assigned courier is free again
+RELEASE_STATUSES = {"delivered", "cancelled"}
+
+
+def point(lng, lat):
+    return {"type": "Point", "coordinates": [float(lng), float(lat)]}
+
+# Read {"lng": .., "lat": ..} from a request body. Returns (point, None) or (None, error message).
+def parse_location(data):
+    try:
+        lng, lat = float(data["lng"]), float(data["lat"])
+    except (KeyError, TypeError, ValueError):
+        return None, "Missing or invalid 'lng' and 'lat'"
+    if not -180 <= lng <= 180 or not -90 <= lat <= 90:
+        return None, "Coordinates out of range"
+    return point(lng, lat), None
+
+
+# Location pings arrive far more often than dispatch needs them. They are kept in memory,
+# latest position per courier, and written with one bulk_write per flush interval.
+# Each flush checks the pinging ids against the users in one query and drops the others.
+class CourierLocationBuffer:
+    def __init__(self, couriers, users, flush_interval=1.0):
+        self.couriers = couriers
+        self.users = users
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.logger = None
+
+    # Start the flush thread; also restarts it in a forked worker, which does not inherit threads
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            if self._thread is None:
+                atexit.register(self.stop)
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="courier-location-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # Positions stay pending and are retried on the next flush
+                if self.logger:
+                    self.logger.error(f"Courier location flush failed, retrying: {e}")
+
+    def record(self, courier_id, location):
+        with self._lock:
+            self._pending[courier_id] = (location, datetime.now(timezone.utc))
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                known = {user["_id"] for user in
+                         self.users.find({"_id": {"$in": list(pending)}, "role": COURIER_ROLE}, {"_id": 1})}
+                if len(known) < len(pending) and self.logger:
+                    self.logger.warning(f"Dropped location pings of {len(pending) - len(known)} unknown delivery people")
+                requests = [UpdateOne(
+                    {"_id": courier_id},
+                    # A courier seen for the first time is on shift
+                    {"$set": {"location": location, "location_updated_at": updated_at},
+                     "$setOnInsert": {"available": True}},
+                    upsert=True
+                ) for courier_id, (location, updated_at) in pending.items() if courier_id in known]
+                if requests:
+                    self.couriers.bulk_write(requests, ordered=False)
+            except Exception:
+                COURIER_LOCATION_FLUSH_FAILURES.inc()
+                # Put back the positions no newer ping replaced in the meantime ($set: writing a
+                # position twice is harmless)
+                with self._lock:
+                    for courier_id, position in pending.items():
+                        self._pending.setdefault(courier_id, position)
+                raise
+            return len(requests)
+
+
+class Dispatcher:
+    def __init__(self, couriers, users, max_distance=5000, candidates=5, location_ttl=300, courier_ttl=300):
+        self.couriers = couriers
+        self.users = users
+        # Meters from the restaurant a courier may be assigned from
+        self.max_distance = max_distance
+        # Nearest couriers tried when several orders race for the same one
+        self.candidates = candidates
+        # Restaurant locations are cached for this many seconds
+        self.location_ttl = location_ttl
+        # Couriers without a location ping for this many seconds went offline and are skipped
+        self.courier_ttl = courier_ttl
+        self._restaurant_locations = {}
+
+    # Only updates couriers that already sent a location (so were checked against the users).
+    # Returns False for an unknown courier.
+    def set_available(self, courier_id, available):
+        result = self.couriers.update_one(
+            {"_id": courier_id},
+            {"$set": {"available": available}, "$unset": {"order_id": ""}} if available else
+            {"$set": {"available": False}}
+        )
+        return result.matched_count > 0
+
+    # Location of a restaurant (set on its owner's user document), or None
+    def restaurant_location(self, restaurant_id):
+        cached = self._restaurant_locations.get(restaurant_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        owner = self.users.find_one({"_id": restaurant_id}, {"location": 1})
+        location = owner.get("location") if owner else None
+        if location:
+            # Not cached while unset, so a location set on another worker is seen at once
+            self._restaurant_locations[restaurant_id] = (location, time.monotonic() + self.location_ttl)
+        return location
+
+    def set_restaurant_location(self, restaurant_id, location):
+        result = self.users.update_one({"_id": restaurant_id, "role": "restaurant_owner"},
+                                       {"$set": {"location": location}})
+        self._restaurant_locations.pop(restaurant_id, None)
+        return result.matched_count > 0
+
+    # Claim the nearest available courier within max_distance of location for order_id.
+    # Candidates come from the 2dsphere index and must have pinged within courier_ttl; the
+    # claim only succeeds if the courier is still available, so concurrent orders never share
+    # a courier. Returns the courier _id or None.
+    def assign(self, location, order_id):
+        near = {"$nearSphere": {"$geometry": location, "$maxDistance": self.max_distance}}
+        fresh = {"$gte": datetime.now(timezone.utc) - timedelta(seconds=self.courier_ttl)}
+        nearest = self.couriers.find({"available": True, "location": near, "location_updated_at": fresh},
+                                     {"_id": 1}).limit(self.candidates)
+        for courier in nearest:
+            result = self.couriers.update_one(
+                {"_id": courier["_id"], "available": True},
+                {"$set": {"available": False, "order_id": order_id}}
+            )
+            if result.modified_count:
+                return courier["_id"]
+        return None
+
+    # Free the courier of a finished (or never created) order
+    def release(self, courier_id, order_id):
+        self.couriers.update_one(
+            {"_id": courier_id, "order_id": order_id},
+            {"$set": {"available": True}, "$unset": {"order_id": ""}}
+        )
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import os
+
+from bson import ObjectId
+
+from analytics import id_range, parse_time_range
+from json_provider import dumps
+
+# Streaming export of orders as NDJSON or CSV for the data team.
+# Orders are read in _id order from a server-side cursor and written one line each, so memory
+# stays flat whatever the export size, and an interrupted export resumes after its last _id.
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+MAX_EXPORT_BATCH_SIZE = 10000
+
+# Columns of the CSV export; menu_detail is written as JSON
+CSV_COLUMNS = ["_id", "created_at", "user_id", "restaurant_id", "delivery_person_id", "status", "total_price",
+               "menu_detail", "version"]
+
+# Lines are sent in chunks of about this many characters
+CHUNK_SIZE = 64 * 1024
+
+
+# Read the export filters from a mapping (query string or CLI options):
+# restaurant_id, delivery_person_id, status (comma separated), from, to (ISO 8601) and after (resume _id).
+# Returns (query, None) or (None, error message).
+def export_query(args):
+    query = {}
+    for field in ("restaurant_id", "delivery_person_id"):
+        if args.get(field):
+            if not ObjectId.is_valid(args[field]):
+                return None, f"Invalid {field}"
+            query[field] = ObjectId(args[field])
+
+    if args.get("status"):
+        statuses = [status.strip() for status in args["status"].split(",") if status.strip()]
+        query["status"] = statuses[0] if len(statuses) == 1 else {"$in": statuses}
+
+    # Orders have no creation field: filter on the time in their _id
+    start, end, error = parse_time_range(args)
+    if error:
+        return None, error
+    id_filter = id_range(start, end)
+    if args.get("after"):
+        if not ObjectId.is_valid(args["after"]):
+            return None, "Invalid cursor"
+        after = ObjectId(args["after"])
+        # Resume strictly after the last exported order, never before the start of the range
+        if "$gte" not in id_filter or after >= id_filter["$gte"]:
+            id_filter.pop("$gte", None)
+            id_filter["$gt"] = after
+    if id_filter:
+        query["_id"] = id_filter
+    return query, None
+
+# Returns (batch_size, None) or (None, error message)
+def parse_batch_size(value):
+    if value is None or value == "":
+        return DEFAULT_EXPORT_BATCH_SIZE, None
+    if not str(value).isdigit() or int(value) < 1:
+        return None, "Invalid batch_size"
+    return min(int(value), MAX_EXPORT_BATCH_SIZE), None
+
+def export_cursor(orders, query, batch_size):
+    return orders.find(query).sort("_id", 1).batch_size(batch_size)
+
+
+def ndjson_lines(cursor):
+    for order in cursor:
+        yield dumps(order) + "\n"
+
+def csv_row(values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
+
+def csv_lines(cursor, header=True):
+    if header:
+        yield csv_row(CSV_COLUMNS)
+    for order in cursor:
+        row = dict(order, created_at=order["_id"].generation_time.isoformat())
+        row["menu_detail"] = dumps(order.get("menu_detail", []))
+        yield csv_row([str(row[column]) if row.get(column) is not None else "" for column in CSV_COLUMNS])
+
+def export_lines(cursor, export_format, header=True):
+    if export_format == "csv":
+        return csv_lines(cursor, header)
+    return ndjson_lines(cursor)
+
+# Join lines into chunks so a large export is not sent one small write per order
+def chunked(lines, size=CHUNK_SIZE):
+    chunk = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield "".join(chunk)
+
+
+# _id of the last complete line of an earlier export file, or None. A partly written last
+# line (export interrupted mid-write) is cut off so the resumed export appends cleanly.
+def resume_point(path, export_format):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb+") as output:
+        # Only the tail of the file is read
+        end = output.seek(0, os.SEEK_END)
+        start = output.seek(max(0, end - CHUNK_SIZE))
+        tail = output.read()
+        complete = tail.rfind(b"\n")
+        if complete == -1:
+            if start == 0:
+                # Not even one complete line: start over
+                output.truncate(0)
+            return None
+        if complete != len(tail) - 1:
+            output.truncate(end - len(tail) + complete + 1)
+        lines = tail[:complete].split(b"\n")
+    last_line = lines[-1].decode()
+    try:
+        if export_format == "csv":
+            last_id = next(csv.reader([last_line]))[0]
+        else:
+            last_id = json.loads(last_line).get("_id", "")
+    except (ValueError, csv.Error, StopIteration):
+        return None
+    return last_id if ObjectId.is_valid(last_id) else None
@@ -0,0 +1,137 @@
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, TEXT
+from pymongo.errors import OperationFailure
+
+# Index registry: every index the API relies on, per collection.
+# Each entry is (collection name, keys, options) and is created idempotently at startup.
+INDEXES = [
+    ("user", [("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+    ("menu", [("restaurant_id", ASCENDING)], {"name": "restaurant_id"}),
+    ("menu_item", [("restaurant_id", ASCENDING), ("product_name", ASCENDING)],
+     {"name": "restaurant_product_unique", "unique": True}),
+    # Full-text menu search; a name match ranks above a match in the description
+    ("menu_item", [("product_name", TEXT), ("detail", TEXT)],
+     {"name": "menu_item_text", "weights": {"product_name": 3, "detail": 1}}),
+    # The _id suffix lets per-restaurant and per-courier scans in _id order (export, keyset
+    # pages) read the index in order instead of sorting; the prefix serves equality lookups
+    ("order", [("restaurant_id", ASCENDING), ("_id", ASCENDING)], {"name": "restaurant_id_id"}),
+    ("order", [("delivery_person_id", ASCENDING), ("_id", ASCENDING)], {"name": "delivery_person_id_id"}),
+    # Order lists filtered by status (active orders, ?status=): equality or bounds on status,
+    # then _id for the sort and the time range, so finished orders are never read
+    ("order", [("restaurant_id", ASCENDING), ("status", ASCENDING), ("_id", ASCENDING)],
+     {"name": "restaurant_status_id"}),
+    ("order", [("delivery_person_id", ASCENDING), ("status", ASCENDING), ("_id", ASCENDING)],
+     {"name": "delivery_person_status_id"}),
+    ("order", [("user_id", ASCENDING)], {"name": "user_id"}),
+    # Equality on available first, so dispatch only walks the free couriers near the restaurant;
+    # the ping time filters out offline couriers inside the index
+    ("courier", [("available", ASCENDING), ("location", GEOSPHERE), ("location_updated_at", ASCENDING)],
+     {"name": "available_location_updated_at"}),
+    ("order_stats", [("scope", ASCENDING), ("owner_id", ASCENDING), ("day", ASCENDING)], {"name": "scope_owner_day"}),
+]
+
+# Indexes replaced by an entry above, dropped once it exists: (collection name, index name, replacement name)
+SUPERSEDED_INDEXES = [
+    ("order", "restaurant_id", "restaurant_id_id"),
+    ("order", "delivery_person_id", "delivery_person_id_id"),
+    ("courier", "available_location", "available_location_updated_at"),
+]
+
+# Query shapes issued by the routes in app.py, with sample values for explain().
+# Each entry is (name, collection name, filter, sort).
+QUERY_SHAPES = [
+    ("register_user/login: user by email", "user", {"email": "audit@example.com"}, None),
+    ("login: user by email and password", "user", {"email": "audit@example.com", "password": "x"}, None),
+    ("user by _id", "user", {"_id": ObjectId()}, None),
+    ("menu by restaurant_id", "menu", {"restaurant_id": ObjectId()}, None),
+    ("menu item by restaurant_id and product_name", "menu_item", {"restaurant_id": ObjectId(), "product_name": "x"}, None),
+    ("menu search: text match", "menu_item", {"$text": {"$search": "dish"}}, None),
+    ("menu items of a restaurant", "menu_item", {"restaurant_id": ObjectId()}, [("_id", ASCENDING)]),
+    ("menu items of a page of menus", "menu_item", {"restaurant_id": {"$in": [ObjectId(), ObjectId()]}}, [("_id", ASCENDING)]),
+    ("orders by restaurant_id", "order", {"restaurant_id": ObjectId()}, [("_id", ASCENDING)]),
+    ("orders by delivery_person_id", "order", {"delivery_person_id": ObjectId()}, [("_id", ASCENDING)]),
+    ("active orders of a restaurant", "order",
+     {"restaurant_id": ObjectId(), "status": {"$nin": ["cancelled", "delivered"]}}, [("_id", ASCENDING)]),
+    ("orders of a restaurant by status, newest first", "order",
+     {"restaurant_id": ObjectId(), "status": "pending"}, [("_id", DESCENDING)]),
+    ("orders of a delivery person by status in a time range", "order",
+     {"delivery_person_id": ObjectId(), "status": {"$in": ["pending", "picked_up"]},
+      "_id": {"$gte": ObjectId(), "$lt": ObjectId()}}, [("_id", ASCENDING)]),
+    ("order by _id", "order", {"_id": ObjectId()}, None),
+    ("cascade delete: orders of a customer or restaurant", "order",
+     {"$or": [{"user_id": ObjectId()}, {"restaurant_id": ObjectId()}]}, None),
+    ("cascade delete: orders delivered by a courier", "order", {"delivery_person_id": ObjectId()}, None),
+    ("job by _id", "job", {"_id": ObjectId()}, None),
+    ("dispatch: nearest available courier", "courier",
+     {"available": True, "location": {"$nearSphere": {"$geometry": {"type": "Point", "coordinates": [0, 0]},
+                                                     "$maxDistance": 5000}},
+      "location_updated_at": {"$gte": datetime(2024, 1, 1, tzinfo=timezone.utc)}}, None),
+    ("export: orders of a restaurant after a cursor", "order",
+     {"restaurant_id": ObjectId(), "_id": {"$gt": ObjectId()}}, [("_id", ASCENDING)]),
+    ("export: orders of a delivery person in a time range", "order",
+     {"delivery_person_id": ObjectId(), "_id": {"$gte": ObjectId(), "$lt": ObjectId()}}, [("_id", ASCENDING)]),
+    ("bulk list page after cursor", "order", {"_id": {"$gt": ObjectId()}}, [("_id", ASCENDING)]),
+    ("analytics: orders of a restaurant in a time range", "order", {"restaurant_id": ObjectId(), "_id": {"$gte": ObjectId()}}, None),
+    ("analytics: daily counters of a restaurant", "order_stats", {"scope": "restaurant", "owner_id": ObjectId(), "day": {"$gte": "2024-01-01"}}, None),
+]
+
+
+# Create every registered index. create_index is a no-op when the index already exists.
+# Unique indexes are the only duplicate check of their writes (e.g. registration relies on
+# email_unique), so failing to create one raises; a missing query index is only reported.
+# unique=True creates only the unique indexes, unique=False only the others.
+def ensure_indexes(db, logger=None, unique=None):
+    created = []
+    for collection_name, keys, options in INDEXES:
+        if unique is not None and bool(options.get("unique")) != unique:
+            continue
+        try:
+            created.append((collection_name, db[collection_name].create_index(keys, **options)))
+        except OperationFailure as e:
+            # e.g. duplicate emails already stored
+            if logger:
+                logger.error(f"Could not create index {options.get('name')} on {collection_name}: {e}")
+            if options.get("unique"):
+                raise
+
+    created_names = set(created)
+    for collection_name, index_name, replacement in SUPERSEDED_INDEXES:
+        if (collection_name, replacement) not in created_names:
+            continue
+        try:
+            db[collection_name].drop_index(index_name)
+        except OperationFailure:
+            # Already dropped
+            pass
+    return created
+
+
+# Collect the stage names of a winning plan tree
+def plan_stages(plan):
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+# Run explain() on every registered query shape and flag the ones that still scan the collection
+def audit_query_plans(db):
+    report = []
+    for name, collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        # Newer servers wrap the classic plan in queryPlan
+        stages = plan_stages(winning_plan.get("queryPlan", winning_plan))
+        report.append({
+            "query": name,
+            "collection": collection_name,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return report
@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import DeleteOne, ReturnDocument
+
+# Background jobs for heavy admin operations (cascaded deletes and other bulk writes).
+# Each job is recorded in the job collection, so its status and progress can be read from any
+# worker; the jobs themselves run on a small thread pool in the process that submitted them.
+# A running job holds a lease that its process renews (heartbeat_at); when the process dies the
+# lease expires and any worker takes the job over. Handlers must therefore be safe to re-run.
+
+JOB_STATUSES = ["queued", "running", "succeeded", "failed"]
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+# Handed to a job handler to record progress counters on the job record.
+# Only the current holder of the job (its attempt) can write, and every write renews the lease.
+class JobProgress:
+    def __init__(self, collection, job_id, attempt=None):
+        self.collection = collection
+        self.job_id = job_id
+        self.attempt = attempt
+
+    def add(self, **counts):
+        now = utcnow()
+        self.collection.update_one(
+            {"_id": self.job_id, "attempts": self.attempt},
+            {"$inc": {f"progress.{name}": count for name, count in counts.items()},
+             "$set": {"updated_at": now, "heartbeat_at": now}}
+        )
+
+    # Renew the lease without recording progress
+    def heartbeat(self):
+        self.collection.update_one({"_id": self.job_id, "attempts": self.attempt, "status": "running"},
+                                   {"$set": {"heartbeat_at": utcnow()}})
+
+
+class JobRunner:
+    def __init__(self, collection, max_workers=2, logger=None, lease_seconds=300):
+        self.collection = collection
+        self.max_workers = max_workers
+        self.logger = logger
+        self.lease_seconds = lease_seconds
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._sweeper_pid = None
+
+    # handler(progress, **params) runs the job; its return value is stored as the job result
+    def register(self, job_type, handler):
+        self._handlers[job_type] = handler
+
+    # Threads do not survive fork(), so every process gets its own pool
+    def _pool(self):
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="job")
+                    self._pid = os.getpid()
+        return self._executor
+
+    # Record a queued job and schedule it. Returns the job _id.
+    def submit(self, job_type, params):
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job = {
+            "_id": ObjectId(),
+            "type": job_type,
+            "params": params,
+            "status": "queued",
+            "progress": {},
+            "created_at": utcnow()
+        }
+        self.collection.insert_one(job)
+        self._pool().submit(self._run, job["_id"])
+        return job["_id"]
+
+    # Jobs a worker may claim: queued ones, and running ones whose lease expired
+    # (jobs started before leases existed only have started_at)
+    def _claimable(self):
+        expired = utcnow() - timedelta(seconds=self.lease_seconds)
+        return {"$or": [
+            {"status": "queued"},
+            {"status": "running", "heartbeat_at": {"$lt": expired}},
+            {"status": "running", "heartbeat_at": {"$exists": False}, "started_at": {"$lt": expired}}
+        ]}
+
+    # Schedule the queued jobs of processes that stopped before running them, and the running
+    # jobs of processes that died. Jobs are claimed atomically, so several workers may call this at once.
+    def resume_queued(self):
+        job_ids = [job["_id"] for job in self.collection.find(self._claimable(), {"_id": 1})]
+        for job_id in job_ids:
+            self._pool().submit(self._run, job_id)
+        return len(job_ids)
+
+    # Look for abandoned jobs once per lease period, in a daemon thread of this process
+    def start(self):
+        if self._sweeper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sweeper_pid != os.getpid():
+                self._sweeper_pid = os.getpid()
+                threading.Thread(target=self._sweep, name="job-sweeper", daemon=True).start()
+
+    def _sweep(self):
+        while True:
+            try:
+                self.resume_queued()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Resuming jobs failed: {e}")
+            time.sleep(self.lease_seconds)
+
+    def _run(self, job_id):
+        now = utcnow()
+        job = self.collection.find_one_and_update(
+            dict(self._claimable(), _id=job_id),
+            {"$set": {"status": "running", "started_at": now, "heartbeat_at": now}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            # Already claimed by another worker
+            return
+        progress = JobProgress(self.collection, job_id, job["attempts"])
+        # Renew the lease while the handler runs, a few times per lease period
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(progress, done), name=f"job-{job_id}-heartbeat",
+                         daemon=True).start()
+        try:
+            result = self._handlers[job["type"]](progress, **job["params"])
+            update = {"status": "succeeded", "result": result}
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Job {job_id} ({job['type']}) failed: {e}")
+            update = {"status": "failed", "error": str(e)}
+        finally:
+            done.set()
+        update["finished_at"] = utcnow()
+        # A worker that lost its lease leaves the job to the one that took it over
+        self.collection.update_one({"_id": job_id, "attempts": job["attempts"]}, {"$set": update})
+
+    def _heartbeat(self, progress, done):
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                progress.heartbeat()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Job {progress.job_id} heartbeat failed: {e}")
+
+    def get(self, job_id):
+        return self.collection.find_one({"_id": ObjectId(job_id)})
+
+
+# Delete the documents matching query in chunks of batch_size, one bulk_write per chunk,
+# pausing between chunks so customer requests keep their share of the database.
+# Yields (documents, deleted count) per chunk. With a projection the documents are deleted
+# one find_one_and_delete at a time and only the ones this call removed are yielded, so a
+# job re-run after its lease expired never gets a document the first run already deleted.
+def delete_in_batches(collection, query, batch_size=500, pause=0.0, projection=None):
+    while True:
+        documents = list(collection.find(query, {"_id": 1}).limit(batch_size))
+        if not documents:
+            return
+        if projection:
+            deleted = [document for document in (
+                collection.find_one_and_delete({"_id": document["_id"]}, projection=projection)
+                for document in documents
+            ) if document is not None]
+            yield deleted, len(deleted)
+        else:
+            result = collection.bulk_write([DeleteOne({"_id": document["_id"]}) for document in documents],
+                                           ordered=False)
+            yield documents, result.deleted_count
+        if len(documents) < batch_size:
+            return
+        time.sleep(pause)
@@ -0,0 +1,67 @@
+import json
+import os
+from datetime import datetime
+
+from bson import Decimal128, ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON backend: "auto" uses orjson when it is installed, "json" forces the standard library
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto').lower()
+
+
+# Encode the BSON types stored by the API in one pass, so routes can return raw
+# pymongo documents without converting each field by hand
+def bson_default(o):
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, datetime):
+        return o.isoformat()
+    if isinstance(o, Decimal128):
+        # Keep the exact decimal value instead of rounding through float
+        return str(o.to_decimal())
+    return DefaultJSONProvider.default(o)
+
+
+USE_ORJSON = orjson is not None and JSON_BACKEND in ('auto', 'orjson')
+
+
+# Serialize a response body with sorted keys, as Flask's default provider does, compact or
+# indented by 2 spaces. Used directly by the async server, which has no Flask app.
+def dumps(obj, use_orjson=USE_ORJSON, indent=False):
+    if use_orjson:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=bson_default, option=option).decode()
+    if indent:
+        return json.dumps(obj, default=bson_default, sort_keys=True, ensure_ascii=True, indent=2)
+    return json.dumps(obj, default=bson_default, sort_keys=True, ensure_ascii=True)
+
+
+# Flask JSON provider understanding ObjectId, datetime and Decimal128,
+# with an optional orjson fast path
+class BSONJSONProvider(DefaultJSONProvider):
+    default = staticmethod(bson_default)
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = USE_ORJSON
+
+    # jsonify() calls this with separators=(",", ":") (compact) or indent=2 (debug), which map
+    # onto orjson's compact output and OPT_INDENT_2; any other argument uses the json module
+    def dumps(self, obj, **kwargs):
+        separators = kwargs.pop("separators", (",", ":"))
+        indent = kwargs.pop("indent", None)
+        if (self.use_orjson and self.sort_keys and not kwargs and separators == (",", ":")
+                and indent in (None, 2)):
+            return dumps(obj, use_orjson=True, indent=bool(indent))
+        if indent is not None:
+            kwargs["indent"] = indent
+        elif separators != (",", ":"):
+            kwargs["separators"] = separators
+        return super().dumps(obj, **kwargs)
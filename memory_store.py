@@ -0,0 +1,602 @@
+import copy
+import threading
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+# In-process storage backend (STORAGE_BACKEND=memory). It stands in for MongoConnection: its
+# collections implement the CRUD part of the pymongo Collection API (find/find_one with
+# projection, sort and limit, the insert, update, delete and find_one_and_* calls, and
+# bulk_write of pymongo's InsertOne, UpdateOne/UpdateMany, ReplaceOne and DeleteOne/DeleteMany).
+#
+# Documents live in a dict per collection keyed by _id. Every index created through
+# ensure_indexes() becomes a hash index on its first field (email, restaurant_id,
+# delivery_person_id, ...), used to answer equality and $in filters on that field without
+# scanning; unique indexes reject duplicates with DuplicateKeyError like MongoDB.
+#
+# Data is not persisted and not shared between processes: run a single worker.
+# Server features beyond that (aggregate, $text, geo queries, explain, change streams) are not
+# provided: they are missing from MemoryConnection.features, and the routes that need them
+# answer 501 on this backend (see ROUTE_STORAGE_FEATURES in app.py).
+# Filters and updates using other operators fail with OperationFailure, as on an old server.
+
+# Order of types when sorting values of different types, as in MongoDB
+TYPE_ORDER = [(type(None), 1), (bool, 8), ((int, float), 2), (str, 3), (dict, 4), (list, 5), (ObjectId, 7),
+              (datetime, 9)]
+
+# Filter operators handled by the matcher; any other one is rejected like an unknown operator
+QUERY_OPERATORS = {"$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte", "$exists"}
+
+MISSING = object()
+
+# type -> rank, filled from TYPE_ORDER on first use of each type
+TYPE_RANKS = {}
+
+
+def type_rank(value):
+    rank = TYPE_RANKS.get(type(value))
+    if rank is None:
+        rank = next((rank for types, rank in TYPE_ORDER if isinstance(value, types)), 10)
+        TYPE_RANKS[type(value)] = rank
+    return rank
+
+def get_path(document, path):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+def set_path(document, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+def unset_path(document, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+def hashable(value):
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+###################### Matching #######################
+# The options of an $in or $nin, hashed once per query so each document is checked in constant time
+class InOptions:
+    def __init__(self, options):
+        self.options = list(options)
+        self.keys = {(type_rank(option), option) for option in self.options if hashable(option)}
+
+    def __iter__(self):
+        return iter(self.options)
+
+    # Same result as any(equals(value, option) for option in options). A scalar only equals an
+    # option of its own type rank, so it is looked up; arrays and documents are compared.
+    def __contains__(self, value):
+        if value is MISSING:
+            return (type_rank(None), None) in self.keys
+        if hashable(value):
+            return (type_rank(value), value) in self.keys
+        return any(equals(value, option) for option in self.options)
+
+# The query with its $in and $nin options hashed (see InOptions)
+def prepare_query(query):
+    prepared = {}
+    for field, condition in query.items():
+        if field in ("$or", "$and") and isinstance(condition, list):
+            condition = [prepare_query(branch) if isinstance(branch, dict) else branch for branch in condition]
+        elif isinstance(condition, dict) and any(key in ("$in", "$nin") for key in condition):
+            condition = {operator: InOptions(expected) if operator in ("$in", "$nin") else expected
+                         for operator, expected in condition.items()}
+        prepared[field] = condition
+    return prepared
+
+def equals(value, expected):
+    if value is MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        # A query value matches an array holding it
+        return any(equals(item, expected) for item in value)
+    return type_rank(value) == type_rank(expected) and value == expected
+
+def compare(value, expected, operator):
+    if value is MISSING or type_rank(value) != type_rank(expected):
+        return False
+    if operator == "$gt":
+        return value > expected
+    if operator == "$gte":
+        return value >= expected
+    if operator == "$lt":
+        return value < expected
+    return value <= expected
+
+def matches_condition(value, condition):
+    if not (isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition)):
+        return equals(value, condition)
+    for operator, expected in condition.items():
+        if operator not in QUERY_OPERATORS:
+            raise OperationFailure(f"unknown operator: {operator}", 2)
+        if operator == "$eq" and not equals(value, expected):
+            return False
+        if operator == "$ne" and equals(value, expected):
+            return False
+        if operator == "$in" and value not in expected:
+            return False
+        if operator == "$nin" and value in expected:
+            return False
+        if operator in ("$gt", "$gte", "$lt", "$lte") and not compare(value, expected, operator):
+            return False
+        if operator == "$exists" and (value is not MISSING) != bool(expected):
+            return False
+    return True
+
+def matches(document, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, branch) for branch in condition):
+                return False
+        elif field == "$and":
+            if not all(matches(document, branch) for branch in condition):
+                return False
+        elif field.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {field}", 2)
+        elif not matches_condition(get_path(document, field), condition):
+            return False
+    return True
+
+
+###################### Projection, Sort, Update #######################
+def project(document, projection):
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    fields = {field: bool(value) for field, value in projection.items()}
+    include_id = fields.pop("_id", True)
+    if any(fields.values()) or (not fields and include_id):
+        projected = {"_id": document["_id"]} if include_id and "_id" in document else {}
+        for field in fields:
+            value = get_path(document, field)
+            if value is not MISSING:
+                set_path(projected, field, value)
+        return projected
+    for field in fields:
+        unset_path(document, field)
+    if not include_id:
+        document.pop("_id", None)
+    return document
+
+def sort_documents(documents, sort):
+    # Stable sorts from the last key to the first give the compound order
+    for field, direction in reversed(sort):
+        def sort_key(document, field=field):
+            value = get_path(document, field)
+            value = None if value is MISSING else value
+            return (type_rank(value), value if hashable(value) and not isinstance(value, (dict, list)) else str(value))
+        documents.sort(key=sort_key, reverse=direction == -1)
+    return documents
+
+def apply_update(document, update, inserting=False):
+    for operator, fields in update.items():
+        if operator == "$set" or (operator == "$setOnInsert" and inserting):
+            for path, value in fields.items():
+                set_path(document, path, copy.deepcopy(value))
+        elif operator == "$inc":
+            for path, value in fields.items():
+                current = get_path(document, path)
+                set_path(document, path, value if current is MISSING else current + value)
+        elif operator == "$unset":
+            for path in fields:
+                unset_path(document, path)
+        elif operator != "$setOnInsert":
+            raise OperationFailure(f"Unknown modifier: {operator}", 9)
+
+# The document an upsert inserts: the equality fields of its filter, then the update
+def upsert_document(query, update):
+    document = {}
+    for field, condition in query.items():
+        if field.startswith("$"):
+            continue
+        if isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+            if "$eq" in condition:
+                set_path(document, field, copy.deepcopy(condition["$eq"]))
+            continue
+        set_path(document, field, copy.deepcopy(condition))
+    apply_update(document, update, inserting=True)
+    document.setdefault("_id", ObjectId())
+    return document
+
+
+###################### Indexes #######################
+# Hash index on the first field of a registered index; unique indexes also check the whole key
+class HashIndex:
+    def __init__(self, name, fields, unique):
+        self.name = name
+        self.field = fields[0]
+        self.fields = fields
+        self.unique = unique
+        self.entries = defaultdict(set)
+        self.unique_keys = {}
+
+    def values(self, document):
+        value = get_path(document, self.field)
+        value = None if value is MISSING else value
+        values = value if isinstance(value, list) else [value]
+        return [value for value in values if hashable(value)]
+
+    def unique_key(self, document):
+        key = tuple(get_path(document, field) for field in self.fields)
+        key = tuple(None if value is MISSING else value for value in key)
+        return key if hashable(key) else repr(key)
+
+    def check(self, document):
+        if self.unique:
+            owner = self.unique_keys.get(self.unique_key(document))
+            if owner is not None and owner != document["_id"]:
+                raise DuplicateKeyError(f"E11000 duplicate key error index: {self.name}", 11000)
+
+    def add(self, document):
+        for value in self.values(document):
+            self.entries[value].add(document["_id"])
+        if self.unique:
+            self.unique_keys[self.unique_key(document)] = document["_id"]
+
+    def remove(self, document):
+        for value in self.values(document):
+            ids = self.entries.get(value)
+            if ids:
+                ids.discard(document["_id"])
+                if not ids:
+                    del self.entries[value]
+        if self.unique and self.unique_keys.get(self.unique_key(document)) == document["_id"]:
+            del self.unique_keys[self.unique_key(document)]
+
+
+###################### Collections #######################
+class MemoryCursor:
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = None
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=1):
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    # Everything is read at once; kept for API compatibility
+    def batch_size(self, batch_size):
+        return self
+
+    def __iter__(self):
+        documents = self._collection._matching(self._query, self._sort, self._limit)
+        return iter([project(document, self._projection) for document in documents])
+
+
+class MemoryCollection:
+    def __init__(self, name):
+        self.name = name
+        self._documents = {}
+        # index name -> HashIndex
+        self._indexes = {}
+        self._lock = threading.RLock()
+
+    ###################### Indexes #######################
+    def create_index(self, keys, name=None, unique=False, **options):
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        with self._lock:
+            if name not in self._indexes:
+                index = HashIndex(name, [field for field, _ in keys], unique)
+                for document in self._documents.values():
+                    index.check(document)
+                    index.add(document)
+                self._indexes[name] = index
+        return name
+
+    def drop_index(self, name):
+        with self._lock:
+            self._indexes.pop(name, None)
+
+    # Ids of the documents a query can match, from the _id or a hash index; None means scan
+    def _candidates(self, query):
+        if "$or" in query and len(query) == 1:
+            ids = set()
+            for branch in query["$or"]:
+                branch_ids = self._candidates(branch)
+                if branch_ids is None:
+                    return None
+                ids |= branch_ids
+            return ids
+
+        best = None
+        for field, condition in query.items():
+            if field.startswith("$"):
+                continue
+            if isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+                values = condition.get("$in", [condition["$eq"]] if "$eq" in condition else None)
+            else:
+                values = [condition]
+            if values is None or not all(hashable(value) for value in values):
+                continue
+            if field == "_id":
+                ids = {value for value in values if value in self._documents}
+            else:
+                index = next((index for index in self._indexes.values() if index.field == field), None)
+                if index is None:
+                    continue
+                ids = set()
+                for value in values:
+                    ids |= index.entries.get(value, set())
+            if best is None or len(ids) < len(best):
+                best = ids
+        return best
+
+    # Stored documents (not copies) matching a query, sorted and limited
+    def _matching(self, query, sort=None, limit=0):
+        query = prepare_query(query or {})
+        with self._lock:
+            ids = self._candidates(query)
+            documents = self._documents.values() if ids is None else (self._documents[_id] for _id in ids)
+            found = [document for document in documents if matches(document, query)]
+            if sort:
+                sort_documents(found, sort)
+            return found[:limit] if limit else found
+
+    def _insert(self, document):
+        document.setdefault("_id", ObjectId())
+        stored = copy.deepcopy(document)
+        if stored["_id"] in self._documents:
+            raise DuplicateKeyError("E11000 duplicate key error index: _id_", 11000)
+        for index in self._indexes.values():
+            index.check(stored)
+        self._documents[stored["_id"]] = stored
+        for index in self._indexes.values():
+            index.add(stored)
+
+    def _replace(self, document, updated):
+        for index in self._indexes.values():
+            index.check(updated)
+        for index in self._indexes.values():
+            index.remove(document)
+        self._documents[updated["_id"]] = updated
+        for index in self._indexes.values():
+            index.add(updated)
+
+    def _delete(self, document):
+        for index in self._indexes.values():
+            index.remove(document)
+        del self._documents[document["_id"]]
+
+    ###################### Reads #######################
+    def find(self, filter=None, projection=None):
+        return MemoryCursor(self, filter or {}, projection)
+
+    def find_one(self, filter=None, projection=None):
+        found = self._matching(filter or {}, limit=1)
+        return project(found[0], projection) if found else None
+
+    def count_documents(self, filter):
+        return len(self._matching(filter))
+
+    ###################### Writes #######################
+    def insert_one(self, document):
+        with self._lock:
+            self._insert(document)
+        return SimpleNamespace(inserted_id=document["_id"], acknowledged=True)
+
+    def insert_many(self, documents, ordered=True):
+        errors = []
+        with self._lock:
+            for position, document in enumerate(documents):
+                try:
+                    self._insert(document)
+                except DuplicateKeyError as e:
+                    errors.append({"index": position, "code": 11000, "errmsg": str(e)})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(documents) - len(errors)})
+        return SimpleNamespace(inserted_ids=[document["_id"] for document in documents], acknowledged=True)
+
+    # Update the first (or every) matching document. Returns (matched, modified, upserted_id, before, after).
+    def _update(self, filter, update, upsert=False, many=False):
+        with self._lock:
+            found = self._matching(filter, limit=0 if many else 1)
+            if not found:
+                if not upsert:
+                    return 0, 0, None, None, None
+                document = upsert_document(filter, update)
+                self._insert(document)
+                return 0, 0, document["_id"], None, document
+            modified = 0
+            for document in found:
+                updated = copy.deepcopy(document)
+                apply_update(updated, update)
+                if updated != document:
+                    self._replace(document, updated)
+                    modified += 1
+            return len(found), modified, None, found[0], self._documents[found[0]["_id"]]
+
+    def update_one(self, filter, update, upsert=False):
+        matched, modified, upserted_id, _, _ = self._update(filter, update, upsert)
+        return SimpleNamespace(matched_count=matched, modified_count=modified, upserted_id=upserted_id,
+                               acknowledged=True)
+
+    def update_many(self, filter, update, upsert=False):
+        matched, modified, upserted_id, _, _ = self._update(filter, update, upsert, many=True)
+        return SimpleNamespace(matched_count=matched, modified_count=modified, upserted_id=upserted_id,
+                               acknowledged=True)
+
+    def find_one_and_update(self, filter, update, projection=None, return_document=ReturnDocument.BEFORE,
+                            upsert=False):
+        _, _, _, before, after = self._update(filter, update, upsert)
+        document = after if return_document == ReturnDocument.AFTER else before
+        return project(document, projection) if document is not None else None
+
+    def delete_one(self, filter):
+        with self._lock:
+            found = self._matching(filter, limit=1)
+            for document in found:
+                self._delete(document)
+        return SimpleNamespace(deleted_count=len(found), acknowledged=True)
+
+    def delete_many(self, filter):
+        with self._lock:
+            found = self._matching(filter)
+            for document in found:
+                self._delete(document)
+        return SimpleNamespace(deleted_count=len(found), acknowledged=True)
+
+    def find_one_and_delete(self, filter, projection=None):
+        with self._lock:
+            found = self._matching(filter, limit=1)
+            if not found:
+                return None
+            self._delete(found[0])
+        return project(found[0], projection)
+
+    # The requests are pymongo write models, read the way pymongo's own bulk_write reads them
+    # (each one adds itself to a bulk through _add_to_bulk). Writes are applied in order under
+    # the collection lock; a failed one is reported in writeErrors with its index, and an
+    # ordered bulk stops there, like MongoDB.
+    def bulk_write(self, requests, ordered=True, **options):
+        bulk = MemoryBulk(self)
+        with self._lock:
+            for position, request in enumerate(requests):
+                bulk.index = position
+                try:
+                    request._add_to_bulk(bulk)
+                except (DuplicateKeyError, OperationFailure) as e:
+                    bulk.errors.append({"index": position, "code": e.code, "errmsg": str(e)})
+                    if ordered:
+                        break
+        result = SimpleNamespace(inserted_count=bulk.inserted, matched_count=bulk.matched,
+                                 modified_count=bulk.modified, deleted_count=bulk.deleted,
+                                 upserted_count=len(bulk.upserted), upserted_ids=bulk.upserted, acknowledged=True)
+        if bulk.errors:
+            raise BulkWriteError({"writeErrors": bulk.errors, "writeConcernErrors": [],
+                                  "nInserted": bulk.inserted, "nMatched": bulk.matched, "nModified": bulk.modified,
+                                  "nRemoved": bulk.deleted, "nUpserted": len(bulk.upserted),
+                                  "upserted": [{"index": index, "_id": _id} for index, _id in bulk.upserted.items()]})
+        return result
+
+
+# Receives the writes of a bulk_write from the pymongo request objects and applies them
+class MemoryBulk:
+    def __init__(self, collection):
+        self.collection = collection
+        self.index = 0
+        self.inserted = 0
+        self.matched = 0
+        self.modified = 0
+        self.deleted = 0
+        # request index -> upserted _id
+        self.upserted = {}
+        self.errors = []
+
+    def add_insert(self, document):
+        self.collection._insert(document)
+        self.inserted += 1
+
+    def add_update(self, selector, update, multi=False, upsert=False, **options):
+        if isinstance(update, list):
+            raise OperationFailure("update pipelines are not supported", 9)
+        matched, modified, upserted_id, _, _ = self.collection._update(selector, update, upsert, many=multi)
+        self._count(matched, modified, upserted_id)
+
+    def add_replace(self, selector, replacement, upsert=False, **options):
+        found = self.collection._matching(selector, limit=1)
+        if found:
+            updated = dict(copy.deepcopy(replacement), _id=found[0]["_id"])
+            self.collection._replace(found[0], updated)
+            self._count(1, int(updated != found[0]), None)
+        elif upsert:
+            document = dict(copy.deepcopy(replacement))
+            document.setdefault("_id", selector.get("_id", ObjectId()))
+            self.collection._insert(document)
+            self._count(0, 0, document["_id"])
+
+    def add_delete(self, selector, limit, **options):
+        found = self.collection._matching(selector, limit=limit)
+        for document in found:
+            self.collection._delete(document)
+        self.deleted += len(found)
+
+    def _count(self, matched, modified, upserted_id):
+        self.matched += matched
+        self.modified += modified
+        if upserted_id is not None:
+            self.upserted[self.index] = upserted_id
+
+
+class MemoryDatabase:
+    def __init__(self, name):
+        self.name = name
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name)
+            return self._collections[name]
+
+    def command(self, name, *args, **kwargs):
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"no such command: '{name}'", 59)
+
+
+class MemoryClient:
+    def __init__(self):
+        self._databases = {}
+        self.admin = MemoryDatabase("admin")
+
+    def __getitem__(self, name):
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
+
+
+# Same interface as MongoConnection; there is no pool, so readiness never waits for connections
+class MemoryConnection:
+    features = frozenset({"bulk_write"})
+
+    def __init__(self, uri=None, db_name="FoodDeliveryApp", **client_options):
+        self._client = MemoryClient()
+        self.pool_metrics = SimpleNamespace(open_connections=0)
+        self.configure(uri, db_name, **client_options)
+
+    def configure(self, uri, db_name, **client_options):
+        self.uri = uri
+        self.db_name = db_name
+        # Pool settings do not apply
+        self.client_options = {}
+
+    def client(self):
+        return self._client
+
+    def database(self):
+        return self._client[self.db_name]
+
+    def connected(self):
+        return True
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# In-process LRU + TTL cache of pre-serialized menu responses, keyed by restaurant_id.
+# Each entry keeps the menu's ETag so other workers' writes can be detected.
+class MenuCache:
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a fill that raced with a write is dropped
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # Return (body, version) for a fresh entry, or None on a miss
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            body, version, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body, version
+
+    # Token to pass to put(); taken before reading from the database
+    def fill_token(self):
+        with self._lock:
+            return self._generation
+
+    def put(self, key, body, version, token):
+        with self._lock:
+            if token != self._generation:
+                # A write happened while this value was being read, it may be stale
+                return
+            self._entries[key] = (body, version, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,138 @@
+from bson import ObjectId
+from pymongo import UpdateOne
+
+# Menu storage: one document per menu item in the menu_item collection, keyed by
+# (restaurant_id, product_name) with a unique index. Every item write $inc's the item's own
+# version in the same update, so a menu's ETag is built from the _id and version of its
+# items (added, changed and removed items all change it). The menu collection keeps one
+# small document per restaurant (restaurant_id) for GET /menu.
+
+# Fields of a menu item as returned by GET /menu/<restaurant_id>
+MENU_ITEM_PROJECTION = {"_id": 0, "restaurant_id": 0, "version": 0}
+
+# Fields of a menu item that its menu's ETag is built from
+MENU_ITEM_VERSION_PROJECTION = {"version": 1}
+
+# Items are returned in the order they were first added
+MENU_ITEM_SORT = [("_id", 1)]
+
+
+# Query for the items of several menus at once
+def menu_items_filter(restaurant_ids):
+    return {"restaurant_id": {"$in": list(restaurant_ids)}}
+
+# Set "menu_items" on every menu document from the items fetched with menu_items_filter
+# (projected with restaurant_id), keeping each menu's item order
+def attach_menu_items(menus, items):
+    by_restaurant = {}
+    for item in items:
+        by_restaurant.setdefault(item.pop("restaurant_id"), []).append(item)
+    for menu in menus:
+        menu["menu_items"] = by_restaurant.get(menu["restaurant_id"], [])
+    return menus
+
+
+# Move the menu_items arrays of old menu documents into the menu_item collection.
+# Items are written with $setOnInsert, so items written since the deploy are kept and the
+# migration can be re-run safely; only the first item of a duplicated product_name is kept.
+def migrate_menu_items(menus, menu_items, batch_size=1000):
+    report = {"menus": 0, "items": 0, "duplicates": 0, "skipped": 0}
+    for menu in menus.find({"menu_items": {"$exists": True}}, {"restaurant_id": 1, "menu_items": 1}):
+        requests = []
+        seen = set()
+        for item in menu.get("menu_items") or []:
+            if not isinstance(item, dict) or not item.get("product_name"):
+                report["skipped"] += 1
+                continue
+            if item["product_name"] in seen:
+                report["duplicates"] += 1
+                continue
+            seen.add(item["product_name"])
+            fields = {key: value for key, value in item.items() if key not in ("_id", "restaurant_id", "version")}
+            requests.append(UpdateOne(
+                {"restaurant_id": menu["restaurant_id"], "product_name": item["product_name"]},
+                {"$setOnInsert": dict(fields, version=1)},
+                upsert=True
+            ))
+
+        for start in range(0, len(requests), batch_size):
+            menu_items.bulk_write(requests[start:start + batch_size], ordered=False)
+
+        # Drop the array only once its items are stored; the new item documents change the ETag
+        menus.update_one({"_id": menu["_id"]}, {"$unset": {"menu_items": ""}})
+        report["menus"] += 1
+        report["items"] += len(requests)
+    return report
+
+
+###################### Search #######################
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+def parse_price(value, name):
+    try:
+        return float(value), None
+    except (TypeError, ValueError):
+        return None, f"Invalid {name}"
+
+# Read ?q=&min_price=&max_price=&restaurant_id=&after=&limit= for GET /menu/search.
+# Returns (params, None) or (None, error message).
+def parse_search_args(args):
+    params = {"q": (args.get("q") or "").strip(), "restaurant_id": None, "after": None,
+              "min_price": None, "max_price": None, "limit": DEFAULT_SEARCH_LIMIT}
+    if not params["q"]:
+        return None, "Missing search text 'q'"
+
+    for name in ("min_price", "max_price"):
+        if args.get(name):
+            params[name], error = parse_price(args[name], name)
+            if error:
+                return None, error
+
+    if args.get("restaurant_id"):
+        if not ObjectId.is_valid(args["restaurant_id"]):
+            return None, "Invalid restaurant_id"
+        params["restaurant_id"] = ObjectId(args["restaurant_id"])
+
+    if args.get("limit"):
+        if not args["limit"].isdigit() or int(args["limit"]) < 1:
+            return None, "Invalid limit"
+        params["limit"] = min(int(args["limit"]), MAX_SEARCH_LIMIT)
+
+    # The cursor is "<score>:<_id>" of the last item of the previous page
+    if args.get("after"):
+        score, _, item_id = args["after"].partition(":")
+        try:
+            params["after"] = (float(score), ObjectId(item_id))
+        except Exception:
+            return None, "Invalid cursor"
+    return params, None
+
+# Aggregation pipeline over the menu_item text index: matching items by relevance, then _id.
+# Fetches one extra item to know whether a next page exists.
+def search_pipeline(params):
+    match = {"$text": {"$search": params["q"]}}
+    if params["restaurant_id"]:
+        match["restaurant_id"] = params["restaurant_id"]
+    price = {}
+    if params["min_price"] is not None:
+        price["$gte"] = params["min_price"]
+    if params["max_price"] is not None:
+        price["$lte"] = params["max_price"]
+    if price:
+        match["price"] = price
+
+    pipeline = [{"$match": match}, {"$addFields": {"score": {"$meta": "textScore"}}}]
+    if params["after"]:
+        score, item_id = params["after"]
+        pipeline.append({"$match": {"$or": [{"score": {"$lt": score}}, {"score": score, "_id": {"$gt": item_id}}]}})
+    pipeline += [{"$sort": {"score": -1, "_id": 1}}, {"$limit": params["limit"] + 1}, {"$project": {"version": 0}}]
+    return pipeline
+
+# Trim a page fetched with search_pipeline. Returns (items, next_cursor).
+def split_search_page(items, limit):
+    if len(items) > limit:
+        items = items[:limit]
+        return items, f"{items[-1]['score']!r}:{items[-1]['_id']}"
+    return items, None
@@ -0,0 +1,81 @@
+import os
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+                               multiprocess)
+
+# Prometheus metrics for the HTTP routes and the MongoDB driver.
+# With several worker processes set PROMETHEUS_MULTIPROC_DIR so /metrics aggregates all of them.
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ["route"],
+    multiprocess_mode="livesum"
+)
+REQUEST_DB_ROUND_TRIPS = Histogram(
+    "http_request_db_round_trips", "MongoDB commands issued per HTTP request", ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 100)
+)
+
+ADMISSION_REJECTED = Counter(
+    "http_requests_rejected_total", "Requests refused by admission control", ["route_class", "reason"]
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight", "Admitted requests in flight per route class", ["route_class"],
+    multiprocess_mode="livesum"
+)
+ADMISSION_LIMIT = Gauge(
+    "admission_limit", "Configured admission limits (0 = disabled)", ["route_class", "limit"],
+    multiprocess_mode="max"
+)
+
+ORDER_STATS_FLUSH_FAILURES = Counter(
+    "order_stats_flush_failures_total", "Flushes of the analytics counters that failed"
+)
+COURIER_LOCATION_FLUSH_FAILURES = Counter(
+    "courier_location_flush_failures_total", "Flushes of buffered courier locations that failed"
+)
+
+ORDER_STATUS_PENDING = Gauge(
+    "order_status_pending_updates", "Acknowledged order status updates not yet written (write-behind mode)",
+    multiprocess_mode="livesum"
+)
+ORDER_STATUS_FLUSH_LAG = Histogram(
+    "order_status_flush_lag_seconds", "Time from acknowledging an order status update to writing it",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+ORDER_STATUS_COALESCED = Counter(
+    "order_status_updates_coalesced_total", "Order status updates superseded before they were written"
+)
+ORDER_STATUS_FLUSH_FAILURES = Counter(
+    "order_status_flush_failures_total", "Write-behind flushes of order status updates that failed"
+)
+
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command duration", ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total", "MongoDB commands that failed", ["command", "collection"]
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a connection from the MongoDB pool",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total", "Connection checkouts from the MongoDB pool that failed", ["reason"]
+)
+
+
+# Body and content type of the /metrics response
+def render_metrics():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
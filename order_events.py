@@ -0,0 +1,169 @@
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from pymongo.errors import PyMongoError
+
+# In-process pub/sub of order events for the Server-Sent Events streams.
+# Channels are ("restaurant", id) and ("delivery_person", id). Every channel keeps its recent
+# events so a reconnecting client can resume from the last event id it received.
+#
+# Event ids are "<a>-<b>" and increase within a source: in-process they are the broker start
+# time and a counter; with the change stream source they are the cluster time of the change,
+# which is the same on every worker, so a client can resume on any of them.
+
+# Order fields naming the channels an order event is published to
+CHANNEL_FIELDS = {"restaurant": "restaurant_id", "delivery_person": "delivery_person_id"}
+
+
+def parse_event_id(event_id):
+    try:
+        first, second = event_id.split("-", 1)
+        return int(first), int(second)
+    except (AttributeError, ValueError):
+        return None
+
+
+class Subscription:
+    def __init__(self, channel, max_queue):
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=max_queue)
+        # Set when the subscriber fell too far behind and missed events
+        self.overflowed = False
+
+
+class OrderEventBroker:
+    def __init__(self, buffer_size=100, max_queue=1000, max_subscribers=32, max_channels=10000):
+        self.buffer_size = buffer_size
+        # Channels whose recent events are kept; the least recently active are dropped beyond this
+        self.max_channels = max_channels
+        self.max_queue = max_queue
+        # Every open stream holds a worker thread: beyond this, subscribe() refuses new ones
+        self.max_subscribers = max_subscribers
+        # Routes publish directly unless a change stream feeds the broker
+        self.local_publish = True
+        self._epoch = int(time.time())
+        self._counter = itertools.count(1)
+        # Key of the first event this broker saw; older ids may have been missed
+        self._first_key = None
+        # Key of the newest event in a dropped channel buffer: older positions can't be resumed
+        self._evicted_key = None
+        self._buffers = OrderedDict()
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    # Publish an event for an order to its restaurant and delivery person channels
+    def publish(self, event_type, order, event_id=None):
+        event_id = event_id or f"{self._epoch}-{next(self._counter)}"
+        event = {"id": event_id, "key": parse_event_id(event_id), "type": event_type, "order": order}
+        with self._lock:
+            if self._first_key is None:
+                self._first_key = event["key"]
+            for scope, field in CHANNEL_FIELDS.items():
+                if order.get(field) is None:
+                    continue
+                channel = (scope, str(order[field]))
+                self._buffer(channel).append(event)
+                for subscription in self._subscribers.get(channel, ()):
+                    try:
+                        subscription.queue.put_nowait(event)
+                    except queue.Full:
+                        subscription.overflowed = True
+            self._evict_idle_channels()
+        return event_id
+
+    def _buffer(self, channel):
+        buffer = self._buffers.get(channel)
+        if buffer is None:
+            buffer = self._buffers[channel] = deque(maxlen=self.buffer_size)
+        else:
+            self._buffers.move_to_end(channel)
+        return buffer
+
+    # Called with the lock held
+    def _evict_idle_channels(self):
+        while len(self._buffers) > self.max_channels:
+            _, buffer = self._buffers.popitem(last=False)
+            if buffer and (self._evicted_key is None or buffer[-1]["key"] > self._evicted_key):
+                self._evicted_key = buffer[-1]["key"]
+
+    # Register a subscriber. Returns (subscription, backlog, complete): the buffered events after
+    # last_event_id, and whether the buffer still reached back that far.
+    # Returns (None, [], False) when max_subscribers streams are already open.
+    def subscribe(self, channel, last_event_id=None):
+        subscription = Subscription(channel, self.max_queue)
+        last_key = parse_event_id(last_event_id)
+        with self._lock:
+            if self.max_subscribers and self._subscriber_count() >= self.max_subscribers:
+                return None, [], False
+            buffered = list(self._buffers.get(channel, ()))
+            evicted_key = self._evicted_key
+            self._subscribers[channel].add(subscription)
+
+        if last_event_id is None:
+            # A new client: nothing to resume
+            return subscription, [], True
+        if last_key is None:
+            return subscription, [], False
+
+        backlog = [event for event in buffered if event["key"] > last_key]
+        # Complete if the client's position is still inside the buffer, or if nothing was evicted
+        # from it, no dropped channel buffer held newer events, and this broker was already
+        # running when the client received its last event
+        nothing_evicted = len(buffered) < self.buffer_size and (
+            evicted_key is None or evicted_key <= last_key)
+        complete = bool(buffered and buffered[0]["key"] <= last_key) or (
+            nothing_evicted and self._first_key is not None and self._first_key <= last_key)
+        return subscription, backlog, complete
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def _subscriber_count(self):
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def subscriber_count(self):
+        with self._lock:
+            return self._subscriber_count()
+
+
+# Feed the broker from a MongoDB change stream on the order collection, so every worker
+# sees the orders written by all of them. Requires a replica set or sharded cluster.
+class ChangeStreamSource:
+    def __init__(self, broker, orders, logger=None):
+        self.broker = broker
+        self.orders = orders
+        self.logger = logger
+        self._resume_token = None
+        self._thread = None
+
+    def start(self):
+        self.broker.local_publish = False
+        self._thread = threading.Thread(target=self._run, name="order-change-stream", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        while True:
+            try:
+                with self.orders.watch(pipeline, full_document="updateLookup",
+                                       resume_after=self._resume_token) as stream:
+                    for change in stream:
+                        self._resume_token = stream.resume_token
+                        order = change.get("fullDocument")
+                        if not order:
+                            continue
+                        cluster_time = change["clusterTime"]
+                        event_type = "order_created" if change["operationType"] == "insert" else "order_updated"
+                        self.broker.publish(event_type, order, f"{cluster_time.time}-{cluster_time.inc}")
+            except PyMongoError as e:
+                if self.logger:
+                    self.logger.error(f"Order change stream failed, retrying: {e}")
+                time.sleep(1)
@@ -0,0 +1,49 @@
+from bson import ObjectId
+
+from analytics import id_range, parse_time_range
+from dispatch import RELEASE_STATUSES
+
+# Shared query layer of the restaurant and delivery person order lists.
+# Filters (query string): status=a,b or active=true (orders not finished yet), from= and to=
+# (ISO 8601, on the creation time in the _id) and sort=oldest|newest. Every combination is
+# served by the (owner, status, _id) or (owner, _id) indexes, so a list only reads the orders
+# it returns, however long the owner's order history is.
+
+# Orders in these statuses are finished; any other status is active
+FINISHED_STATUSES = sorted(RELEASE_STATUSES)
+
+# sort= value -> _id direction
+ORDER_SORTS = {"oldest": 1, "newest": -1}
+
+
+def parse_statuses(value):
+    statuses = [status.strip() for status in value.split(",") if status.strip()]
+    return statuses[0] if len(statuses) == 1 else {"$in": statuses}
+
+# Build the query of the orders of one owner (owner_field is restaurant_id or delivery_person_id).
+# active=True is the fast path of the dashboards: only orders not finished yet.
+# Returns (query, sort direction, None) or (None, None, error message).
+def order_list_query(args, owner_field, owner_id, active=False):
+    if not ObjectId.is_valid(owner_id):
+        return None, None, f"Invalid {owner_field}"
+    query = {owner_field: ObjectId(owner_id)}
+
+    active = active or args.get("active", "").lower() in ("1", "true", "yes")
+    if active and args.get("status"):
+        return None, None, "Use either 'status' or 'active', not both"
+    if active:
+        # Bounds on the status key of the index skip the finished orders entirely
+        query["status"] = {"$nin": FINISHED_STATUSES}
+    elif args.get("status"):
+        query["status"] = parse_statuses(args["status"])
+
+    start, end, error = parse_time_range(args)
+    if error:
+        return None, None, error
+    if start or end:
+        query["_id"] = id_range(start, end)
+
+    sort = args.get("sort", "oldest")
+    if sort not in ORDER_SORTS:
+        return None, None, "Invalid sort, use 'oldest' or 'newest'"
+    return query, ORDER_SORTS[sort], None
@@ -0,0 +1,186 @@
+import atexit
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from metrics import (ORDER_STATUS_COALESCED, ORDER_STATUS_FLUSH_FAILURES, ORDER_STATUS_FLUSH_LAG,
+                     ORDER_STATUS_PENDING)
+from validation import order_after_status_update
+
+# Write-behind mode of order status updates (ORDER_STATUS_WRITE_BEHIND=true).
+# Status changes are checked against an in-memory cache of orders, applied to it and
+# acknowledged at once; a background thread writes them with one bulk_write every flush
+# interval, or as soon as max_batch orders are pending. Several changes of one order between
+# two flushes are coalesced into a single write of the latest status.
+#
+# Each process has its own cache, so route the updates of an order to one worker (or run a
+# single worker) when this mode is on.
+
+
+class OrderStatusWriteBehind:
+    def __init__(self, orders, flush_interval=0.02, max_batch=500, cache_size=100000):
+        self.orders = orders
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        # order _id -> latest acknowledged order document
+        self._cache = OrderedDict()
+        # order _id -> {"delivery_person_id", "status", "updates", "since"} not yet written
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.logger = None
+        self.flushed = 0
+        self.coalesced = 0
+        self.last_flush_lag = None
+
+    # Start the flush thread; also restarts it in a forked worker, which does not inherit threads
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            if self._thread is None:
+                atexit.register(self.stop)
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="order-status-flush", daemon=True)
+            self._thread.start()
+
+    # Write everything still pending; retried a few times so shutdown does not drop updates
+    def stop(self, attempts=3):
+        self._stopped.set()
+        self._wake.set()
+        for attempt in range(attempts):
+            try:
+                self.flush()
+                return
+            except Exception:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.5)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Updates stay pending and are retried on the next flush
+                if self.logger:
+                    self.logger.error(f"Order status flush failed, retrying: {e}")
+
+    # Cache an order document read from or written to MongoDB. Status changes still pending
+    # for it are applied on top, so a document read before the flush is never older than them.
+    def remember(self, order):
+        with self._lock:
+            pending = self._pending.get(order["_id"])
+            if pending:
+                order = dict(order, status=pending["status"], version=order.get("version", 0) + pending["updates"])
+            self._cache[order["_id"]] = order
+            self._cache.move_to_end(order["_id"])
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def forget(self, order_id):
+        with self._lock:
+            self._cache.pop(order_id, None)
+            self._pending.pop(order_id, None)
+
+    def cached(self, order_id):
+        with self._lock:
+            return self._cache.get(order_id)
+
+    # Apply a status update (validated request data) to the cached order.
+    # Returns (previous_order, updated_order); updated_order is None when the delivery person is
+    # not assigned to the order or the status does not change, and both are None on a cache miss.
+    def update_status(self, order_id, data):
+        with self._lock:
+            order = self._cache.get(order_id)
+            if order is None:
+                return None, None
+            if str(order.get("delivery_person_id")) != data["delivery_person_id"] or order.get("status") == data["status"]:
+                return order, None
+
+            updated_order = order_after_status_update(order, data)
+            self._cache[order_id] = updated_order
+            self._cache.move_to_end(order_id)
+            pending = self._pending.get(order_id)
+            if pending:
+                # Supersedes the status still waiting to be written
+                pending["status"] = data["status"]
+                pending["updates"] += 1
+                self.coalesced += 1
+                ORDER_STATUS_COALESCED.inc()
+            else:
+                self._pending[order_id] = {"delivery_person_id": order["delivery_person_id"], "status": data["status"],
+                                           "updates": 1, "since": time.monotonic()}
+            ORDER_STATUS_PENDING.set(len(self._pending))
+            if len(self._pending) >= self.max_batch:
+                self._wake.set()
+            return order, updated_order
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            order_ids = list(pending)
+            requests = [UpdateOne(
+                {"_id": order_id, "delivery_person_id": pending[order_id]["delivery_person_id"]},
+                # One version bump per acknowledged update, as the direct route does
+                {"$set": {"status": pending[order_id]["status"]}, "$inc": {"version": pending[order_id]["updates"]}}
+            ) for order_id in order_ids]
+            try:
+                self.orders.bulk_write(requests, ordered=False)
+            except BulkWriteError as e:
+                # Unordered: every request without a write error was applied (with its $inc),
+                # retry only the others
+                ORDER_STATUS_FLUSH_FAILURES.inc()
+                self._put_back({order_ids[error["index"]]: pending[order_ids[error["index"]]]
+                                for error in e.details.get("writeErrors", [])})
+                raise
+            except Exception:
+                ORDER_STATUS_FLUSH_FAILURES.inc()
+                self._put_back(pending)
+                raise
+
+            now = time.monotonic()
+            for update in pending.values():
+                ORDER_STATUS_FLUSH_LAG.observe(now - update["since"])
+            with self._lock:
+                self.flushed += len(requests)
+                self.last_flush_lag = max(now - update["since"] for update in pending.values())
+                ORDER_STATUS_PENDING.set(len(self._pending))
+            return len(requests)
+
+    # Put updates back under any newer ones that arrived meanwhile
+    def _put_back(self, pending):
+        with self._lock:
+            for order_id, update in pending.items():
+                newer = self._pending.get(order_id)
+                if newer:
+                    newer["updates"] += update["updates"]
+                    newer["since"] = update["since"]
+                else:
+                    self._pending[order_id] = update
+            ORDER_STATUS_PENDING.set(len(self._pending))
+
+    def stats(self):
+        with self._lock:
+            oldest = min((update["since"] for update in self._pending.values()), default=None)
+            return {
+                "pending": len(self._pending),
+                "oldest_pending_seconds": round(time.monotonic() - oldest, 6) if oldest is not None else None,
+                "cached_orders": len(self._cache),
+                "flushed": self.flushed,
+                "coalesced": self.coalesced,
+                "last_flush_lag_seconds": round(self.last_flush_lag, 6) if self.last_flush_lag is not None else None,
+                "flush_interval": self.flush_interval,
+                "max_batch": self.max_batch
+            }
@@ -0,0 +1,222 @@
+from bson import ObjectId
+
+# Request validation and document building shared by the sync (app.py) and async (asgi.py) servers.
+# Functions return an error message string, or None / a built value when the input is valid.
+
+# Roles a user may register with
+VALID_ROLES = ["customer", "restaurant_owner", "delivery_personnel", "admin"]
+
+# Fields every new order must provide
+ORDER_REQUIRED_FIELDS = ["status", "menu_detail", "total_price", "delivery_person_id"]
+
+# Largest number of orders accepted by one batch request
+MAX_BATCH_ORDERS = 1000
+
+# Page size used when ?limit is not given, and the largest page a client may ask for
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+###################### Users #######################
+def validate_registration(data):
+    # Check if role is valid
+    if data.get('role') not in VALID_ROLES:
+        return "Invalid role"
+
+    # Ensure essential fields are provided
+    if not data.get('name') or not data.get('email') or not data.get('password'):
+        return "Missing required fields"
+
+    return None
+
+# Filter matching a user only when at least one of the provided fields changes
+def user_update_filter(user_id, data):
+    return {"_id": ObjectId(user_id), "$or": [{field: {"$ne": value}} for field, value in data.items()]}
+
+
+###################### Menus #######################
+# Returns (menu_item, None) or (None, error message)
+def build_menu_item(data):
+    if not data.get('product_name') or not data.get('price') or not data.get('detail'):
+        return None, "Missing required fields (product_name, price, detail)"
+
+    return {
+        "product_name": data.get('product_name'),
+        "price": data.get('price'),
+        "detail": data.get('detail')
+    }, None
+
+# Filter matching one item of a restaurant's menu (unique index on these two fields)
+def menu_item_filter(restaurant_id, product_name):
+    return {"restaurant_id": ObjectId(restaurant_id), "product_name": product_name}
+
+# Upsert of a menu item built by build_menu_item: adding an existing product replaces its fields.
+# The item's version is bumped in the same update (a new item starts at 1). Returns (filter, update).
+def menu_item_upsert(restaurant_id, menu_item):
+    fields = {key: value for key, value in menu_item.items() if key != "product_name"}
+    return menu_item_filter(restaurant_id, menu_item["product_name"]), {"$set": fields, "$inc": {"version": 1}}
+
+# Register a restaurant's menu for GET /menu; leaves an existing menu document untouched.
+# Returns (filter, update).
+def menu_register(restaurant_id):
+    return {"restaurant_id": ObjectId(restaurant_id)}, {"$setOnInsert": {"restaurant_id": ObjectId(restaurant_id)}}
+
+# Build the update of one menu item from the provided fields.
+# Returns (filter, update); update is None when no updatable field was provided.
+# The filter only matches the product if one of the provided fields actually changes.
+def menu_item_update(restaurant_id, data):
+    update_data = {}
+    changed = []
+
+    if 'price' in data:
+        update_data["price"] = data['price']
+        changed.append({"price": {"$ne": data['price']}})
+    if 'detail' in data:
+        update_data["detail"] = data['detail']
+        changed.append({"detail": {"$ne": data['detail']}})
+
+    if not update_data:
+        return None, None
+
+    item_filter = dict(menu_item_filter(restaurant_id, data['product_name']), **{"$or": changed})
+    return item_filter, {"$set": update_data, "$inc": {"version": 1}}
+
+
+###################### Orders #######################
+# Validate the request data of one order and build its document.
+# With require_courier=False delivery_person_id may be left out, for the dispatcher to fill in.
+# Returns (order_data, None) or (None, error message).
+def build_order(data, user_id, restaurant_id, require_courier=True):
+    for field in ORDER_REQUIRED_FIELDS:
+        if field not in data and (require_courier or field != "delivery_person_id"):
+            return None, f"Missing required field: {field}"
+
+    order_data = {
+        "user_id": ObjectId(user_id),
+        "restaurant_id": ObjectId(restaurant_id),
+        "status": data["status"],
+        "menu_detail": data["menu_detail"],  # Assume this is a list or detailed object
+        "total_price": data["total_price"],
+        "version": 1
+    }
+    if "delivery_person_id" in data:
+        order_data["delivery_person_id"] = ObjectId(data["delivery_person_id"])
+    return order_data, None
+
+# Validate a batch request body.
+# Returns (results, valid_orders, None) or (None, None, error message); results holds the
+# per-item errors and valid_orders the (index, order_data) pairs ready for insert_many.
+def build_order_batch(data):
+    batch = data.get("orders") if isinstance(data, dict) else None
+
+    if not isinstance(batch, list) or not batch:
+        return None, None, "Request body must contain a non-empty 'orders' list"
+    if len(batch) > MAX_BATCH_ORDERS:
+        return None, None, f"Too many orders in one batch (max {MAX_BATCH_ORDERS})"
+
+    # Validate every order first; each item also names its user and restaurant
+    results = [None] * len(batch)
+    valid_orders = []
+    for index, item in enumerate(batch):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Order must be an object")
+            for field in ("user_id", "restaurant_id"):
+                if field not in item:
+                    raise ValueError(f"Missing required field: {field}")
+            order_data, error = build_order(item, item["user_id"], item["restaurant_id"])
+            if error:
+                raise ValueError(error)
+            # Assign the _id here so the response needs no read back
+            order_data["_id"] = ObjectId()
+            valid_orders.append((index, order_data))
+        except Exception as e:
+            results[index] = {"index": index, "ok": False, "error": str(e)}
+    return results, valid_orders, None
+
+# Per-item outcome of a batch insert; failed maps positions in valid_orders to error messages.
+# Returns (response body, status code).
+def order_batch_response(results, valid_orders, failed):
+    for position, (index, order_data) in enumerate(valid_orders):
+        if position in failed:
+            results[index] = {"index": index, "ok": False, "error": failed[position]}
+        else:
+            results[index] = {"index": index, "ok": True, "order": order_data}
+
+    inserted = sum(1 for result in results if result["ok"])
+    if inserted == len(results):
+        status_code = 201
+    elif inserted:
+        status_code = 207
+    else:
+        status_code = 400
+    return {
+        "msg": f"{inserted} of {len(results)} orders added",
+        "inserted": inserted,
+        "failed": len(results) - inserted,
+        "results": results
+    }, status_code
+
+def validate_status_update(data):
+    if "delivery_person_id" not in data or "status" not in data:
+        return "Missing required fields: 'delivery_person_id' and 'status'"
+    return None
+
+# Filter matching the order only when the delivery person is assigned to it and the status
+# actually changes, or None when delivery_person_id cannot match any order
+def order_status_filter(order_id, data):
+    if not ObjectId.is_valid(data["delivery_person_id"]):
+        return None
+    return {
+        "_id": ObjectId(order_id),
+        "delivery_person_id": ObjectId(data["delivery_person_id"]),
+        "status": {"$ne": data["status"]}
+    }
+
+def order_status_update(data):
+    return {"$set": {"status": data["status"]}, "$inc": {"version": 1}}
+
+# The order as stored after order_status_update, built from the document returned before it
+def order_after_status_update(order, data):
+    return dict(order, status=data["status"], version=order.get("version", 0) + 1)
+
+
+###################### Pagination #######################
+# Read ?after=<id>&limit=N&stream=true from the query string.
+# Returns (after, limit, stream, None) or (None, None, None, error message).
+def parse_page_args(args):
+    after = args.get('after')
+    limit = args.get('limit')
+    stream = args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+    if after is not None and not ObjectId.is_valid(after):
+        return None, None, None, "Invalid cursor"
+
+    if limit is not None:
+        if not limit.isdigit() or int(limit) < 1:
+            return None, None, None, "Invalid limit"
+        limit = min(int(limit), MAX_PAGE_LIMIT)
+    elif after is not None:
+        limit = DEFAULT_PAGE_LIMIT
+
+    return after, limit, stream, None
+
+# Build the query for a keyset page: only documents with an _id after the cursor in the sort
+# direction (1 ascending, -1 descending), within any _id range the query already has
+def page_query(query, after, direction=1):
+    if after is None:
+        return query
+    operator, tighter = ("$gt", max) if direction == 1 else ("$lt", min)
+    id_filter = dict(query.get("_id", {}))
+    bound = ObjectId(after)
+    if operator in id_filter:
+        bound = tighter(id_filter[operator], bound)
+    id_filter[operator] = bound
+    return {**query, "_id": id_filter}
+
+# Trim a page fetched with limit + 1 documents. Returns (documents, next_cursor).
+def split_page(documents, limit):
+    if limit is not None and len(documents) > limit:
+        documents = documents[:limit]
+        return documents, str(documents[-1]["_id"])
+    return documents, None